@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Time the parse of generated BNF files with an increasing number of rules
+
+the time per rule should stay the same as the files grow, for example:
+
+    python benchmarks/bnf_rules.py --engine iterative 25000 50000 100000
+"""
+import argparse
+import time
+
+from prosodia.base.bnf import create_bnf
+from prosodia.core import grammar as g
+
+
+def bnf_rules(count: int) -> str:
+    # the numbers are padded so that every rule is as long as the others
+    return ''.join(
+        '<r{0:07}> ::= "a" <b{0:07}> | "c"\n'.format(i) for i in range(count)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--engine',
+        default=g.ITERATIVE,
+        choices=[g.PACKRAT, g.EARLEY, g.ITERATIVE]
+    )
+    parser.add_argument(
+        'counts',
+        nargs='*',
+        type=int,
+        default=[25000, 50000, 100000]
+    )
+    args = parser.parse_args()
+
+    lang = create_bnf().language
+    print('{0:>8} {1:>10} {2:>14}'.format('rules', 'seconds', 'us per rule'))
+    for count in args.counts:
+        text = bnf_rules(count)
+        start = time.perf_counter()
+        lang.parse(text, False, engine=args.engine)
+        elapsed = time.perf_counter() - start
+        print('{0:>8} {1:>10.2f} {2:>14.1f}'.format(
+            count,
+            elapsed,
+            elapsed / count * 1e6
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Time recognizing the bundled grammars against parsing them into trees
+
+each grammar is matched against its own text, for example:
+
+    python benchmarks/recognize.py --repeat 5 abnf bnf
+"""
+import argparse
+import sys
+import time
+import typing
+
+from prosodia.base.augmentedbnf import create_augmentedbnf
+from prosodia.base.augmentedbnf._text import text as abnf_text
+from prosodia.base.bnf import create_bnf
+from prosodia.base.bnf._text import text as bnf_text
+from prosodia.base.bnfrange import create_bnfrange
+from prosodia.base.bnfrange._text import text as bnfrange_text
+from prosodia.base.bnfrepeat import create_bnfrepeat
+from prosodia.base.bnfrepeat._text import text as bnfrepeat_text
+
+GRAMMARS = {
+    'abnf': (create_augmentedbnf, abnf_text),
+    'bnf': (create_bnf, bnf_text),
+    'bnfrange': (create_bnfrange, bnfrange_text),
+    'bnfrepeat': (create_bnfrepeat, bnfrepeat_text),
+}
+
+
+def best_time(run: typing.Callable[[], typing.Any], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument(
+        'grammars',
+        nargs='*',
+        default=sorted(GRAMMARS),
+        help=', '.join(sorted(GRAMMARS))
+    )
+    args = parser.parse_args()
+    unknown = set(args.grammars) - GRAMMARS.keys()
+    if unknown:
+        parser.error('unknown grammars: {0}'.format(', '.join(unknown)))
+    # the bnf texts are parsed by right recursive rules
+    sys.setrecursionlimit(100000)
+
+    print('{0:>10} {1:>10} {2:>10} {3:>8}'.format(
+        'grammar', 'parse s', 'recognize', 'speedup'
+    ))
+    for name in args.grammars:
+        create, text = GRAMMARS[name]
+        lang = create().language
+        parse = best_time(
+            lambda lang=lang, text=text: lang.parse(text, False),
+            args.repeat
+        )
+        recognize = best_time(
+            lambda lang=lang, text=text: lang.recognize(text, False),
+            args.repeat
+        )
+        assert lang.recognize(text, False)
+        print('{0:>10} {1:>10.3f} {2:>10.3f} {3:>7.1f}x'.format(
+            name,
+            parse,
+            recognize,
+            parse / recognize
+        ))
+
+
+if __name__ == '__main__':
+    main()
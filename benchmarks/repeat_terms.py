@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Time repeat terms over inputs with an increasing number of repetitions
+
+the time per repetition should stay the same as the inputs grow, for example:
+
+    python benchmarks/repeat_terms.py 10 1000 100000 1000000
+"""
+import argparse
+import time
+import typing
+
+from prosodia.core import grammar as g
+
+# the repeated rules only refer to the rules that match a character, so
+# Language.char_run does not scan them at once and every repetition goes
+# through the linked nodes of the general repeat
+RULES = [
+    g.Rule(
+        'DIGIT',
+        g.Syntax.create(
+            g.TermGroup.create(g.LiteralRange(ord('0'), ord('9')))
+        )
+    ),
+    g.Rule(
+        'ALPHA',
+        g.Syntax.create(
+            g.TermGroup.create(g.LiteralRange(ord('A'), ord('Z'))),
+            g.TermGroup.create(g.LiteralRange(ord('a'), ord('z')))
+        )
+    ),
+    g.Rule(
+        'Digit',
+        g.Syntax.create(g.TermGroup.create(g.RuleReference('DIGIT')))
+    ),
+    g.Rule(
+        'Alpha',
+        g.Syntax.create(g.TermGroup.create(g.RuleReference('ALPHA')))
+    ),
+]
+PAIR = g.GroupTerm([[g.Literal('a'), g.Literal('b')]])
+
+
+def repeat_language(term: g.Term, min_count: int) -> g.Language:
+    lang = g.Language.create('Root')
+    repeat = g.RepeatTerm(term, min_count, None)
+    lang.add_rule(
+        g.Rule(
+            'Root',
+            g.Syntax.create(g.TermGroup.create(repeat, g.EOFTerm()))
+        )
+    )
+    for rule in RULES:
+        lang.add_rule(rule)
+    assert lang.char_run(repeat) is None
+    return lang
+
+
+CASES: typing.List[typing.Tuple[str, g.Language, str]] = [
+    ('*Digit', repeat_language(g.RuleReference('Digit'), 0), '7'),
+    ('1*Alpha', repeat_language(g.RuleReference('Alpha'), 1), 'x'),
+    ('*("a" "b")', repeat_language(PAIR, 0), 'ab'),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--engine',
+        default=g.PACKRAT,
+        choices=[g.PACKRAT, g.EARLEY, g.ITERATIVE]
+    )
+    parser.add_argument(
+        'counts',
+        nargs='*',
+        type=int,
+        default=[10, 100, 1000, 10000, 100000, 1000000]
+    )
+    args = parser.parse_args()
+
+    print('{0:>12} {1:>10} {2:>10} {3:>12}'.format(
+        'term', 'count', 'seconds', 'us per item'
+    ))
+    for name, lang, item in CASES:
+        def parse(
+            text: str,
+            partial: bool,
+            lang: g.Language = lang
+        ) -> object:
+            return lang.parse(text, partial, engine=args.engine)
+        for count in args.counts:
+            text = item * count
+            start = time.perf_counter()
+            parse(text, False)
+            elapsed = time.perf_counter() - start
+            print('{0:>12} {1:>10} {2:>10.3f} {3:>12.2f}'.format(
+                name,
+                count,
+                elapsed,
+                elapsed / count * 1e6
+            ))
+
+
+if __name__ == '__main__':
+    main()
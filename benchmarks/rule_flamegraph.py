@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Profile the rules of a parse and write their stacks for a flamegraph
+
+the collapsed stacks can be drawn with flamegraph.pl or speedscope, e.g.:
+
+    python benchmarks/rule_flamegraph.py --out abnf.folded
+    flamegraph.pl abnf.folded > abnf.svg
+"""
+import argparse
+import sys
+
+from prosodia.base.augmentedbnf import create_augmentedbnf
+from prosodia.base.augmentedbnf._text import text as abnf_text
+from prosodia.base.bnf import create_bnf
+from prosodia.base.bnf._text import text as bnf_text
+
+GRAMMARS = {
+    'abnf': (create_augmentedbnf, abnf_text),
+    'bnf': (create_bnf, bnf_text),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--grammar', default='abnf', choices=sorted(GRAMMARS))
+    parser.add_argument(
+        'path',
+        nargs='?',
+        help='file to parse instead of the grammar of the grammar'
+    )
+    parser.add_argument('--out', help='where to write the collapsed stacks')
+    parser.add_argument(
+        '--rules',
+        type=int,
+        default=15,
+        help='number of rules in the printed report'
+    )
+    args = parser.parse_args()
+
+    create, text = GRAMMARS[args.grammar]
+    if args.path:
+        with open(args.path, encoding='utf-8') as f:
+            text = f.read()
+    _, stats = create().language.profile(text, False)
+    print(stats.report(args.rules))
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            stats.write_collapsed(f)
+    else:
+        stats.write_collapsed(sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -214,6 +214,30 @@ def _string_literal_accum2(
         raise RuntimeError('unreachable')
 
 
+def _repeat_term_accum3(
+    values: typing.Tuple[
+        typing.Tuple[int, typing.Optional[int]],
+        str,
+        g.Term
+    ]
+) -> g.Term:
+    ((start, end), _, term) = values
+    return g.RepeatTerm(term, start, end, possessive=True)
+
+
+def _atomic_term_accum(
+    values: typing.Tuple[str, None, typing.List[g.TermGroup], None, str]
+) -> g.Term:
+    term_groups = values[2]
+    if len(term_groups) == 1 and len(term_groups[0].terms) == 1:
+        return g.AtomicTerm(term_groups[0].terms[0])
+    return g.AtomicTerm(_group_term_accum(values))
+
+
+def _cut_term_accum(_values: typing.Tuple[str]) -> g.Term:
+    return g.CutTerm()
+
+
 def _group_term_accum(
     values: typing.Tuple[str, None, typing.List[g.TermGroup], None, str]
 ) -> g.Term:
@@ -244,6 +268,7 @@ transform <<= 'RepeatableTerm', [
     annotate(identity, T=g.Term),
     rule_reference_accum,
     annotate(identity, T=g.Term),
+    annotate(identity, T=g.Term),
 ]
 transform <<= 'LiteralBody', [
     annotate(unescape, T=typing.Sequence[str])
@@ -279,6 +304,7 @@ transform <<= 'Number', [
 transform <<= 'Term', [
     annotate(identity, T=g.Term),
     annotate(identity, T=g.Term),
+    annotate(identity, T=g.Term),
 ]
 transform <<= 'RepeatBody', [
     repeat_body_accum1,
@@ -292,7 +318,8 @@ transform <<= 'ListEnd', [
 ]
 transform <<= 'RepeatTerm', [
     _repeat_term_accum1,
-    _repeat_term_accum2
+    _repeat_term_accum2,
+    _repeat_term_accum3,
 ]
 transform <<= 'AssignmentOperator', [annotate(identity, T=str)] * 2
 transform <<= 'Comment', [
@@ -308,5 +335,7 @@ transform <<= 'StringLiteral', [
     _string_literal_accum,
 ]
 transform <<= 'GroupTerm', [_group_term_accum]
+transform <<= 'AtomicTerm', [_atomic_term_accum]
+transform <<= 'CutTerm', [_cut_term_accum]
 transform = add_terminal_transforms(transform)
 transform = add_freebie_transforms(transform)
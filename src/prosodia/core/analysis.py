@@ -0,0 +1,786 @@
+"""Static analysis of the rules of a Language
+
+the analyses are conservative: terms they do not know about are treated as
+if they could match the empty string.
+"""
+import re
+import typing
+
+from .chars import CharSet
+from .memo import RuleName
+from .terms import (
+    AtomicTerm,
+    CutTerm,
+    EOFTerm,
+    GroupTerm,
+    Literal,
+    LiteralRange,
+    RepeatTerm,
+    RuleReference,
+    Term,
+)
+from ..validation.validity import Validity
+if typing.TYPE_CHECKING:
+    from .grammar import Language, Rule  # pylint: disable=unused-import
+
+
+def references(term: Term) -> typing.Iterator[RuleName]:
+    if isinstance(term, RuleReference):
+        yield term.rule_name
+    elif isinstance(term, (RepeatTerm, AtomicTerm)):
+        yield from references(term.child)
+    elif isinstance(term, GroupTerm):
+        for children in term.children_groups:
+            for child in children:
+                yield from references(child)
+
+
+def rule_terms(rule: 'Rule') -> typing.Iterator[Term]:
+    for term_group in rule.syntax.term_groups:
+        yield from term_group.terms
+
+
+def _terms(lang: 'Language') -> typing.Iterator[Term]:
+    for rule in lang.rules.values():
+        yield from rule_terms(rule)
+
+
+def is_terminal(term: Term) -> bool:
+    return isinstance(term, (Literal, LiteralRange, EOFTerm))
+
+
+def is_terminal_rule(rule: 'Rule') -> bool:
+    return all(is_terminal(t) for t in rule_terms(rule))
+
+
+def _is_known(term: Term) -> bool:
+    if isinstance(term, (RepeatTerm, AtomicTerm)):
+        return _is_known(term.child)
+    elif isinstance(term, GroupTerm):
+        return all(
+            _is_known(c)
+            for children in term.children_groups
+            for c in children
+        )
+    else:
+        return isinstance(
+            term,
+            (
+                RuleReference,
+                Literal,
+                LiteralRange,
+                EOFTerm,
+                CutTerm,
+            )
+        )
+
+
+def nullable_rules(lang: 'Language') -> typing.Set[RuleName]:
+    """Rules that can match the empty string
+
+    a rule is only looked at again when a rule that it references turns out
+    to be nullable, so every rule is looked at once per reference at most
+    """
+    users: typing.Dict[RuleName, typing.Set[RuleName]] = dict()
+    for rule in lang.rules.values():
+        for term in rule_terms(rule):
+            for name in references(term):
+                users.setdefault(name, set()).add(rule.name)
+    nullable: typing.Set[RuleName] = set()
+    pending = list(lang.rules)
+    while pending:
+        rule_name = pending.pop()
+        if rule_name not in nullable and any(
+            all(is_nullable(t, nullable) for t in term_group.terms)
+            for term_group in lang.rules[rule_name].syntax.term_groups
+        ):
+            nullable.add(rule_name)
+            pending.extend(users.get(rule_name, ()))
+    return nullable
+
+
+def is_nullable(term: Term, nullable: typing.Set[RuleName]) -> bool:  # pylint: disable=too-many-return-statements
+    if isinstance(term, RuleReference):
+        return term.rule_name in nullable
+    elif isinstance(term, Literal):
+        return not term.text
+    elif isinstance(term, LiteralRange):
+        return False
+    elif isinstance(term, RepeatTerm):
+        return term.min_count == 0 or is_nullable(term.child, nullable)
+    elif isinstance(term, AtomicTerm):
+        return is_nullable(term.child, nullable)
+    elif isinstance(term, GroupTerm):
+        return any(
+            all(is_nullable(c, nullable) for c in children)
+            for children in term.children_groups
+        )
+    else:
+        return True
+
+
+def _leading_references(
+    terms: typing.Sequence[Term],
+    nullable: typing.Set[RuleName]
+) -> typing.Iterator[RuleName]:
+    """Rules that the terms can match at the offset they start at"""
+    for term in terms:
+        if isinstance(term, RuleReference):
+            yield term.rule_name
+        elif isinstance(term, (RepeatTerm, AtomicTerm)):
+            yield from _leading_references([term.child], nullable)
+        elif isinstance(term, GroupTerm):
+            for children in term.children_groups:
+                yield from _leading_references(children, nullable)
+        if not is_nullable(term, nullable):
+            return
+
+
+def _leading_terminals(
+    terms: typing.Sequence[Term],
+    nullable: typing.Set[RuleName]
+) -> typing.Iterator[Term]:
+    """Terms other than rule references that can match the first character"""
+    for term in terms:
+        if isinstance(term, (RepeatTerm, AtomicTerm)):
+            yield from _leading_terminals([term.child], nullable)
+        elif isinstance(term, GroupTerm):
+            for children in term.children_groups:
+                yield from _leading_terminals(children, nullable)
+        elif not isinstance(term, (RuleReference, EOFTerm, CutTerm)):
+            yield term
+        if not is_nullable(term, nullable):
+            return
+
+
+def left_recursive_rules(lang: 'Language') -> typing.Set[RuleName]:
+    """Rules that can be reached from themselves without consuming text"""
+    leading = _left_calls(lang)
+    return {
+        name
+        for component in _components(leading)
+        for name in component
+        if len(component) > 1 or name in leading[name]
+    }
+
+
+def mutually_left_recursive_rules(
+    lang: 'Language'
+) -> typing.Set[RuleName]:
+    """Left recursive rules that are reached from themselves through others"""
+    return {
+        name
+        for component in _components(_left_calls(lang))
+        if len(component) > 1
+        for name in component
+    }
+
+
+def _left_calls(
+    lang: 'Language'
+) -> typing.Dict[RuleName, typing.Set[RuleName]]:
+    """Rules that each rule can call without consuming text"""
+    if not all(_is_known(t) for t in _terms(lang)):
+        # terms that match themselves could call back into any rule
+        return {name: set(lang.rules) for name in lang.rules}
+    return _leading_rules(lang, lang.nullable())
+
+
+def _leading_rules(
+    lang: 'Language',
+    nullable: typing.Set[RuleName]
+) -> typing.Dict[RuleName, typing.Set[RuleName]]:
+    return {
+        rule.name: {
+            name
+            for term_group in rule.syntax.term_groups
+            for name in _leading_references(term_group.terms, nullable)
+            if name in lang.rules
+        }
+        for rule in lang.rules.values()
+    }
+
+
+def _components(
+    graph: typing.Mapping[RuleName, typing.AbstractSet[RuleName]]
+) -> typing.List[typing.List[RuleName]]:
+    """Strongly connected components of the graph, found by Tarjan's
+    algorithm with an explicit stack
+
+    every component comes after the components that it reaches
+    """
+    order: typing.Dict[RuleName, int] = dict()
+    low: typing.Dict[RuleName, int] = dict()
+    path: typing.List[RuleName] = []
+    on_path: typing.Set[RuleName] = set()
+    components = []
+    for root in graph:
+        if root in order:
+            continue
+        order[root] = low[root] = len(order)
+        path.append(root)
+        on_path.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            name, edges = work[-1]
+            for next_name in edges:
+                if next_name not in order:
+                    order[next_name] = low[next_name] = len(order)
+                    path.append(next_name)
+                    on_path.add(next_name)
+                    work.append((next_name, iter(graph[next_name])))
+                    break
+                if next_name in on_path:
+                    low[name] = min(low[name], order[next_name])
+            else:
+                work.pop()
+                if work:
+                    caller = work[-1][0]
+                    low[caller] = min(low[caller], low[name])
+                if low[name] == order[name]:
+                    # the rules on the path from this one up are its component
+                    start = len(path) - 1
+                    while path[start] != name:
+                        start -= 1
+                    component = path[start:]
+                    del path[start:]
+                    on_path.difference_update(component)
+                    components.append(component)
+    return components
+
+
+def is_literal_choice(rule: 'Rule') -> bool:
+    """Whether every term group is a single non empty case sensitive literal"""
+    return all(
+        len(term_group.terms) == 1
+        and isinstance(term_group.terms[0], Literal)
+        and term_group.terms[0].case_sensitive
+        and bool(term_group.terms[0].text)
+        for term_group in rule.syntax.term_groups
+    )
+
+
+def _reaches_cut(
+    terms: typing.Sequence[Term],
+    nullable: typing.Set[RuleName]
+) -> bool:
+    """Whether the terms can get to a cut of their own without consuming text
+
+    cuts in group terms only commit the group, so they are not counted
+    """
+    for term in terms:
+        if isinstance(term, CutTerm):
+            return True
+        elif not is_nullable(term, nullable):
+            return False
+    return False
+
+
+class _Start(object):
+    """FIRST set of one term group
+
+    a term group that can reach a cut at its first offset is `committing`:
+    the cut commits the rule whatever the next character is, so the term
+    group has to be tried before every character
+    """
+    __slots__ = ['nullable', 'committing', 'chars', 'references']
+
+    def __init__(
+        self,
+        terms: typing.Sequence[Term],
+        nullable: typing.Set[RuleName]
+    ) -> None:
+        self.nullable = all(is_nullable(t, nullable) for t in terms)
+        self.committing = _reaches_cut(terms, nullable)
+        self.chars = CharSet()
+        for term in _leading_terminals(terms, nullable):
+            self.chars.add(term)
+        self.references = set(_leading_references(terms, nullable))
+
+
+class Lookahead(object):
+    """Term groups of each rule that can match before a given character
+
+    every term group gets a FIRST set of the characters it can start with. a
+    term group is tried if it can match the empty string, if it can reach a
+    cut without consuming text, or if the next character is in its FIRST set,
+    and a rule where no term group is left fails right away. so a cut commits
+    its rule whether or not the lookahead is used. the answer for each
+    character is worked out the first time it is seen, and then kept in a
+    dispatch table per rule.
+    """
+    def __init__(self, lang: 'Language') -> None:
+        nullable = lang.nullable()
+        self._first = lang.first_sets()
+        self._starts = {
+            rule.name: [
+                _Start(term_group.terms, nullable)
+                for term_group in rule.syntax.term_groups
+            ]
+            for rule in lang.rules.values()
+        }
+        self._tables: typing.Dict[
+            RuleName,
+            typing.Dict[str, typing.Tuple[int, ...]]
+        ] = {rule_name: dict() for rule_name in self._starts}
+
+    def alternatives(
+        self,
+        rule_name: RuleName,
+        text: str,
+        pos: int
+    ) -> typing.Tuple[int, ...]:
+        """Indexes of the term groups that can match at pos"""
+        char = text[pos:pos + 1]
+        table = self._tables[rule_name]
+        indexes = table.get(char)
+        if indexes is None:
+            indexes = tuple(
+                index
+                for index, start in enumerate(self._starts[rule_name])
+                if start.nullable
+                or start.committing
+                or char in start.chars
+                or any(
+                    char in self._first[r]
+                    for r in start.references
+                    if r in self._first
+                )
+            )
+            table[char] = indexes
+        return indexes
+
+
+def ordered_choice_conflicts(lang: 'Language') -> Validity:
+    """Places where matching with ordered choice can lose matches
+
+    with the peg engine the first alternative that matches wins and repeats
+    never give back a repetition. that keeps every match of the whole text
+    if the grammar is LL(1): no two alternatives of a choice can start with
+    the same character, counting what can follow the choice for the ones
+    that can match the empty string, no alternative but the last can match
+    the empty string, and a repeat can not take a character that can follow
+    it. what can follow a rule is collected from every place it is
+    referenced. the check is conservative, so a grammar can lose nothing and
+    still be reported. the places are warnings, which leave the grammar valid
+    """
+    return _OrderedChoice(lang).conflicts()
+
+
+class _Follow(object):
+    """Characters that can come next, along with the rules whose FOLLOW sets
+    can come next as well
+    """
+    __slots__ = ['chars', 'rules']
+
+    def __init__(
+        self,
+        chars: CharSet,
+        rules: typing.AbstractSet[RuleName] = frozenset()
+    ) -> None:
+        self.chars = chars
+        self.rules = rules
+
+    def then(self, first: CharSet, nullable: bool) -> '_Follow':
+        """What can come next before terms that start with `first`"""
+        if not nullable:
+            return _Follow(first)
+        chars = CharSet()
+        chars.update(first)
+        chars.update(self.chars)
+        return _Follow(chars, self.rules)
+
+
+class _OrderedChoice(object):
+    def __init__(self, lang: 'Language') -> None:
+        self._lang = lang
+        self._nullable = lang.nullable()
+        self._first = lang.first_sets()
+        # what follows each rule where it is referenced, resolved once every
+        # rule has been walked
+        self._follow_chars: typing.Dict[RuleName, CharSet] = dict()
+        self._follow_rules: typing.Dict[RuleName, typing.Set[RuleName]] = (
+            dict()
+        )
+        self._follow: typing.Dict[RuleName, CharSet] = dict()
+        # a message, and the two sets that must not overlap for it to be
+        # left out. None stands for a message that is always reported
+        self._checks: typing.List[
+            typing.Tuple[str, typing.Optional[typing.Tuple[_Follow, _Follow]]]
+        ] = []
+
+    def conflicts(self) -> Validity:
+        for rule in self._lang.rules.values():
+            if rule.token:
+                continue
+            self._choice(
+                'rule {0!r}'.format(rule.name),
+                [term_group.terms for term_group in rule.syntax.term_groups],
+                _Follow(CharSet(), {rule.name})
+            )
+        self._resolve_follow()
+        return Validity([], [
+            message
+            for message, sets in self._checks
+            if sets is None
+            or self._resolve(sets[0]).overlaps(self._resolve(sets[1]))
+        ])
+
+    def _choice(
+        self,
+        where: str,
+        alternatives: typing.Sequence[typing.Sequence[Term]],
+        follow: _Follow
+    ) -> None:
+        starts = [
+            follow.then(
+                self._first_of(terms),
+                all(is_nullable(t, self._nullable) for t in terms)
+            )
+            for terms in alternatives
+        ]
+        for i, terms in enumerate(alternatives):
+            if i < len(alternatives) - 1 and all(
+                is_nullable(t, self._nullable) for t in terms
+            ):
+                self._checks.append((
+                    '{0}: alternative {1} can match the empty string, so the '
+                    'alternatives after it are skipped where it does'
+                    .format(where, i),
+                    None
+                ))
+            for j in range(i + 1, len(alternatives)):
+                self._checks.append((
+                    '{0}: alternatives {1} and {2} can start with the same '
+                    'character, so {2} is only tried where {1} fails'
+                    .format(where, i, j),
+                    (starts[i], starts[j])
+                ))
+            self._sequence(where, terms, follow)
+
+    def _sequence(
+        self,
+        where: str,
+        terms: typing.Sequence[Term],
+        follow: _Follow
+    ) -> None:
+        # what follows each term, from the last one back
+        for index in range(len(terms) - 1, -1, -1):
+            term = terms[index]
+            if isinstance(term, RuleReference):
+                self._follow_chars.setdefault(term.rule_name, CharSet()).update(
+                    follow.chars
+                )
+                self._follow_rules.setdefault(term.rule_name, set()).update(
+                    follow.rules
+                )
+            elif isinstance(term, RepeatTerm):
+                child = self._first_of([term.child])
+                if is_nullable(term.child, self._nullable):
+                    self._checks.append((
+                        '{0}: the repeat at term {1} can repeat the empty '
+                        'string'.format(where, index),
+                        None
+                    ))
+                elif term.max_count != term.min_count:
+                    self._checks.append((
+                        '{0}: the repeat at term {1} can take the text that '
+                        'can follow it'.format(where, index),
+                        (_Follow(child), follow)
+                    ))
+                # another repetition can follow the child
+                self._sequence(where, [term.child], follow.then(child, True))
+            elif isinstance(term, AtomicTerm):
+                self._sequence(where, [term.child], follow)
+            elif isinstance(term, GroupTerm):
+                self._choice(
+                    '{0} group at term {1}'.format(where, index),
+                    term.children_groups,
+                    follow
+                )
+            follow = follow.then(
+                self._first_of([term]),
+                is_nullable(term, self._nullable)
+            )
+
+    def _resolve_follow(self) -> None:
+        """FOLLOW sets of the rules, made of what follows their references
+
+        the text ends after the root rule, so it starts out empty
+        """
+        for rule_name in self._follow_chars:
+            chars = CharSet()
+            seen = {rule_name}
+            stack = [rule_name]
+            while stack:
+                name = stack.pop()
+                chars.update(self._follow_chars.get(name, CharSet()))
+                for next_name in self._follow_rules.get(name, set()) - seen:
+                    seen.add(next_name)
+                    stack.append(next_name)
+            self._follow[rule_name] = chars
+
+    def _resolve(self, follow: _Follow) -> CharSet:
+        chars = CharSet()
+        chars.update(follow.chars)
+        for rule_name in follow.rules:
+            chars.update(self._follow.get(rule_name, CharSet()))
+        return chars
+
+    def _first_of(self, terms: typing.Sequence[Term]) -> CharSet:
+        return _first_of(terms, self._first, self._nullable)
+
+
+def _first_of(
+    terms: typing.Sequence[Term],
+    first: typing.Mapping[RuleName, CharSet],
+    nullable: typing.Set[RuleName]
+) -> CharSet:
+    """Characters that the terms can start with"""
+    chars = CharSet()
+    for term in _leading_terminals(terms, nullable):
+        chars.add(term)
+    for rule_name in _leading_references(terms, nullable):
+        if rule_name in first:
+            chars.update(first[rule_name])
+    return chars
+
+
+def first_sets(lang: 'Language') -> typing.Dict[RuleName, CharSet]:
+    """Characters that each rule can start with
+
+    the rules that call each other without consuming text share a FIRST set,
+    which is made once from the sets of the rules they call
+    """
+    nullable = lang.nullable()
+    leading = _leading_rules(lang, nullable)
+    first: typing.Dict[RuleName, CharSet] = dict()
+    for component in _components(leading):
+        chars = CharSet()
+        for rule_name in component:
+            for term_group in lang.rules[rule_name].syntax.term_groups:
+                for term in _leading_terminals(term_group.terms, nullable):
+                    chars.add(term)
+            for name in leading[rule_name]:
+                if name in first:
+                    chars.update(first[name])
+        for rule_name in component:
+            first[rule_name] = chars
+    return first
+
+
+def regular_pattern(
+    lang: 'Language',
+    rule_name: RuleName
+) -> typing.Optional[str]:
+    """Regular expression for a rule that does not reach itself
+
+    rule references are inlined, so the rule must not be recursive. repeats
+    are greedy and term groups are tried in order like in any `re` pattern.
+    returns None if the rule is not regular.
+    """
+    return _RegularPatterns(lang).rule(rule_name)
+
+
+def longest_pattern(
+    lang: 'Language',
+    rule_name: RuleName
+) -> typing.Optional[str]:
+    """Regular expression that matches the longest text the rule can match
+
+    `re` takes the first alternative and the most repetitions that let the
+    rest of the pattern match, which can be shorter than the longest match.
+    the alternatives are ordered so that it is not: the longest of literals
+    that are prefixes of each other comes first and an alternative that can
+    match the empty string comes last. that is only enough when the rule is
+    LL(1) inside the lexeme, so a ValueError says where it is not. returns
+    None if the rule is not regular.
+    """
+    return _RegularPatterns(lang, True).rule(rule_name)
+
+
+class _RegularPatterns(object):
+    def __init__(self, lang: 'Language', longest: bool = False) -> None:
+        self._lang = lang
+        self._longest = longest
+        self._active: typing.Set[RuleName] = set()
+        if longest:
+            self._nullable = lang.nullable()
+            self._first = lang.first_sets()
+
+    def rule(
+        self,
+        rule_name: RuleName,
+        follow: typing.Optional[CharSet] = None
+    ) -> typing.Optional[str]:
+        if rule_name in self._active or rule_name not in self._lang.rules:
+            return None
+        self._active.add(rule_name)
+        try:
+            return self._choice(
+                'rule {0!r}'.format(rule_name),
+                [
+                    term_group.terms
+                    for term_group in self._lang.get_rule(rule_name)
+                    .syntax.term_groups
+                ],
+                follow or CharSet()
+            )
+        finally:
+            self._active.remove(rule_name)
+
+    def _choice(
+        self,
+        where: str,
+        alternatives: typing.Sequence[typing.Sequence[Term]],
+        follow: CharSet
+    ) -> typing.Optional[str]:
+        patterns = []
+        for terms in self._ordered(where, alternatives, follow):
+            parts = []
+            for index, term in enumerate(terms):
+                part = self._term(
+                    where,
+                    index,
+                    term,
+                    self._follow(terms[index + 1:], follow)
+                )
+                if part is None:
+                    return None
+                parts.append(part)
+            patterns.append(''.join(parts))
+        return '(?:{0})'.format('|'.join(patterns))
+
+    def _ordered(
+        self,
+        where: str,
+        alternatives: typing.Sequence[typing.Sequence[Term]],
+        follow: CharSet
+    ) -> typing.Sequence[typing.Sequence[Term]]:
+        if not self._longest:
+            return alternatives
+        texts = [_literal_text(terms) for terms in alternatives]
+        empty = [
+            all(is_nullable(t, self._nullable) for t in terms)
+            for terms in alternatives
+        ]
+        starts = [self._follow(terms, follow) for terms in alternatives]
+        for i in range(len(alternatives)):
+            for j in range(i + 1, len(alternatives)):
+                first, second = texts[i], texts[j]
+                if first is not None and second is not None:
+                    shorter, longer = sorted((first, second), key=len)
+                    if longer.startswith(shorter) and (
+                        shorter == longer or longer[len(shorter)] in follow
+                    ):
+                        raise ValueError(
+                            '{0}: alternatives {1} and {2} can match the '
+                            'same text'.format(where, i, j)
+                        )
+                elif empty[i] and empty[j]:
+                    raise ValueError(
+                        '{0}: alternatives {1} and {2} can both match the '
+                        'empty string'.format(where, i, j)
+                    )
+                elif starts[i].overlaps(starts[j]):
+                    raise ValueError(
+                        '{0}: alternatives {1} and {2} can start with the '
+                        'same character'.format(where, i, j)
+                    )
+        return [
+            alternatives[i]
+            for i in sorted(
+                range(len(alternatives)),
+                key=lambda i: (empty[i], -len(texts[i] or ''))
+            )
+        ]
+
+    def _follow(
+        self,
+        terms: typing.Sequence[Term],
+        follow: CharSet
+    ) -> CharSet:
+        """Characters that can come after the terms before `terms`"""
+        if not self._longest:
+            return follow
+        chars = _first_of(terms, self._first, self._nullable)
+        if all(is_nullable(t, self._nullable) for t in terms):
+            chars.update(follow)
+        return chars
+
+    def _term(  # pylint: disable=too-many-return-statements
+        self,
+        where: str,
+        index: int,
+        term: Term,
+        follow: CharSet
+    ) -> typing.Optional[str]:
+        if isinstance(term, RuleReference):
+            return self.rule(term.rule_name, follow)
+        elif isinstance(term, Literal):
+            if term.case_sensitive:
+                return re.escape(term.text)
+            return '(?i:{0})'.format(re.escape(term.text))
+        elif isinstance(term, LiteralRange):
+            return '[\\U{0:08x}-\\U{1:08x}]'.format(
+                term.min_value,
+                term.max_value
+            )
+        elif isinstance(term, EOFTerm):
+            return '\\Z'
+        elif isinstance(term, RepeatTerm):
+            # re only has possessive repeats from python 3.11 on
+            if term.possessive:
+                return None
+            if self._longest:
+                self._check_repeat(where, index, term, follow)
+            child = self._term(
+                where,
+                index,
+                term.child,
+                self._follow([term.child], follow)
+            )
+            if child is None:
+                return None
+            return '(?:{0}){{{1},{2}}}'.format(
+                child,
+                term.min_count,
+                '' if term.max_count is None else term.max_count
+            )
+        elif isinstance(term, GroupTerm):
+            return self._choice(
+                '{0} group at term {1}'.format(where, index),
+                term.children_groups,
+                follow
+            )
+        else:
+            return None
+
+    def _check_repeat(
+        self,
+        where: str,
+        index: int,
+        term: RepeatTerm,
+        follow: CharSet
+    ) -> None:
+        if is_nullable(term.child, self._nullable):
+            raise ValueError(
+                '{0}: the repeat at term {1} can repeat the empty string'
+                .format(where, index)
+            )
+        elif term.max_count != term.min_count and _first_of(
+            [term.child], self._first, self._nullable
+        ).overlaps(follow):
+            raise ValueError(
+                '{0}: the repeat at term {1} can take the text that can '
+                'follow it'.format(where, index)
+            )
+
+
+def _literal_text(terms: typing.Sequence[Term]) -> typing.Optional[str]:
+    """Text of a term list that is one non empty case sensitive literal"""
+    if len(terms) == 1 and isinstance(terms[0], Literal):
+        literal = terms[0]
+        if literal.case_sensitive and literal.text:
+            return literal.text
+    return None
@@ -0,0 +1,239 @@
+"""Sets and runs of single characters
+
+a CharSet is what a FIRST set is made of, and a CharRun scans a repeat of
+single characters with one regular expression instead of matching its child
+once per character.
+"""
+import re
+import typing
+
+from .memo import RuleName
+from .terms import (
+    GroupTerm,
+    Literal,
+    LiteralRange,
+    RepeatTerm,
+    RuleReference,
+    Term,
+)
+from .tree import LiteralNode, MultiNode, Node, RuleNode
+if typing.TYPE_CHECKING:
+    from .grammar import Language  # pylint: disable=unused-import
+
+
+class CharSet(object):
+    """Characters that a match can start with"""
+    def __init__(self) -> None:
+        self.chars: typing.Set[str] = set()
+        self.ranges: typing.List[typing.Tuple[int, int]] = []
+        self.folded: typing.Set[str] = set()
+        self.any_char = False
+
+    def add(self, term: Term) -> None:
+        if isinstance(term, Literal) and not term.text:
+            return
+        elif isinstance(term, Literal):
+            if term.case_sensitive:
+                self.chars.add(term.text[0])
+            else:
+                self.folded.add(term.text.lower())
+        elif isinstance(term, LiteralRange):
+            self.ranges.append((term.min_value, term.max_value))
+        else:
+            self.any_char = True
+
+    def update(self, other: 'CharSet') -> None:
+        self.chars |= other.chars
+        # FIRST sets are unions along chains of rules, so ranges that are
+        # already here are left out rather than piling up
+        known = set(self.ranges)
+        self.ranges.extend(r for r in other.ranges if r not in known)
+        self.folded |= other.folded
+        self.any_char = self.any_char or other.any_char
+
+    def is_empty(self) -> bool:
+        return not (self.chars or self.ranges or self.folded or self.any_char)
+
+    def overlaps(self, other: 'CharSet') -> bool:
+        """Whether some character can start both sets, erring towards yes"""
+        if self.is_empty() or other.is_empty():
+            return False
+        elif self.any_char or other.any_char:
+            return True
+        elif any(
+            a_low <= b_high and b_low <= a_high
+            for a_low, a_high in self.ranges
+            for b_low, b_high in other.ranges
+        ):
+            return True
+        for first, second in ((self, other), (other, self)):
+            if any(char in second for char in first.chars):
+                return True
+            elif any(
+                char in second
+                for folded in first.folded
+                for char in (folded[0], folded[0].upper())
+            ):
+                return True
+        return False
+
+    def __contains__(self, char: object) -> bool:
+        if not isinstance(char, str) or not char:
+            return False
+        elif self.any_char or char in self.chars:
+            return True
+        code = ord(char)
+        if any(low <= code <= high for low, high in self.ranges):
+            return True
+        # a case insensitive literal compares the lowered text, and lowering
+        # can turn one character into several
+        lowered = char.lower()
+        return any(f.startswith(lowered) for f in self.folded)
+
+
+
+# wraps the LiteralNode of one scanned character into the node that the
+# repeated term would have produced for it
+_Wrap = typing.Callable[[LiteralNode], Node]
+
+
+class CharRun(object):
+    """Repeat of a term that always matches exactly one character
+
+    the child of the repeat is a single character literal, a literal range,
+    or a choice between them that is either a group or a referenced rule.
+    the choices must not overlap, so every character has one derivation and
+    the longest run can be scanned with one regular expression. `rules` has
+    the rule and term group that each choice is derived through, if any.
+    """
+    __slots__ = ['pattern', 'rules', '_choices', '_wraps', '_indexes']
+
+    def __init__(
+        self,
+        choices: typing.Sequence[typing.Sequence[typing.Tuple[int, int]]],
+        wraps: typing.Sequence[_Wrap],
+        max_count: typing.Optional[int],
+        rules: typing.Optional[
+            typing.Sequence[typing.Optional[typing.Tuple[RuleName, int]]]
+        ] = None
+    ) -> None:
+        self.pattern = re.compile(
+            '[{0}]{{0,{1}}}'.format(
+                ''.join(
+                    '\\U{0:08x}-\\U{1:08x}'.format(low, high)
+                    for intervals in choices
+                    for low, high in intervals
+                ),
+                '' if max_count is None else max_count
+            )
+        )
+        self.rules = rules or [None] * len(choices)
+        self._choices = choices
+        self._wraps = wraps
+        self._indexes: typing.Dict[str, int] = dict()
+
+    def scan(self, text: str, pos: int) -> int:
+        """End of the longest run that starts at pos"""
+        match = self.pattern.match(text, pos)
+        return pos if match is None else match.end()
+
+    def nodes(self, run: str) -> typing.List[Node]:
+        if len(self._wraps) == 1:
+            wrap = self._wraps[0]
+            return [wrap(LiteralNode(char)) for char in run]
+        return [
+            self._wraps[self.choice(char)](LiteralNode(char)) for char in run
+        ]
+
+    @property
+    def nodes_per_char(self) -> int:
+        """Number of nodes that `nodes` makes for every character"""
+        return 1 if self._wraps[0] is _leaf else 2
+
+    def choice(self, char: str) -> int:
+        """Index of the choice that matches a character of a run"""
+        index = self._indexes.get(char)
+        if index is None:
+            code = ord(char)
+            index = next(
+                i for i, intervals in enumerate(self._choices)
+                if any(low <= code <= high for low, high in intervals)
+            )
+            self._indexes[char] = index
+        return index
+
+
+def char_run(
+    lang: 'Language',
+    term: RepeatTerm
+) -> typing.Optional[CharRun]:
+    """CharRun for a repeat, or None if its child can match more than one way"""
+    child = term.child
+    if isinstance(child, RuleReference):
+        rule = lang.rules.get(child.rule_name)
+        if rule is None:
+            return None
+        choices = [term_group.terms for term_group in rule.syntax.term_groups]
+        rules: typing.List[typing.Optional[typing.Tuple[RuleName, int]]] = (
+            [None] * len(choices)
+        )
+        if rule.token:
+            wraps: typing.List[_Wrap] = [_leaf] * len(choices)
+        else:
+            wraps = [
+                _rule_wrap(rule.name, index) for index in range(len(choices))
+            ]
+            rules = [(rule.name, index) for index in range(len(choices))]
+    elif isinstance(child, GroupTerm):
+        choices = list(child.children_groups)
+        wraps = [
+            _group_wrap(index, len(choices)) for index in range(len(choices))
+        ]
+        rules = [None] * len(choices)
+    else:
+        choices = [[child]]
+        wraps = [_leaf]
+        rules = [None]
+    if not choices:
+        return None
+    intervals = [
+        _char_intervals(terms[0]) if len(terms) == 1 else None
+        for terms in choices
+    ]
+    if any(i is None for i in intervals):
+        return None
+    known = typing.cast(
+        typing.List[typing.List[typing.Tuple[int, int]]],
+        intervals
+    )
+    flat = sorted(i for choice in known for i in choice)
+    if any(a[1] >= b[0] for a, b in zip(flat, flat[1:])):
+        return None
+    return CharRun(known, wraps, term.max_count, rules)
+
+
+def _char_intervals(
+    term: Term
+) -> typing.Optional[typing.List[typing.Tuple[int, int]]]:
+    if isinstance(term, LiteralRange):
+        if term.min_value > term.max_value:
+            return None
+        return [(term.min_value, term.max_value)]
+    elif isinstance(term, Literal) and len(term.text) == 1:
+        # only characters without case are safe to fold, other characters
+        # can have lower case forms outside of the obvious pair
+        if term.case_sensitive or term.text.lower() == term.text.upper():
+            return [(ord(term.text), ord(term.text))]
+    return None
+
+
+def _leaf(node: LiteralNode) -> Node:
+    return node
+
+
+def _rule_wrap(rule_name: RuleName, index: int) -> _Wrap:
+    return lambda node: RuleNode(rule_name, index, (node,))
+
+
+def _group_wrap(index: int, size: int) -> _Wrap:
+    return lambda node: MultiNode([node], (index, size))
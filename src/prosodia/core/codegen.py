@@ -0,0 +1,585 @@
+"""Ahead of time parser generator
+
+generate_module turns a Language into the source of a python module with a
+packrat parser that is specialized for that language. the generated parser
+finds the same matches in the same order as Language.parse and builds the
+same prosodia.core.tree nodes, but it does not need the Language at runtime.
+"""
+import typing
+
+from . import analysis, chars
+from . import grammar as g
+
+# longer term groups are split into helper functions, since python limits how
+# deeply loops can be nested
+_MAX_TERMS = 16
+
+_Final = typing.Callable[[str, typing.Sequence[str]], str]
+
+_HEADER = '''"""Parser for the {root!r} rule
+
+generated by prosodia.core.codegen, do not edit
+"""
+import re
+
+from prosodia.core.grammar import (
+    ALL_MATCHES,
+    MatchCache,
+    NoMatches,
+    TooManyMatches,
+    select_match,
+)
+from prosodia.core.tree import (
+    LinkedNodes,
+    LiteralNode,
+    MultiNode,
+    PrefixNodes,
+    RuleNode,
+)
+
+ROOT_RULE = {root!r}
+
+
+def parse(text, allow_partial_matches=True, cache=None, policy=ALL_MATCHES):
+    if cache is None:
+        cache = MatchCache()
+    try:
+        return select_match(
+            matches(text, allow_partial_matches, cache),
+            len(text),
+            policy
+        )
+    except TooManyMatches as error:
+        error.ambiguity = cache.ambiguity(error.found)
+        raise
+    except NoMatches:
+        raise NoMatches(text, cache.farthest, cache.expected) from None
+
+
+def parse_all(text, allow_partial_matches=True, cache=None):
+    for _, node in matches(text, allow_partial_matches, cache):
+        yield node
+
+
+def matches(text, allow_partial_matches=True, cache=None):
+    if cache is None:
+        cache = MatchCache()
+    for end, node in {root_ref}(text, 0, cache):
+        if allow_partial_matches or end == len(text):
+            yield end, node
+        elif end >= cache.farthest:
+            cache.expect(end, 'end of text')
+'''
+
+
+def generate_module(lang: g.Language) -> str:
+    """Source of a module with parse and parse_all functions for the language
+
+    raises ValueError if a rule has a cut, since the generated parser does
+    not commit its alternatives or drop the memo like Language.parse does
+    """
+    cut_rules = sorted(
+        rule.name for rule in lang.rules.values()
+        if any(_has_cut(t) for t in analysis.rule_terms(rule))
+    )
+    if cut_rules:
+        raise ValueError(
+            'cannot generate a parser for rules with cuts: {0}'.format(
+                ', '.join(cut_rules)
+            )
+        )
+    return _ModuleWriter(lang).write()
+
+
+def write_module(lang: g.Language, path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(generate_module(lang))
+
+
+def _has_cut(term: g.Term) -> bool:
+    if isinstance(term, g.CutTerm):
+        return True
+    elif isinstance(term, (g.RepeatTerm, g.AtomicTerm)):
+        return _has_cut(term.child)
+    elif isinstance(term, g.GroupTerm):
+        return any(
+            _has_cut(child)
+            for children in term.children_groups
+            for child in children
+        )
+    return False
+
+
+class _Function(object):
+    """Source lines of one generated function"""
+    def __init__(self, signature: str) -> None:
+        self.lines = ['def {0}:'.format(signature)]
+        self._names = 0
+
+    def add(self, indent: int, line: str) -> None:
+        self.lines.append('    ' * indent + line)
+
+    def names(self, *prefixes: str) -> typing.List[str]:
+        """Fresh local variable names that share a number"""
+        self._names += 1
+        return ['{0}{1}'.format(p, self._names) for p in prefixes]
+
+    def source(self) -> str:
+        return '\n'.join(self.lines) + '\n'
+
+
+def _note_failures(
+    func: _Function,
+    failures: typing.Sequence[typing.Tuple[int, str, g.Term]]
+) -> None:
+    """Add the elif branches that note the terminals that failed to match"""
+    for level, start, term in reversed(failures):
+        func.add(level, 'elif {0} >= cache.farthest:'.format(start))
+        func.add(
+            level + 1,
+            'cache.expect({0}, {1!r})'.format(
+                start,
+                g.describe_expected(term)
+            )
+        )
+
+
+class _ModuleWriter(object):
+    def __init__(self, lang: g.Language) -> None:
+        self._lang = lang
+        self._recursive = analysis.left_recursive_rules(lang)
+        self._rule_ids: typing.Dict[g.RuleName, int] = dict()
+        self._pending: typing.List[g.RuleName] = []
+        self._blocks: typing.List[str] = []
+        self._helpers = 0
+
+    def write(self) -> str:
+        root_ref = self._reference(self._lang.root_rule)
+        while self._pending:
+            self._write_rule(self._lang.get_rule(self._pending.pop(0)))
+        header = _HEADER.format(root=self._lang.root_rule, root_ref=root_ref)
+        return '\n\n'.join([header] + self._blocks)
+
+    def _reference(self, rule_name: g.RuleName) -> str:
+        rule_id = self._rule_ids.get(rule_name)
+        if rule_id is None:
+            if rule_name not in self._lang.rules:
+                raise ValueError(
+                    'rule reference points to a rule that does not exist: '
+                    '{0!r}'.format(rule_name)
+                )
+            rule_id = len(self._rule_ids)
+            self._rule_ids[rule_name] = rule_id
+            self._pending.append(rule_name)
+        return '_ref_{0}'.format(rule_id)
+
+    def _write_rule(self, rule: g.Rule) -> None:
+        rule_id = self._rule_ids[rule.name]
+        if rule.token:
+            self._write_token(rule, rule_id)
+            return
+        elif analysis.is_literal_choice(rule):
+            self._write_literal_choice(rule, rule_id)
+        else:
+            func = _Function('_rule_{0}(text, pos, cache)'.format(rule_id))
+            func.add(1, '# {0}'.format(rule.name))
+            func.add(1, 'matches = []')
+            for index, term_group in enumerate(rule.syntax.term_groups):
+                self._sequence(
+                    func,
+                    term_group.terms,
+                    'pos',
+                    1,
+                    _final(
+                        'matches.append(({end}, RuleNode({name!r}, {index}, '
+                        '{tuple})))',
+                        name=rule.name,
+                        index=index
+                    )
+                )
+            func.add(1, 'return matches')
+            self._blocks.append(func.source())
+        self._blocks.append(self._memo(rule, rule_id))
+
+    def _write_token(self, rule: g.Rule, rule_id: int) -> None:
+        pattern = self._lang.token_pattern(rule.name).pattern
+        self._blocks.append(
+            '# {name}\n'
+            '_TOKEN_{rule_id} = re.compile({pattern!r})\n'
+            '\n'
+            '\n'
+            'def _ref_{rule_id}(text, pos, cache):\n'
+            '    lexeme = _TOKEN_{rule_id}.match(text, pos)\n'
+            '    if lexeme is None:\n'
+            '        if pos >= cache.farthest:\n'
+            '            cache.expect(pos, {name!r})\n'
+            '        return ()\n'
+            '    return ((lexeme.end(), LiteralNode(lexeme.group())),)\n'
+            .format(name=rule.name, rule_id=rule_id, pattern=pattern)
+        )
+
+    def _write_literal_choice(self, rule: g.Rule, rule_id: int) -> None:
+        by_first: typing.Dict[str, typing.List[typing.Tuple[int, str]]] = (
+            dict()
+        )
+        for index, term_group in enumerate(rule.syntax.term_groups):
+            literal = typing.cast(g.Literal, term_group.terms[0]).text
+            by_first.setdefault(literal[0], []).append((index, literal))
+        table = ''.join(
+            '\n    {0!r}: {1!r},'.format(first, tuple(choices))
+            for first, choices in by_first.items()
+        )
+        self._blocks.append(
+            '# {name}\n'
+            '_CHOICES_{rule_id} = {{{table}\n}}\n'
+            '\n'
+            '\n'
+            'def _rule_{rule_id}(text, pos, cache):\n'
+            '    matches = [\n'
+            '        (\n'
+            '            pos + len(literal),\n'
+            '            RuleNode({name!r}, index, (LiteralNode(literal),))\n'
+            '        )\n'
+            '        for index, literal in _CHOICES_{rule_id}.get(\n'
+            '            text[pos:pos + 1],\n'
+            '            ()\n'
+            '        )\n'
+            '        if text.startswith(literal, pos)\n'
+            '    ]\n'
+            '    if not matches and pos >= cache.farthest:\n'
+            '        cache.expect(pos, {name!r})\n'
+            '    return matches\n'.format(name=rule.name, rule_id=rule_id, table=table)
+        )
+
+    def _memo(self, rule: g.Rule, rule_id: int) -> str:
+        if analysis.is_terminal_rule(rule):
+            # scanning a few characters again is cheaper than the memo
+            return '_ref_{0} = _rule_{0}\n'.format(rule_id)
+        elif rule.name in self._recursive:
+            return (
+                'def _lazy_{rule_id}(text, pos, lang, cache):\n'
+                '    yield from _rule_{rule_id}(text, pos, cache)\n'
+                '\n'
+                '\n'
+                'def _ref_{rule_id}(text, pos, cache):\n'
+                '    return cache.match_with(\n'
+                '        {name!r},\n'
+                '        _lazy_{rule_id},\n'
+                '        text,\n'
+                '        pos,\n'
+                '        None,\n'
+                '        {eager}\n'
+                '    )\n'.format(
+                    name=rule.name,
+                    rule_id=rule_id,
+                    eager=rule.name in self._lang.mutually_left_recursive()
+                )
+            )
+        else:
+            return (
+                'def _ref_{rule_id}(text, pos, cache):\n'
+                '    key = {name!r}, pos\n'
+                '    results = cache.finished.get(key)\n'
+                '    if results is None:\n'
+                '        results = _rule_{rule_id}(text, pos, cache)\n'
+                '        cache.finish(key, results)\n'
+                '    else:\n'
+                '        cache.saved_invocations += 1\n'
+                '    return results\n'.format(name=rule.name, rule_id=rule_id)
+            )
+
+    def _helper(self, prefix: str) -> str:
+        self._helpers += 1
+        return '_{0}_{1}'.format(prefix, self._helpers)
+
+    def _sequence(
+        self,
+        func: _Function,
+        terms: typing.Sequence[g.Term],
+        pos: str,
+        indent: int,
+        final: _Final
+    ) -> None:
+        """Add code that runs `final` for every match of the terms"""
+        if len(terms) > _MAX_TERMS:
+            rest = self._write_rest(terms[_MAX_TERMS - 1:])
+            terms = terms[:_MAX_TERMS - 1]
+        else:
+            rest = None
+        nodes = []
+        # terminals are matched with an if statement, which gets an elif that
+        # notes the failure once everything nested in it has been added
+        failures: typing.List[typing.Tuple[int, str, g.Term]] = []
+        for term in terms:
+            start = pos
+            pos, node, inner = self._term(func, term, pos, indent)
+            nodes.append(node)
+            if isinstance(term, (g.Literal, g.LiteralRange, g.EOFTerm)):
+                failures.append((indent, start, term))
+            indent = inner
+        if rest is not None:
+            end, nodes_name = func.names('p', 't')
+            func.add(
+                indent,
+                'for {0}, {1} in {2}(text, {3}, cache):'.format(
+                    end, nodes_name, rest, pos
+                )
+            )
+            pos = end
+            nodes.append('*' + nodes_name)
+            indent += 1
+        func.add(indent, final(pos, nodes))
+        _note_failures(func, failures)
+
+    def _write_rest(self, terms: typing.Sequence[g.Term]) -> str:
+        """Helper function that matches the terms that follow a split"""
+        rest = self._helper('sequence')
+        rest_func = _Function('{0}(text, pos, cache)'.format(rest))
+        rest_func.add(1, 'matches = []')
+        self._sequence(
+            rest_func,
+            terms,
+            'pos',
+            1,
+            _final('matches.append(({end}, {tuple}))')
+        )
+        rest_func.add(1, 'return matches')
+        self._blocks.append(rest_func.source())
+        return rest
+
+    def _term(
+        self,
+        func: _Function,
+        term: g.Term,
+        pos: str,
+        indent: int
+    ) -> typing.Tuple[str, str, int]:
+        """Add code that matches a term, returning its end and node names"""
+        end, node = func.names('p', 'n')
+        if isinstance(term, g.Literal):
+            size = len(term.text)
+            if term.case_sensitive:
+                condition = 'text.startswith({0!r}, {1})'.format(
+                    term.text, pos
+                )
+            else:
+                condition = 'text[{0}:{0} + {1}].lower() == {2!r}'.format(
+                    pos, size, term.text.lower()
+                )
+            func.add(indent, 'if {0}:'.format(condition))
+            func.add(indent + 1, '{0} = {1} + {2}'.format(end, pos, size))
+            func.add(
+                indent + 1,
+                '{0} = LiteralNode({1!r})'.format(node, term.text)
+            )
+            return end, node, indent + 1
+        elif isinstance(term, g.LiteralRange):
+            func.add(
+                indent,
+                'if {0} < len(text) and {1} <= ord(text[{0}]) <= {2}:'.format(
+                    pos, term.min_value, term.max_value
+                )
+            )
+            func.add(indent + 1, '{0} = {1} + 1'.format(end, pos))
+            func.add(
+                indent + 1,
+                '{0} = LiteralNode(text[{1}])'.format(node, pos)
+            )
+            return end, node, indent + 1
+        elif isinstance(term, g.EOFTerm):
+            func.add(indent, 'if {0} == len(text):'.format(pos))
+            func.add(indent + 1, "{0} = LiteralNode('')".format(node))
+            return pos, node, indent + 1
+        elif isinstance(term, g.RuleReference):
+            matcher = self._reference(term.rule_name)
+        elif isinstance(term, g.RepeatTerm):
+            matcher = self._write_repeat(term)
+        elif isinstance(term, g.GroupTerm):
+            matcher = self._write_group(term)
+        elif isinstance(term, g.AtomicTerm):
+            matcher = self._write_atomic(term)
+        else:
+            raise TypeError('cannot generate code for {0!r}'.format(term))
+        func.add(
+            indent,
+            'for {0}, {1} in {2}(text, {3}, cache):'.format(
+                end, node, matcher, pos
+            )
+        )
+        return end, node, indent + 1
+
+    def _write_repeat(self, term: g.RepeatTerm) -> str:
+        run = self._lang.char_run(term)
+        if run is not None:
+            return self._write_char_run(term, run)
+        elif term.possessive:
+            return self._write_possessive(term)
+        name = self._helper('repeat')
+        func = _Function('{0}(text, pos, cache)'.format(name))
+        func.add(1, '# {0!r}'.format(term))
+        func.add(1, 'matches = []')
+        func.add(1, 'queue = [(pos, 0, None)]')
+        func.add(1, 'for start, count, links in queue:')
+        func.add(2, 'if count >= {0}:'.format(term.min_count))
+        func.add(
+            3,
+            'matches.append((start, MultiNode(LinkedNodes(links, count))))'
+        )
+        if term.max_count is None:
+            indent = 2
+        else:
+            func.add(2, 'if count < {0}:'.format(term.max_count))
+            indent = 3
+        self._sequence(
+            func,
+            [term.child],
+            'start',
+            indent,
+            _final('queue.append(({end}, count + 1, ({node}, links)))')
+        )
+        func.add(1, 'return matches')
+        self._blocks.append(func.source())
+        return name
+
+    def _write_possessive(self, term: g.RepeatTerm) -> str:
+        name = self._helper('repeat')
+        first = _Function('{0}_first(text, pos, cache)'.format(name))
+        self._sequence(
+            first,
+            [term.child],
+            'pos',
+            1,
+            _final('return {end}, {node}')
+        )
+        first.add(1, 'return None')
+        self._blocks.append(first.source())
+        func = _Function('{0}(text, pos, cache)'.format(name))
+        func.add(1, '# {0!r}'.format(term))
+        func.add(1, 'nodes = []')
+        func.add(1, 'start = pos')
+        if term.max_count is None:
+            func.add(1, 'while True:')
+        else:
+            func.add(1, 'while len(nodes) < {0}:'.format(term.max_count))
+        func.add(2, 'match = {0}_first(text, start, cache)'.format(name))
+        func.add(2, 'if match is None:')
+        func.add(3, 'break')
+        func.add(2, 'end, node = match')
+        func.add(2, 'nodes.append(node)')
+        func.add(2, 'if end == start:')
+        func.add(3, 'break')
+        func.add(2, 'start = end')
+        func.add(1, 'if len(nodes) < {0}:'.format(term.min_count))
+        func.add(2, 'return []')
+        func.add(1, 'return [(start, MultiNode(nodes))]')
+        self._blocks.append(func.source())
+        return name
+
+    def _write_atomic(self, term: g.AtomicTerm) -> str:
+        name = self._helper('atomic')
+        func = _Function('{0}(text, pos, cache)'.format(name))
+        func.add(1, '# {0!r}'.format(term))
+        self._sequence(
+            func,
+            [term.child],
+            'pos',
+            1,
+            _final('return [({end}, {node})]')
+        )
+        func.add(1, 'return []')
+        self._blocks.append(func.source())
+        return name
+
+    def _write_char_run(
+        self,
+        term: g.RepeatTerm,
+        run: chars.CharRun
+    ) -> str:
+        # the matches are prefixes of the scanned run, fewest repetitions
+        # first like RepeatTerm so that FIRST_MATCH picks the same tree
+        name = self._helper('repeat')
+        node_func = _Function('{0}_node(text, pos, cache)'.format(name))
+        self._sequence(
+            node_func,
+            [term.child],
+            'pos',
+            1,
+            _final('return {node}')
+        )
+        self._blocks.append(node_func.source())
+        self._blocks.append(
+            '# {term!r}\n'
+            '{name}_run = re.compile({pattern!r})\n'
+            '\n'
+            '\n'
+            'def {name}(text, pos, cache):\n'
+            '    end = {name}_run.match(text, pos).end()\n'
+            '    if end >= cache.farthest{below_max}:\n'
+            '        cache.expect(end, {expected!r})\n'
+            '    if end - pos < {min_count}:\n'
+            '        return []\n'
+            '    nodes = [\n'
+            '        {name}_node(text, start, cache)\n'
+            '        for start in range(pos, end)\n'
+            '    ]\n'
+            '    return [\n'
+            '        (pos + size, MultiNode(PrefixNodes(nodes, size)))\n'
+            '        for size in range({lowest}, end - pos + 1)\n'
+            '    ]\n'.format(
+                term=term,
+                name=name,
+                pattern=run.pattern.pattern,
+                min_count=term.min_count,
+                below_max=(
+                    '' if term.max_count is None
+                    else ' and end - pos < {0}'.format(term.max_count)
+                ),
+                expected=g.describe_expected(term.child),
+                lowest='end - pos' if term.possessive else term.min_count
+            )
+        )
+        return name
+
+    def _write_group(self, term: g.GroupTerm) -> str:
+        name = self._helper('group')
+        func = _Function('{0}(text, pos, cache)'.format(name))
+        func.add(1, '# {0!r}'.format(term))
+        func.add(1, 'matches = []')
+        size = len(term.children_groups)
+        for index, children in enumerate(term.children_groups):
+            self._sequence(
+                func,
+                children,
+                'pos',
+                1,
+                _final(
+                    'matches.append(({end}, MultiNode({list}, ({index}, '
+                    '{size}))))',
+                    index=index,
+                    size=size
+                )
+            )
+        func.add(1, 'return matches')
+        self._blocks.append(func.source())
+        return name
+
+
+def _final(template: str, **fields: object) -> _Final:
+    """Statement for a full match
+
+    the template can use the end offset as {end}, the nodes as a {tuple} or
+    {list} display, and the first node as {node}
+    """
+    def final(end: str, nodes: typing.Sequence[str]) -> str:
+        if len(nodes) == 1:
+            node_tuple = '({0},)'.format(nodes[0])
+        else:
+            node_tuple = '({0})'.format(', '.join(nodes))
+        return template.format(
+            end=end,
+            tuple=node_tuple,
+            list='[{0}]'.format(', '.join(nodes)),
+            node=nodes[0] if nodes else '',
+            **fields
+        )
+    return final
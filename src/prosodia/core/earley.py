@@ -0,0 +1,518 @@
+"""Earley parsing engine
+
+an alternative to the backtracking matcher in grammar.py that runs in cubic
+time in the worst case, linear time on most unambiguous grammars, and uses
+Leo's optimization so that right recursion stays linear as well. the chart is
+turned into a shared packed parse forest, which yields the same RuleNode,
+MultiNode and LiteralNode trees as the backtracking matcher.
+"""
+from functools import partial
+import typing
+
+from .memo import Expected, MatchResult, RuleName
+from .terms import (
+    END_OF_TEXT,
+    EOFTerm,
+    GroupTerm,
+    Literal,
+    LiteralRange,
+    RepeatTerm,
+    RuleReference,
+    Term,
+)
+from .forest import (
+    RULE, GROUP, REPEAT, TAIL, ForestChild, ForestNode, PackedNode, ParseForest
+)
+from .tree import LiteralNode
+if typing.TYPE_CHECKING:
+    from .grammar import Language  # pylint: disable=unused-import
+
+_Child = typing.Union['_Symbol', '_Token', Term]
+_Item = typing.Tuple['_Production', int, int]
+_Link = typing.Tuple[int, _Child]
+
+
+class _Symbol(object):
+    """Nonterminal of the flattened grammar
+
+    rules become one symbol each, while group and repeat terms get their own
+    anonymous symbols. a repeat is its required children followed by a right
+    recursive tail symbol that matches the optional ones.
+    """
+    __slots__ = ['name', 'kind', 'size', 'productions']
+
+    def __init__(self, name: str, kind: int, size: int = 0) -> None:
+        self.name = name
+        self.kind = kind
+        self.size = size
+        self.productions: typing.List[_Production] = []
+
+    def add(self, rhs: typing.Sequence[_Child]) -> None:
+        self.productions.append(
+            _Production(self, len(self.productions), tuple(rhs))
+        )
+
+    def __repr__(self) -> str:
+        return '<_Symbol {0}>'.format(self.name)
+
+
+class _Production(object):
+    __slots__ = ['symbol', 'index', 'rhs']
+
+    def __init__(
+        self,
+        symbol: _Symbol,
+        index: int,
+        rhs: typing.Tuple[_Child, ...]
+    ) -> None:
+        self.symbol = symbol
+        self.index = index
+        self.rhs = rhs
+
+
+class _Token(object):
+    """Terminal for a rule that is matched as one lexeme"""
+    __slots__ = ['rule_name', 'pattern']
+
+    def __init__(
+        self,
+        rule_name: RuleName,
+        pattern: typing.Pattern[str]
+    ) -> None:
+        self.rule_name = rule_name
+        self.pattern = pattern
+
+
+class _EarleyGrammar(object):
+    def __init__(self, lang: 'Language') -> None:
+        if lang.get_rule(lang.root_rule).token:
+            raise ValueError(
+                'the root rule can not be a token: {0!r}'.format(lang.root_rule)
+            )
+        self._lang = lang
+        self._rules: typing.Dict[RuleName, _Symbol] = dict()
+        self.root = self._rule(lang.root_rule)
+        self.start = _Symbol('<start>', RULE)
+        self.start.add([self.root])
+
+    def _rule(self, rule_name: RuleName) -> _Symbol:
+        symbol = self._rules.get(rule_name)
+        if symbol is None:
+            symbol = _Symbol(rule_name, RULE)
+            self._rules[rule_name] = symbol
+            for term_group in self._lang.get_rule(rule_name).syntax.term_groups:
+                symbol.add([self._child(t) for t in term_group.terms])
+        return symbol
+
+    def _child(self, term: Term) -> _Child:
+        if isinstance(term, RuleReference):
+            if self._lang.get_rule(term.rule_name).token:
+                return _Token(
+                    term.rule_name,
+                    self._lang.token_pattern(term.rule_name)
+                )
+            return self._rule(term.rule_name)
+        elif isinstance(term, (Literal, LiteralRange, EOFTerm)):
+            return term
+        elif isinstance(term, GroupTerm):
+            symbol = _Symbol(repr(term), GROUP, len(term.children_groups))
+            for children in term.children_groups:
+                symbol.add([self._child(c) for c in children])
+            return symbol
+        elif isinstance(term, RepeatTerm) and not term.possessive:
+            return self._repeat(term)
+        else:
+            raise TypeError(
+                'the earley engine does not support {0!r}'.format(term)
+            )
+
+    def _repeat(self, term: RepeatTerm) -> _Symbol:
+        child = self._child(term.child)
+        symbol = _Symbol(repr(term), REPEAT, term.min_count)
+        rhs: typing.List[_Child] = [child] * term.min_count
+        if term.max_count is None:
+            tail = _Symbol('{0!r} tail'.format(term), TAIL)
+            tail.add([])
+            tail.add([child, tail])
+            rhs.append(tail)
+        elif term.max_count > term.min_count:
+            tail = _Symbol('{0!r} tail 0'.format(term), TAIL)
+            tail.add([])
+            for count in range(term.max_count - term.min_count):
+                next_tail = _Symbol(
+                    '{0!r} tail {1}'.format(term, count + 1),
+                    TAIL
+                )
+                next_tail.add([])
+                next_tail.add([child, tail])
+                tail = next_tail
+            rhs.append(tail)
+        symbol.add(rhs)
+        return symbol
+
+
+def _scan(term: _Child, text: str, pos: int) -> typing.Optional[int]:
+    if isinstance(term, _Token):
+        lexeme = term.pattern.match(text, pos)
+        return None if lexeme is None else lexeme.end() - pos
+    elif isinstance(term, Literal):
+        if term.case_sensitive:
+            matched = text.startswith(term.text, pos)
+        else:
+            end = pos + len(term.text)
+            matched = text[pos:end].lower() == term.text.lower()
+        return len(term.text) if matched else None
+    elif isinstance(term, LiteralRange):
+        if pos < len(text) and term.min_value <= ord(text[pos]) <= term.max_value:
+            return 1
+        return None
+    elif isinstance(term, EOFTerm):
+        return 0 if pos == len(text) else None
+    else:
+        raise TypeError(
+            'the earley engine does not support {0!r}'.format(term)
+        )
+
+
+def _terminal_node(
+    term: _Child,
+    text: str,
+    start: int,
+    end: int
+) -> LiteralNode:
+    if isinstance(term, _Token):
+        return LiteralNode(text[start:end])
+    elif isinstance(term, Literal):
+        return LiteralNode(term.text)
+    elif isinstance(term, LiteralRange):
+        return LiteralNode(text[start])
+    else:
+        return LiteralNode('')
+
+
+class _LeoItem(object):
+    """Deterministic step of a right recursive completion
+
+    `item` is the only item of its set that waits on the completed symbol, and
+    completing it would complete the item that `upper` describes as well. the
+    items in between are only added to a set once a tree needs them.
+    """
+    __slots__ = ['pos', 'item', 'upper', 'top', 'top_link']
+
+    def __init__(
+        self,
+        pos: int,
+        item: _Item,
+        upper: typing.Optional['_LeoItem']
+    ) -> None:
+        self.pos = pos
+        self.item = item
+        self.upper = upper
+        if upper is None:
+            prod, dot, origin = item
+            self.top: _Item = (prod, dot + 1, origin)
+            self.top_link: _Link = (pos, prod.rhs[dot])
+        else:
+            self.top = upper.top
+            self.top_link = upper.top_link
+
+
+class _EarleySet(object):  # pylint: disable=too-many-instance-attributes
+    __slots__ = [
+        'links',
+        'queue',
+        'waiting',
+        'predicted',
+        'completed',
+        'empty',
+        'leo',
+        'leo_completions',
+    ]
+
+    def __init__(self) -> None:
+        # every item maps to the ordered set of ways it was reached
+        self.links: typing.Dict[_Item, typing.Dict[_Link, None]] = dict()
+        self.queue: typing.List[_Item] = []
+        self.waiting: typing.Dict[_Symbol, typing.List[_Item]] = dict()
+        self.predicted: typing.Set[_Symbol] = set()
+        self.completed: typing.Dict[
+            typing.Tuple[_Symbol, int],
+            typing.List[_Item]
+        ] = dict()
+        self.empty: typing.Set[_Symbol] = set()
+        self.leo: typing.Dict[_Symbol, typing.Optional[_LeoItem]] = dict()
+        # how far each Leo completion has been expanded, see materialize
+        self.leo_completions: typing.List[
+            typing.Tuple[typing.Optional[_LeoItem], _Link]
+        ] = []
+
+
+class _Chart(object):
+    def __init__(self, grammar: _EarleyGrammar, text: str) -> None:
+        self.grammar = grammar
+        self.text = text
+        self.sets: typing.Dict[int, _EarleySet] = dict()
+        self._last = 0
+        self._add(0, (grammar.start.productions[0], 0, 0), None)
+
+    def recognize(self) -> None:
+        pos = 0
+        while pos <= self._last:
+            earley_set = self.sets.get(pos)
+            if earley_set is not None:
+                self._process(pos, earley_set)
+            pos += 1
+
+    def accepted(self, pos: int) -> bool:
+        earley_set = self.sets.get(pos)
+        return (
+            earley_set is not None
+            and (self.grammar.start.productions[0], 1, 0) in earley_set.links
+        )
+
+    def _add(
+        self,
+        pos: int,
+        item: _Item,
+        link: typing.Optional[_Link]
+    ) -> None:
+        earley_set = self.sets.get(pos)
+        if earley_set is None:
+            earley_set = _EarleySet()
+            self.sets[pos] = earley_set
+            self._last = max(self._last, pos)
+        links = earley_set.links.get(item)
+        if links is None:
+            links = dict()
+            earley_set.links[item] = links
+            earley_set.queue.append(item)
+        if link is not None:
+            links[link] = None
+
+    def _process(self, pos: int, earley_set: _EarleySet) -> None:
+        queue = earley_set.queue
+        while queue:
+            item = queue.pop()
+            prod, dot, origin = item
+            if dot == len(prod.rhs):
+                self._complete(pos, earley_set, prod.symbol, origin, item)
+                continue
+            child = prod.rhs[dot]
+            advanced = (prod, dot + 1, origin)
+            if isinstance(child, _Symbol):
+                earley_set.waiting.setdefault(child, []).append(item)
+                if child not in earley_set.predicted:
+                    earley_set.predicted.add(child)
+                    for child_prod in child.productions:
+                        self._add(pos, (child_prod, 0, pos), None)
+                if child in earley_set.empty:
+                    self._add(pos, advanced, (pos, child))
+            else:
+                width = _scan(child, self.text, pos)
+                if width is not None:
+                    self._add(pos + width, advanced, (pos, child))
+
+    def _complete(
+        self,
+        pos: int,
+        earley_set: _EarleySet,
+        symbol: _Symbol,
+        origin: int,
+        item: _Item,
+    ) -> None:
+        earley_set.completed.setdefault((symbol, origin), []).append(item)
+        if origin == pos:
+            # items that start waiting on this symbol later in this set still
+            # have to see the empty match
+            earley_set.empty.add(symbol)
+            waiting = list(earley_set.waiting.get(symbol, ()))
+        else:
+            leo = self._leo_item(origin, symbol)
+            if leo is not None:
+                earley_set.leo_completions.append((leo, (origin, symbol)))
+                self._add(pos, leo.top, leo.top_link)
+                return
+            waiting = self.sets[origin].waiting.get(symbol, [])
+        link = (origin, symbol)
+        for prev_prod, prev_dot, prev_origin in waiting:
+            self._add(pos, (prev_prod, prev_dot + 1, prev_origin), link)
+
+    def _leo_item(
+        self,
+        pos: int,
+        symbol: _Symbol
+    ) -> typing.Optional[_LeoItem]:
+        chain: typing.List[typing.Tuple[int, _Symbol, _Item]] = []
+        upper: typing.Optional[_LeoItem] = None
+        while True:
+            earley_set = self.sets[pos]
+            if symbol in earley_set.leo:
+                upper = earley_set.leo[symbol]
+                break
+            waiting = earley_set.waiting.get(symbol, ())
+            if (
+                len(waiting) != 1
+                or waiting[0][1] + 1 != len(waiting[0][0].rhs)
+            ):
+                earley_set.leo[symbol] = None
+                break
+            item = waiting[0]
+            chain.append((pos, symbol, item))
+            prod, _, origin = item
+            if origin == pos:
+                break
+            pos, symbol = origin, prod.symbol
+        for step_pos, step_symbol, item in reversed(chain):
+            upper = _LeoItem(step_pos, item, upper)
+            self.sets[step_pos].leo[step_symbol] = upper
+        return upper
+
+    def failure(self) -> typing.Tuple[int, typing.List[Expected]]:
+        """Offset of the last set of the chart and the terms that failed there
+
+        when the last set accepted a match that is not allowed because it is
+        partial, the end of the text was expected there as well
+        """
+        expected: typing.List[Expected] = []
+        pos = self._last
+        for prod, dot, _ in self.sets[pos].links:
+            if dot < len(prod.rhs):
+                child = prod.rhs[dot]
+                if (
+                    not isinstance(child, _Symbol)
+                    and _scan(child, self.text, pos) is None
+                ):
+                    expected.append(
+                        child.rule_name if isinstance(child, _Token) else child
+                    )
+        if self.accepted(pos) and pos != len(self.text):
+            expected.append(END_OF_TEXT)
+        return pos, expected
+
+    def materialize(self, pos: int, start: int) -> _EarleySet:
+        """Add the items from start on that Leo completions skipped over
+
+        the items of a Leo chain start further back the higher they are, so
+        a chain is only expanded until its items start before `start`, and
+        each of its steps is expanded once
+        """
+        earley_set = self.sets[pos]
+        expanded = []
+        for node, link in earley_set.leo_completions:
+            while (
+                node is not None
+                and node.upper is not None
+                and node.item[2] >= start
+            ):
+                prod, dot, item_origin = node.item
+                advanced = (prod, dot + 1, item_origin)
+                links = earley_set.links.get(advanced)
+                if links is None:
+                    links = dict()
+                    earley_set.links[advanced] = links
+                    earley_set.completed.setdefault(
+                        (prod.symbol, item_origin),
+                        []
+                    ).append(advanced)
+                links[link] = None
+                link = (item_origin, prod.symbol)
+                node = node.upper
+            expanded.append((node, link))
+        earley_set.leo_completions = expanded
+        return earley_set
+
+
+class _ForestBuilder(object):
+    """Turns the back links of a chart into forest nodes on demand"""
+    def __init__(self, chart: _Chart) -> None:
+        self._chart = chart
+        self._nodes: typing.Dict[
+            typing.Tuple[_Symbol, int, int],
+            ForestNode
+        ] = dict()
+
+    def node(self, symbol: _Symbol, start: int, end: int) -> ForestNode:
+        key = symbol, start, end
+        node = self._nodes.get(key)
+        if node is None:
+            node = ForestNode(
+                symbol.name,
+                symbol.kind,
+                symbol.size,
+                start,
+                end,
+                partial(self._alternatives, symbol, start, end)
+            )
+            self._nodes[key] = node
+        return node
+
+    def _alternatives(
+        self,
+        symbol: _Symbol,
+        start: int,
+        end: int
+    ) -> typing.List[PackedNode]:
+        node = self._nodes[symbol, start, end]
+        alternatives = []
+        earley_set = self._chart.materialize(end, start)
+        for item in earley_set.completed.get((symbol, start), ()):
+            for children, ends in self._sequences(item, end):
+                if symbol.kind == TAIL and children and children[-1] is node:
+                    # an empty repetition followed by the same tail again
+                    continue
+                alternatives.append(PackedNode(item[0].index, children, ends))
+        return alternatives
+
+    def _sequences(
+        self,
+        item: _Item,
+        end: int
+    ) -> typing.List[
+        typing.Tuple[typing.Tuple[ForestChild, ...], typing.Tuple[int, ...]]
+    ]:
+        prod, dot, origin = item
+        if dot == 0:
+            return [((), ())]
+        sequences = []
+        previous = (prod, dot - 1, origin)
+        for start, child in self._chart.sets[end].links[item]:
+            prefixes = self._sequences(previous, start)
+            if not prefixes:
+                continue
+            if isinstance(child, _Symbol):
+                value: ForestChild = self.node(child, start, end)
+            else:
+                value = _terminal_node(child, self._chart.text, start, end)
+            for children, ends in prefixes:
+                sequences.append((children + (value,), ends + (end,)))
+        return sequences
+
+
+def parse_forest(
+    lang: 'Language',
+    text: str,
+    allow_partial_matches: bool
+) -> ParseForest:
+    chart = _Chart(_EarleyGrammar(lang), text)
+    chart.recognize()
+    if allow_partial_matches:
+        ends: typing.Iterable[int] = sorted(chart.sets)
+    else:
+        ends = [len(text)]
+    builder = _ForestBuilder(chart)
+    roots = [
+        builder.node(chart.grammar.root, 0, end)
+        for end in ends
+        if chart.accepted(end)
+    ]
+    if roots:
+        return ParseForest(roots)
+    return ParseForest(roots, *chart.failure())
+
+
+def parse_all(
+    lang: 'Language',
+    text: str,
+    allow_partial_matches: bool
+) -> typing.Iterable[MatchResult]:
+    return parse_forest(lang, text, allow_partial_matches).matches()
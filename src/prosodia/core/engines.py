@@ -0,0 +1,164 @@
+"""Dispatch of a parse to the engine that runs it
+
+every engine finds the matches of the root rule lazily, and the match policy
+picks the one that is returned. the failures and ambiguities that an engine
+noted while it parsed are then added to the error it raises.
+"""
+import sys
+import typing
+
+from .memo import MatchCache, MatchResult, collector_paused
+from .results import (
+    ALL_MATCHES,
+    EARLEY,
+    ITERATIVE,
+    PACKRAT,
+    PEG,
+    NoMatches,
+    TooManyMatches,
+    select_match,
+)
+from .terms import END_OF_TEXT
+from .earley import parse_forest
+from .forest import ParseForest
+from .iterative import parse_all as parse_iteratively
+from .peg import parse_all as parse_ordered
+from .trace import JsonLinesTracer, Tracer, TracingCache
+from .tree import Node
+if typing.TYPE_CHECKING:
+    from .grammar import Language  # pylint: disable=unused-import
+    from .transform import LanguageTransformation  # pylint: disable=unused-import
+
+T = typing.TypeVar('T')
+
+
+def parse(
+    lang: 'Language',
+    raw_text: str,
+    allow_partial_matches: bool = True,
+    cache: typing.Optional[MatchCache] = None,
+    engine: str = PACKRAT,
+    policy: str = ALL_MATCHES,
+    tracer: typing.Optional[Tracer] = None
+) -> Node:
+    """Parse the text into the match that the policy picks
+
+    see Language.parse
+    """
+    if tracer is not None and engine != PACKRAT:
+        raise ValueError(
+            'only the packrat engine can be traced, not {0!r}'.format(engine)
+        )
+    forest: typing.Optional[ParseForest] = None
+    matches: typing.Iterable[MatchResult]
+    # where the farthest failure was noted
+    failures: typing.Optional[
+        typing.Union[MatchCache, ParseForest]
+    ] = None
+    if engine == EARLEY:
+        forest = parse_forest(lang, raw_text, allow_partial_matches)
+        matches = forest.matches()
+        failures = forest
+    elif engine == ITERATIVE:
+        failures = cache = cache or MatchCache()
+        matches = parse_iteratively(
+            lang,
+            raw_text,
+            allow_partial_matches,
+            cache
+        )
+    elif engine == PEG:
+        failures = cache = cache or MatchCache()
+        matches = parse_ordered(lang, raw_text, allow_partial_matches, cache)
+    elif engine == PACKRAT:
+        failures = cache = _packrat_cache(lang, cache, tracer)
+        matches = parse_packrat(lang, raw_text, allow_partial_matches, cache)
+    else:
+        raise ValueError('unknown parsing engine: {0!r}'.format(engine))
+    try:
+        with collector_paused():
+            return select_match(matches, len(raw_text), policy)
+    except TooManyMatches as error:
+        if forest is not None:
+            error.ambiguity = forest.ambiguity()
+        elif engine == PACKRAT and cache is not None:
+            error.ambiguity = cache.ambiguity(error.found)
+        raise
+    except NoMatches:
+        if failures is None:
+            raise
+        raise NoMatches(
+            raw_text,
+            failures.farthest,
+            failures.expected
+        ) from None
+
+
+def _packrat_cache(
+    lang: 'Language',
+    cache: typing.Optional[MatchCache],
+    tracer: typing.Optional[Tracer]
+) -> MatchCache:
+    """The memo of a packrat parse, which traces to stdout for a debug language
+
+    a parse is only traced through a TracingCache, so it is picked once here
+    and the matchers never check for a tracer
+    """
+    if tracer is not None:
+        if cache is not None:
+            raise ValueError(
+                'a traced parse makes its own cache, pass a TracingCache instead'
+            )
+        return TracingCache(tracer)
+    elif cache is not None:
+        return cache
+    elif lang.debug:
+        return TracingCache(JsonLinesTracer(sys.stdout))
+    return MatchCache()
+
+
+def parse_packrat(
+    lang: 'Language',
+    text: str,
+    allow_partial_matches: bool,
+    cache: MatchCache,
+) -> typing.Iterable[MatchResult]:
+    """Matches of the root rule, found by the rules themselves"""
+    matches = cache.match(lang.root_rule, text, 0, lang)
+    for end, node in matches:
+        if allow_partial_matches or end == len(text):
+            yield end, node
+        elif end >= cache.farthest:
+            cache.expect(end, END_OF_TEXT)
+
+
+def parse_transformed(
+    lang: 'Language',
+    raw_text: str,
+    transform: 'LanguageTransformation[T]',
+    allow_partial_matches: bool = True,
+    cache: typing.Optional[MatchCache] = None,
+    policy: str = ALL_MATCHES
+) -> T:
+    """Parse the text with the ordered choice engine into a value
+
+    every term group runs its accumulator as soon as it matches, so this
+    gives what transforming the tree of a PEG parse would without ever
+    building the tree
+    """
+    cache = cache or MatchCache()
+    matches = parse_ordered(
+        lang,
+        raw_text,
+        allow_partial_matches,
+        cache,
+        transform
+    )
+    try:
+        return typing.cast(T, select_match(matches, len(raw_text), policy))
+    except NoMatches:
+        raise NoMatches(
+            raw_text,
+            cache.farthest,
+            cache.expected
+        ) from None
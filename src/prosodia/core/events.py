@@ -0,0 +1,135 @@
+"""Rule events of a parse
+
+a RuleHandler is told where each rule of the accepted derivation starts and
+ends, in the order of the text, the way a SAX parser reports elements.
+parse_events runs the ordered choice engine, which only notes the spans of
+the rules while it parses and never makes a node. the other engines can not
+match without making nodes, so parse_events refuses them, and emit_tree
+reports the events of a tree that one of them returned instead.
+"""
+import typing
+
+from .memo import MatchCache, RuleName
+from .results import ALL_MATCHES, PEG, NoMatches, select_match
+from .peg import RuleSpan, parse_all as parse_ordered
+from .tree import LiteralNode, Node, RuleNode
+if typing.TYPE_CHECKING:
+    from .grammar import Language  # pylint: disable=unused-import
+
+
+class RuleHandler(object):
+    """Callbacks for the rules of a derivation, which do nothing by default"""
+    def enter_rule(
+        self,
+        rule_name: RuleName,
+        term_group_id: int,
+        start: int
+    ) -> None:
+        pass
+
+    def exit_rule(
+        self,
+        rule_name: RuleName,
+        term_group_id: int,
+        start: int,
+        end: int
+    ) -> None:
+        pass
+
+
+def parse_events(
+    lang: 'Language',
+    raw_text: str,
+    handler: RuleHandler,
+    allow_partial_matches: bool = True,
+    cache: typing.Optional[MatchCache] = None,
+    engine: str = PEG,
+    policy: str = ALL_MATCHES
+) -> None:
+    """Parse the text with the PEG engine and report the rules of the match
+
+    the handler is only called once the match is found, and no node is made
+    for it. the match is the one that Language.parse returns with the PEG
+    engine, which can only differ from the packrat match when
+    analysis.ordered_choice_conflicts reports the grammar. any other engine
+    is refused with a ValueError, since it builds the tree that this avoids
+    """
+    if engine != PEG:
+        raise ValueError(
+            'the {0} engine makes nodes, events are only reported by the '
+            '{1} engine, see emit_tree for the events of a tree'.format(
+                engine,
+                PEG
+            )
+        )
+    cache = cache or MatchCache()
+    matches = parse_ordered(
+        lang,
+        raw_text,
+        allow_partial_matches,
+        cache,
+        spans=True
+    )
+    try:
+        spans: typing.Any = select_match(matches, len(raw_text), policy)
+    except NoMatches:
+        raise NoMatches(
+            raw_text,
+            cache.farthest,
+            cache.expected
+        ) from None
+    emit_spans(spans, handler)
+
+
+def emit_tree(node: Node, handler: RuleHandler) -> None:
+    """Report the rule nodes of a tree whose text starts at 0"""
+    pos = 0
+    pending: typing.List[typing.Tuple[Node, int]] = [(node, -1)]
+    while pending:
+        node, start = pending.pop()
+        if start >= 0:
+            rule_node = typing.cast(RuleNode, node)
+            handler.exit_rule(
+                rule_node.matched_rule,
+                rule_node.term_group_id,
+                start,
+                pos
+            )
+        elif isinstance(node, LiteralNode):
+            pos += len(node.value)
+        else:
+            if isinstance(node, RuleNode):
+                handler.enter_rule(node.matched_rule, node.term_group_id, pos)
+                pending.append((node, pos))
+            pending.extend([(c, -1) for c in reversed(node.children)])
+
+
+def emit_spans(spans: typing.Any, handler: RuleHandler) -> None:
+    """Report the spans in the order of the text
+
+    spans is a RuleSpan, or lists and tuples of them, with None in between
+    """
+    pending: typing.List[typing.Tuple[typing.Any, bool]] = [(spans, False)]
+    while pending:
+        item, finished = pending.pop()
+        if isinstance(item, RuleSpan):
+            if finished:
+                handler.exit_rule(
+                    item.rule_name,
+                    item.term_group_id,
+                    item.start,
+                    item.end
+                )
+                continue
+            handler.enter_rule(item.rule_name, item.term_group_id, item.start)
+            pending.append((item, True))
+            children = item.children
+        else:
+            children = item
+        pending.extend(
+            [
+                (child, False)
+                for child in reversed(children)
+                if child is not None
+            ]
+        )
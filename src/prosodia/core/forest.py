@@ -0,0 +1,400 @@
+"""Shared packed parse forests
+
+a forest stores every derivation of an ambiguous parse, but each symbol that
+matched a span of the text is stored once and shared by all of the
+derivations that use it, so a forest of polynomial size can describe an
+exponential number of trees.
+"""
+import typing
+
+from .memo import Ambiguity, Expected
+from .tree import Node, LiteralNode, MultiNode, RuleNode
+
+RULE = 0
+GROUP = 1
+REPEAT = 2
+TAIL = 3
+
+ForestChild = typing.Union['ForestNode', LiteralNode]
+DisambiguationPolicy = typing.Callable[['ForestNode'], 'PackedNode']
+
+
+class PackedNode(object):
+    """One derivation of a forest node from its children
+
+    `index` is the term group that matched for rules and groups, and `ends`
+    holds the offset where each child stopped matching
+    """
+    __slots__ = ['index', 'children', 'ends']
+
+    def __init__(
+        self,
+        index: int,
+        children: typing.Sequence[ForestChild],
+        ends: typing.Sequence[int]
+    ) -> None:
+        self.index = index
+        self.children = children
+        self.ends = ends
+
+    def __repr__(self) -> str:
+        return '<PackedNode {0} {1}>'.format(self.index, list(self.ends))
+
+
+class ForestNode(object):
+    """Rule, group or repeat that matched from `start` to `end`
+
+    a repeat node's last child can be a TAIL node holding its optional
+    repetitions, each of which is either empty or one more repetition followed
+    by another tail
+    """
+    __slots__ = ['name', 'kind', 'size', 'start', 'end', '_alternatives', '_expand']
+
+    def __init__(
+        self,
+        name: str,
+        kind: int,
+        size: int,
+        start: int,
+        end: int,
+        expand: typing.Callable[[], typing.Sequence[PackedNode]]
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.size = size
+        self.start = start
+        self.end = end
+        self._alternatives: typing.Optional[typing.Sequence[PackedNode]] = None
+        self._expand: typing.Optional[
+            typing.Callable[[], typing.Sequence[PackedNode]]
+        ] = expand
+
+    @property
+    def alternatives(self) -> typing.Sequence[PackedNode]:
+        if self._alternatives is None:
+            assert self._expand is not None
+            self._alternatives = self._expand()
+            self._expand = None
+        return self._alternatives
+
+    @property
+    def is_ambiguous(self) -> bool:
+        return len(self.alternatives) > 1
+
+    def __repr__(self) -> str:
+        return '<ForestNode {0} {1}:{2}>'.format(self.name, self.start, self.end)
+
+
+def prefer_first(node: ForestNode) -> PackedNode:
+    """Policy that picks the earliest term group, like an ordered choice"""
+    return min(node.alternatives, key=lambda packed: packed.index)
+
+
+def prefer_longest(node: ForestNode) -> PackedNode:
+    """Policy that lets each child match as much text as it can"""
+    return max(node.alternatives, key=lambda packed: tuple(packed.ends))
+
+
+class ParseForest(object):
+    """Derivations of the matches of a parse
+
+    `farthest` is the farthest offset that the parse got to and `expected`
+    holds the terms that failed to match there
+    """
+    def __init__(
+        self,
+        roots: typing.Sequence[ForestNode],
+        farthest: int = -1,
+        expected: typing.Sequence[Expected] = ()
+    ) -> None:
+        self.roots = roots
+        self.farthest = farthest
+        self.expected = expected
+        self._counts: typing.Dict[ForestNode, typing.Optional[int]] = dict()
+
+    def count(self) -> int:
+        """Number of distinct trees in the forest"""
+        return sum(self._count(root) for root in self.roots)
+
+    def trees(self) -> typing.Iterator[Node]:
+        """Lazily build every tree in the forest"""
+        for root in self.roots:
+            yield from _trees(root)
+
+    def matches(self) -> typing.Iterator[typing.Tuple[int, Node]]:
+        """Lazily build every tree with the offset its match ends at"""
+        for root in self.roots:
+            for tree in _trees(root):
+                yield root.end, tree
+
+    def choose(self, policy: DisambiguationPolicy = prefer_first) -> Node:
+        """Build the one tree that the policy picks at every ambiguity
+
+        when partial matches are allowed the longest match is used
+        """
+        root = max(self.roots, key=lambda r: r.end)
+        return _Chooser(policy).build(root)
+
+    def ambiguity(self) -> typing.Optional[Ambiguity]:
+        """Smallest span that a rule matched in more than one way
+
+        a rule node counts when it has more than one derivation, or when one
+        of the group or repeat nodes inside it does. the forest only holds the
+        derivations of its roots, so unlike MatchCache.ambiguity it does not
+        need the matches themselves
+        """
+        # whether a group or repeat node has more than one derivation
+        tangled: typing.Dict[ForestNode, bool] = dict()
+        smallest: typing.Optional[Ambiguity] = None
+        stack = [(root, False) for root in self.roots]
+        while stack:
+            node, expanded = stack.pop()
+            if not expanded:
+                if node in tangled:
+                    continue
+                tangled[node] = False
+                stack.append((node, True))
+                for packed in node.alternatives:
+                    for child in packed.children:
+                        if isinstance(child, ForestNode) and child not in tangled:
+                            stack.append((child, False))
+                continue
+            ambiguous = node.is_ambiguous or any(
+                isinstance(child, ForestNode)
+                and child.kind != RULE
+                and tangled[child]
+                for packed in node.alternatives
+                for child in packed.children
+            )
+            if node.kind != RULE:
+                tangled[node] = ambiguous
+            elif ambiguous and (
+                smallest is None
+                or node.end - node.start < smallest.end - smallest.start
+            ):
+                indices = [packed.index for packed in node.alternatives]
+                smallest = Ambiguity(
+                    node.name,
+                    node.start,
+                    node.end,
+                    indices if len(indices) > 1 else indices * 2
+                )
+        return smallest
+
+    def _count(self, root: ForestNode) -> int:
+        # derivations that go through a node which is still being counted are
+        # cyclic, and they count as zero like the parsers drop them
+        counts = self._counts
+        stack: typing.List[typing.Tuple[ForestNode, bool]] = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not expanded:
+                if node in counts:
+                    continue
+                counts[node] = None
+                stack.append((node, True))
+                for packed in node.alternatives:
+                    for child in packed.children:
+                        if isinstance(child, ForestNode) and child not in counts:
+                            stack.append((child, False))
+            else:
+                total = 0
+                for packed in node.alternatives:
+                    product = 1
+                    for child in packed.children:
+                        if isinstance(child, ForestNode):
+                            product *= counts[child] or 0
+                    total += product
+                counts[node] = total
+        return counts[root] or 0
+
+
+def _build(
+    node: ForestNode,
+    index: int,
+    children: typing.Sequence[typing.Any]
+) -> Node:
+    if node.kind == RULE:
+        return RuleNode(node.name, index, tuple(children))
+    elif node.kind == GROUP:
+        return MultiNode(list(children), (index, node.size))
+    else:
+        nodes = list(children[:node.size])
+        if len(children) > node.size:
+            nodes.extend(children[node.size])
+        return MultiNode(nodes)
+
+
+# a choice of derivation for one node of a tree: the node, the index of its
+# packed node, the nodes with the same span that it is inside of, and the
+# children left to choose for after it
+_Choice = typing.Tuple[
+    ForestNode,
+    int,
+    typing.Tuple[ForestNode, ...],
+    '_Pending'
+]
+# children that still need a derivation, first child first, each with the
+# nodes of the same span around it
+_Pending = typing.Optional[
+    typing.Tuple[
+        typing.Tuple[ForestChild, typing.Tuple[ForestNode, ...]],
+        typing.Any
+    ]
+]
+
+
+def _trees(root: ForestNode) -> typing.Iterator[Node]:
+    """Every tree of a node, in the order of its packed nodes
+
+    a tree is a choice of packed node for every forest node in it, which
+    are made in preorder with an explicit stack, since trees can be far
+    deeper than the recursion limit. the next tree changes the last choice
+    that has packed nodes left and makes the choices after it again. a node
+    with the same span as a node that it is inside of has no trees, like the
+    parsers drop cyclic derivations, so its choice is given up on
+    """
+    choices: typing.List[_Choice] = []
+    pending: _Pending = ((root, ()), None)
+    index = 0
+    while True:
+        while pending is not None:
+            (child, path), rest = pending
+            if not isinstance(child, ForestNode):
+                pending = rest
+                continue
+            if child.kind == TAIL:
+                # the repetitions of a tail are not inside of each other
+                path = ()
+            else:
+                if path and (path[-1].start, path[-1].end) != (
+                    child.start, child.end
+                ):
+                    path = ()
+                if child in path:
+                    pending = None
+                    break
+                path += (child,)
+            if index >= len(child.alternatives):
+                pending = None
+                break
+            choices.append((child, index, path, rest))
+            pending = rest
+            for grandchild in reversed(child.alternatives[index].children):
+                pending = ((grandchild, path), pending)
+            index = 0
+        else:
+            yield _build_tree(choices)
+        # the last choice with packed nodes left is made again with the next
+        if not choices:
+            return
+        node, index, path, rest = choices.pop()
+        pending = ((node, path[:-1]), rest)
+        index += 1
+
+
+def _build_tree(choices: typing.Sequence[_Choice]) -> Node:
+    # the choices are in preorder, so building them from the last one puts
+    # the values of the children of a node on the stack, first child on top
+    values: typing.List[typing.Any] = []
+    for node, index, _, _ in reversed(choices):
+        packed = node.alternatives[index]
+        children = [
+            values.pop() if isinstance(child, ForestNode) else child
+            for child in packed.children
+        ]
+        if node.kind == TAIL:
+            # the repetitions of a tail are linked rather than copied once
+            # per repetition
+            values.append(tuple(children) or None)
+        else:
+            values.append(_build(node, packed.index, [
+                _unlink(value)
+                if isinstance(child, ForestNode) and child.kind == TAIL
+                else value
+                for child, value in zip(packed.children, children)
+            ]))
+    return values[0]
+
+
+def _unlink(tail: typing.Any) -> typing.Tuple[typing.Any, ...]:
+    values = []
+    while tail is not None:
+        value, tail = tail
+        values.append(value)
+    return tuple(values)
+
+
+class _Chooser(object):
+    def __init__(self, policy: DisambiguationPolicy) -> None:
+        self._policy = policy
+        self._built: typing.Dict[ForestNode, Node] = dict()
+
+    def build(self, root: ForestNode) -> Node:
+        # built with an explicit stack like _trees. a node that has its
+        # children chosen but is not built yet is inside of the node on top
+        built = self._built
+        chosen: typing.Dict[
+            ForestNode,
+            typing.Tuple[PackedNode, typing.List[typing.Any]]
+        ] = dict()
+        stack = [root]
+        while stack:
+            node = stack[-1]
+            if node in built:
+                stack.pop()
+                continue
+            choice = chosen.get(node)
+            if choice is None:
+                packed = self._policy(node)
+                children = [
+                    self._repetitions(child)
+                    if isinstance(child, ForestNode) and child.kind == TAIL
+                    else child
+                    for child in packed.children
+                ]
+                chosen[node] = packed, children
+                for child in _forest_nodes(children):
+                    if child in chosen and child not in built:
+                        raise ValueError(
+                            'disambiguation policy chose a cyclic derivation '
+                            'of {0!r}'.format(child)
+                        )
+                    elif child not in built:
+                        stack.append(child)
+                continue
+            stack.pop()
+            packed, children = choice
+            built[node] = _build(
+                node,
+                packed.index,
+                [self._value(child) for child in children]
+            )
+        return built[root]
+
+    def _repetitions(self, tail: ForestNode) -> typing.List[ForestChild]:
+        values = []
+        packed = self._policy(tail)
+        while packed.children:
+            value, next_tail = packed.children
+            assert isinstance(next_tail, ForestNode)
+            values.append(value)
+            packed = self._policy(next_tail)
+        return values
+
+    def _value(self, child: typing.Any) -> typing.Any:
+        if isinstance(child, list):
+            return tuple(self._value(value) for value in child)
+        elif isinstance(child, ForestNode):
+            return self._built[child]
+        return child
+
+
+def _forest_nodes(
+    children: typing.Sequence[typing.Any]
+) -> typing.Iterator[ForestNode]:
+    for child in children:
+        if isinstance(child, list):
+            yield from _forest_nodes(child)
+        elif isinstance(child, ForestNode):
+            yield child
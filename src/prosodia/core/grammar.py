@@ -1,122 +1,155 @@
-import abc
-from functools import partial
+import re
 import typing
 
-from .tree import Node, LiteralNode, RuleNode, MultiNode
+from . import analysis, chars, earley, engines, events, recognize, stats, stream
+from .memo import (  # pylint: disable=unused-import
+    Ambiguity,
+    Expected,
+    MatchCache,
+    MatchResult,
+    MemoKey,
+    RuleMatcher,
+    RuleName,
+)
+from .terms import (  # pylint: disable=unused-import
+    END_OF_TEXT,
+    AtomicTerm,
+    Commit,
+    CutTerm,
+    EOFTerm,
+    GroupTerm,
+    Literal,
+    LiteralRange,
+    RepeatTerm,
+    RuleReference,
+    Term,
+    describe_expected,
+    sequence_match,
+)
+from .results import (  # pylint: disable=unused-import
+    PACKRAT,
+    EARLEY,
+    ITERATIVE,
+    PEG,
+    ALL_MATCHES,
+    FIRST_MATCH,
+    UNIQUE_MATCH,
+    LONGEST_MATCH,
+    LineIndex,
+    NoMatches,
+    TooManyMatches,
+    select_match,
+    single_match,
+)
+from .tree import Node, LiteralNode, RuleNode
 from ..validation.validity import Validity
-from ..validation import group_types as gt
-from ..validation.transform_validation import get_return_type
 if typing.TYPE_CHECKING:
     from .transform import LanguageTransformation  # pylint: disable=unused-import
+    from .forest import ParseForest  # pylint: disable=unused-import
+    from .analysis import Lookahead  # pylint: disable=unused-import
+    from .chars import CharRun, CharSet  # pylint: disable=unused-import
+    from .trace import Tracer  # pylint: disable=unused-import
+    from .stats import ParseStats  # pylint: disable=unused-import
+    from .events import RuleHandler  # pylint: disable=unused-import
 
-RuleName = str
-MatchResult = typing.Tuple['_SmartText', Node]
-RuleReferenceCache = typing.MutableMapping[
-    typing.Tuple[int, '_SmartText', int],
-    typing.Sequence[MatchResult]
-]
 T = typing.TypeVar('T')
 
 
 class Grammar(typing.Generic[T]):
+    """A language and the transformation of its parse trees
+
+    a fused grammar runs the accumulators while it parses, so the parse tree
+    is never built. only the ordered choice engine knows that a match is
+    final as soon as it is found, so fused grammars need `engine=PEG`, and
+    their language has to match the texts with ordered choice. languages
+    that can lose matches that way, like the bundled BNF and ABNF, are
+    warned about by `validate`
+    """
     def __init__(
         self,
         language: 'Language',
         transform: 'LanguageTransformation[T]',
-        allow_partial_matches: bool = True
+        allow_partial_matches: bool = True,
+        engine: str = PACKRAT,
+        policy: str = ALL_MATCHES,
+        fused: bool = False
     ) -> None:
+        if fused and engine != PEG:
+            raise ValueError(
+                'only the peg engine can transform while parsing, not '
+                '{0!r}'.format(engine)
+            )
         self.language = language
         self.transform = transform
         self.allow_partial_matches = allow_partial_matches
+        self.engine = engine
+        self.policy = policy
+        self.fused = fused
 
     def apply(self, text: str) -> T:
+        if self.fused:
+            return self.language.parse_transformed(
+                text,
+                self.transform,
+                self.allow_partial_matches,
+                policy=self.policy
+            )
         return self.transform.transform(
             self.language.parse(
                 text,
-                self.allow_partial_matches
+                self.allow_partial_matches,
+                engine=self.engine,
+                policy=self.policy
             )
         )
 
-    def validate(self) -> Validity:
-        return self.language.validate() + self.transform.validate(self.language)
-
-
-class _SmartText(object):
-    __slots__ = ['_raw_text', '_start', '_end']
-
-    def __init__(
+    def iter_apply(
         self,
-        raw_text: str,
-        *,
-        _start: int = None,
-        _end: int = None
-    ) -> None:
-        self._raw_text = raw_text
-        self._start = 0 if _start is None else _start
-        self._end = len(raw_text) if _end is None else _end
-
-    def __len__(self) -> int:
-        return self._end - self._start
-
-    def log_front(self, size: int, *args: object) -> None:
-        segment = self._raw_text[
-            self._start:self._end if len(self) < size else self._start + size
-        ]
-        print(len(self), self._start, self._end, repr(segment), *args)
-
-    def startswith(self, target: str, case_sensitive: bool = True) -> bool:
-        src = self._raw_text[self._start: self._start + len(target)]
-        if case_sensitive:
-            return src == target
-        else:
-            return src.lower() == target.lower()
-
-    @typing.overload
-    def __getitem__(self, index: int) -> str:
-        pass
-
-    @typing.overload
-    def __getitem__(self, index: slice) -> '_SmartText':  # pylint: disable=function-redefined
-        pass
-
-    def __getitem__(self, index: typing.Any) -> typing.Any:  # pylint: disable=function-redefined
-        if isinstance(index, int):
-            return self._raw_text[self._start + index]
-        elif isinstance(index, slice):
-            if index.step is not None and index.step != 1:
-                raise TypeError('cannot use step of not 1 with _SmartText')
-            start = self._start + (index.start or 0)
-            if index.stop is None:
-                end = self._end
-            else:
-                end = start + index.stop
-            return _SmartText(self._raw_text, _start=start, _end=end)
-        else:
-            raise TypeError('expecting an int or a slice')
-
-    def _as_tuple(self) -> typing.Tuple[object, ...]:
-        return (self._raw_text, self._start, self._end)
-
-    def __hash__(self) -> int:
-        return hash(self._as_tuple())
-
-    def __eq__(self, other: object) -> bool:
-        if not isinstance(other, _SmartText):
-            return NotImplemented
-        return (
-            type(self) is type(other)
-            and self._as_tuple() == other._as_tuple()
+        source: typing.Union[str, typing.TextIO],
+        rule_name: RuleName,
+        chunk_size: int = 1 << 16,
+        lookahead: int = 4096
+    ) -> typing.Iterator[typing.Any]:
+        """Transformed values of the records that make up the source
+
+        the source is read as matches of `rule_name` one after the other, and
+        each is yielded as soon as it is parsed and then forgotten along with
+        the memo. see stream.iter_records
+        """
+        return stream.iter_records(self, source, rule_name, chunk_size, lookahead)
+
+    def profile(self, text: str) -> typing.Tuple[T, 'ParseStats']:
+        """Apply the grammar and report what each rule did while parsing"""
+        node, parse_stats = self.language.profile(
+            text,
+            self.allow_partial_matches,
+            policy=self.policy
         )
+        return self.transform.transform(node), parse_stats
 
-
-class NoMatches(Exception):
-    pass
+    def validate(self) -> Validity:
+        validity = (
+            self.language.validate() + self.transform.validate(self.language)
+        )
+        if self.engine == PEG:
+            validity += analysis.ordered_choice_conflicts(self.language)
+        return validity
 
 
-class TooManyMatches(Exception):
-    def __init__(self, matches: typing.Sequence[Node]) -> None:
-        super().__init__(self)
-        self.matches = matches
+class _Analysis(object):
+    """Analyses of the rules of a Language, each made when first asked for"""
+    def __init__(self) -> None:
+        self.lookahead: typing.Optional['Lookahead'] = None
+        self.nullable: typing.Optional[typing.Set[RuleName]] = None
+        self.first: typing.Optional[typing.Dict[RuleName, 'CharSet']] = None
+        self.mutually_recursive: typing.Optional[typing.Set[RuleName]] = None
+        self.token_patterns: typing.Dict[RuleName, typing.Pattern[str]] = (
+            dict()
+        )
+        self.char_runs: typing.Dict[
+            'RepeatTerm',
+            typing.Optional['CharRun']
+        ] = dict()
 
 
 class Language(object):
@@ -130,15 +163,12 @@ class Language(object):
         self.rules = rules
         self.root_rule = root_rule
         self.debug = debug
+        self._analysis = _Analysis()
 
     @classmethod
     def create(cls, root_rule: RuleName) -> 'Language':
         return cls(dict(), root_rule)
 
-    def log_match(self, text: _SmartText, *args: object) -> None:
-        if self.debug:
-            text.log_front(20, *args)
-
     def add_rule(self, rule: 'Rule') -> 'Language':
         if rule.name in self.rules:
             raise ValueError(
@@ -147,6 +177,7 @@ class Language(object):
                 )
             )
         self.rules[rule.name] = rule
+        self._reset_analysis()
         return self
 
     def get_rule(self, rule_name: RuleName) -> 'Rule':
@@ -160,30 +191,207 @@ class Language(object):
         self.rules[rule_name].syntax.term_groups = (
             list(self.rules[rule_name].syntax.term_groups) + list(tgs)
         )
+        self._reset_analysis()
+
+    def mark_token(self, rule_name: RuleName) -> 'Language':
+        """Match a regular rule with one regular expression
+
+        the rule then matches a single lexeme, the longest text that it can
+        match, and produces one LiteralNode for it instead of a tree, so its
+        transformation is never applied. a rule whose pattern could stop
+        short of the longest match is refused with a ValueError
+        """
+        rule = self.rules[rule_name]
+        rule.token = True
+        self._reset_analysis()
+        try:
+            self.token_pattern(rule_name)
+        except ValueError:
+            rule.token = False
+            raise
+        return self
 
-    def parse(self, raw_text: str, allow_partial_matches: bool = True) -> Node:
-        text = _SmartText(raw_text)
-        matches = tuple(self._parse_all(text, allow_partial_matches, {}))
-        if not matches:
-            raise NoMatches
-        elif len(matches) > 1:
-            for m in matches:
-                print(m.draw())
-            raise TooManyMatches(matches)
-        else:
-            return matches[0]
+    def token_pattern(self, rule_name: RuleName) -> typing.Pattern[str]:
+        pattern = self._analysis.token_patterns.get(rule_name)
+        if pattern is None:
+            try:
+                source = analysis.longest_pattern(self, rule_name)
+            except ValueError as e:
+                raise ValueError(
+                    'token rule can miss its longest match: {0}'.format(e)
+                ) from e
+            if source is None:
+                raise ValueError(
+                    'token rule is not regular: {0!r}'.format(rule_name)
+                )
+            try:
+                pattern = re.compile(source)
+            except (re.error, OverflowError) as e:
+                raise ValueError(
+                    'token rule has no valid pattern: {0!r}: {1}'.format(
+                        rule_name, e
+                    )
+                ) from e
+            self._analysis.token_patterns[rule_name] = pattern
+        return pattern
+
+    def char_run(self, term: 'RepeatTerm') -> typing.Optional['CharRun']:
+        """Scanner for a repeat of single characters, None for other repeats"""
+        if term not in self._analysis.char_runs:
+            self._analysis.char_runs[term] = chars.char_run(self, term)
+        return self._analysis.char_runs[term]
+
+    def _reset_analysis(self) -> None:
+        self._analysis = _Analysis()
+
+    def lookahead(self) -> 'Lookahead':
+        """FIRST set dispatch tables, rebuilt when rules are added"""
+        if self._analysis.lookahead is None:
+            self._analysis.lookahead = analysis.Lookahead(self)
+        return self._analysis.lookahead
+
+    def nullable(self) -> typing.Set[RuleName]:
+        """Rules that can match the empty string, kept until rules are added"""
+        if self._analysis.nullable is None:
+            self._analysis.nullable = analysis.nullable_rules(self)
+        return self._analysis.nullable
+
+    def first_sets(self) -> typing.Dict[RuleName, 'CharSet']:
+        """Characters that each rule can start with, kept like `nullable`"""
+        if self._analysis.first is None:
+            self._analysis.first = analysis.first_sets(self)
+        return self._analysis.first
+
+    def mutually_left_recursive(self) -> typing.Set[RuleName]:
+        """Rules that are left recursive through other rules
+
+        the memo finds all of their matches at once, see MatchCache.match_with
+        """
+        if self._analysis.mutually_recursive is None:
+            self._analysis.mutually_recursive = (
+                analysis.mutually_left_recursive_rules(self)
+            )
+        return self._analysis.mutually_recursive
+
+    def parse(
+        self,
+        raw_text: str,
+        allow_partial_matches: bool = True,
+        cache: typing.Optional[MatchCache] = None,
+        engine: str = PACKRAT,
+        policy: str = ALL_MATCHES,
+        tracer: typing.Optional['Tracer'] = None
+    ) -> Node:
+        """Parse the text into the match that the policy picks
+
+        ALL_MATCHES fails if there is more than one match, and its error
+        finds every match when they are read. UNIQUE_MATCH fails the same way
+        but its error only holds the first two matches.
+        FIRST_MATCH returns the first match that is found, and LONGEST_MATCH
+        returns the first of the matches that consume the most text.
+
+        when nothing matches, the NoMatches error tells where the parse got
+        the farthest and what it expected there.
+
+        a packrat parse can report its steps to a tracer, through the
+        TracingCache that the parse then makes. the cache of a traced parse
+        can only be passed in as a TracingCache. a language with `debug` set
+        traces its packrat parses to stdout, and the other engines ignore it
+        """
+        return engines.parse(
+            self,
+            raw_text,
+            allow_partial_matches,
+            cache,
+            engine,
+            policy,
+            tracer
+        )
+
+    def recognize(
+        self,
+        raw_text: str,
+        allow_partial_matches: bool = True
+    ) -> bool:
+        """Whether parse would find a match, found without making any nodes
+
+        like parse, a match only has to cover a prefix of the text when
+        `allow_partial_matches` is set. rules with atomic terms, cuts or
+        possessive repeats are still matched by the packrat matcher, which
+        makes nodes and recurses. see recognize.recognize
+        """
+        return recognize.recognize(self, raw_text, allow_partial_matches)
+
+    def parse_events(
+        self,
+        raw_text: str,
+        handler: 'RuleHandler',
+        allow_partial_matches: bool = True,
+        cache: typing.Optional[MatchCache] = None,
+        engine: str = PEG,
+        policy: str = ALL_MATCHES
+    ) -> None:
+        """Report where the rules of the match start and end to the handler
+
+        only the PEG engine parses without making nodes, so it is the only
+        engine this takes. see events.parse_events
+        """
+        events.parse_events(
+            self,
+            raw_text,
+            handler,
+            allow_partial_matches,
+            cache,
+            engine,
+            policy
+        )
+
+    def parse_transformed(
+        self,
+        raw_text: str,
+        transform: 'LanguageTransformation[T]',
+        allow_partial_matches: bool = True,
+        cache: typing.Optional[MatchCache] = None,
+        policy: str = ALL_MATCHES
+    ) -> T:
+        """Parse the text with the ordered choice engine into a value
+
+        every term group runs its accumulator as soon as it matches, so this
+        gives what transforming the tree of a PEG parse would without ever
+        building the tree
+        """
+        return engines.parse_transformed(
+            self,
+            raw_text,
+            transform,
+            allow_partial_matches,
+            cache,
+            policy
+        )
+
+    def profile(
+        self,
+        raw_text: str,
+        allow_partial_matches: bool = True,
+        policy: str = ALL_MATCHES
+    ) -> typing.Tuple[Node, 'ParseStats']:
+        """Parse the text with the packrat engine and report on every rule
 
-    def _parse_all(
+        only the matches of the returned node count as kept, so a rule's
+        other matches are reported as discarded
+        """
+        return stats.profile(self, raw_text, allow_partial_matches, policy)
+
+    def parse_forest(
         self,
-        text: _SmartText,
-        allow_partial_matches: bool,
-        cache: RuleReferenceCache,
-    ) -> typing.Iterable[Node]:
-        root = self.get_rule(self.root_rule)
-        matches = root.match(text, self, cache)
-        for leftover, node in matches:
-            if allow_partial_matches or not leftover:
-                yield node
+        raw_text: str,
+        allow_partial_matches: bool = True
+    ) -> 'ParseForest':
+        """Parse with the earley engine and keep every derivation"""
+        forest = earley.parse_forest(self, raw_text, allow_partial_matches)
+        if not forest.roots:
+            raise NoMatches(raw_text, forest.farthest, forest.expected)
+        return forest
 
     def equals(self, other: 'Language') -> Validity:
         if self.root_rule != other.root_rule:
@@ -224,22 +432,32 @@ class Rule(object):
     def __init__(
         self,
         name: RuleName,
-        syntax: 'Syntax'
+        syntax: 'Syntax',
+        token: bool = False
     ) -> None:
         self.name = name
         self.syntax = syntax
+        self.token = token
 
     def match(
         self,
-        text: _SmartText,
+        text: str,
+        pos: int,
         lang: 'Language',
-        cache: RuleReferenceCache,
+        cache: 'MatchCache',
     ) -> typing.Iterable[MatchResult]:
-        return self.syntax.match(text, self.name, lang, cache)
+        if self.token:
+            matches = _match_token(lang.token_pattern(self.name), text, pos)
+            if not matches and pos >= cache.farthest:
+                cache.expect(pos, self.name)
+            return matches
+        return self.syntax.match(text, pos, self.name, lang, cache)
 
     def equals(self, other: 'Rule') -> Validity:
         if self.name != other.name:
             return Validity.invalid('Rule: rule names are different')
+        elif self.token != other.token:
+            return Validity.invalid('Rule: only one rule is a token')
 
         validity = self.syntax.equals(other.syntax)
         if not validity:
@@ -248,7 +466,24 @@ class Rule(object):
             return Validity.valid()
 
     def validate(self, lang: 'Language') -> Validity:
-        return self.syntax.validate(self.name, lang)
+        validity = self.syntax.validate(self.name, lang)
+        if validity and self.token:
+            try:
+                lang.token_pattern(self.name)
+            except ValueError as e:
+                return Validity.invalid(str(e))
+        return validity
+
+
+def _match_token(
+    pattern: typing.Pattern[str],
+    text: str,
+    pos: int
+) -> typing.Iterable[MatchResult]:
+    match = pattern.match(text, pos)
+    if match is None:
+        return ()
+    return ((match.end(), LiteralNode(match.group())),)
 
 
 class Syntax(object):
@@ -265,15 +500,28 @@ class Syntax(object):
 
     def match(
         self,
-        text: _SmartText,
+        text: str,
+        pos: int,
         rule_name: 'RuleName',
         lang: 'Language',
-        cache: RuleReferenceCache,
+        cache: 'MatchCache',
     ) -> typing.Iterable[MatchResult]:
-        for index, term_list in enumerate(self.term_groups):
-            for leftover, terms in term_list.match(text, lang, cache):
-                node = RuleNode(rule_name, index, terms)
-                yield leftover, node
+        term_groups = self.term_groups
+        commit = Commit()
+        indexes = lang.lookahead().alternatives(rule_name, text, pos)
+        if not indexes and pos >= cache.farthest:
+            cache.expect(pos, rule_name)
+        for index in indexes:
+            matched = False
+            for end, terms in term_groups[index].match(
+                text, pos, lang, cache, commit
+            ):
+                matched = True
+                yield end, RuleNode(rule_name, index, terms)
+            if not matched:
+                cache.backtrack(rule_name, pos, index)
+            if commit.cut:
+                return
 
     def equals(self, other: 'Syntax') -> Validity:
         if len(self.term_groups) != len(other.term_groups):
@@ -295,6 +543,11 @@ class Syntax(object):
             return Validity.valid()
 
     def validate(self, rule_name: RuleName, lang: 'Language') -> Validity:
+        """Validity of the term groups of the rule named `rule_name`
+
+        the rule name used to rule out left recursion, which is allowed now,
+        so it is only kept for existing callers and is not read
+        """
         dupes = tuple(
             (i, j, x)
             for i, x in enumerate(self.term_groups)
@@ -319,35 +572,15 @@ class TermGroup(object):
     def create(cls, *terms: 'Term') -> 'TermGroup':
         return cls(terms)
 
-    def _match_impl(
-        self,
-        text: _SmartText,
-        term_index: int,
-        lang: 'Language',
-        cache: RuleReferenceCache,
-    ) -> typing.Iterable[typing.Tuple[_SmartText, typing.Sequence[Node]]]:
-        term = self.terms[term_index]
-        next_term_index = term_index + 1
-        is_last_term = next_term_index >= len(self.terms)
-        for leftover, match in term.match(text, lang, cache):
-            if is_last_term:
-                yield leftover, (match,)
-            else:
-                for final_leftover, child_matches in self._match_impl(
-                    leftover,
-                    next_term_index,
-                    lang,
-                    cache,
-                ):
-                    yield final_leftover, (match,) + tuple(child_matches)
-
     def match(
         self,
-        text: _SmartText,
+        text: str,
+        pos: int,
         lang: 'Language',
-        cache: RuleReferenceCache,
-    ) -> typing.Iterable[typing.Tuple[_SmartText, typing.Sequence[Node]]]:
-        return self._match_impl(text, 0, lang, cache)
+        cache: 'MatchCache',
+        commit: typing.Optional[Commit] = None,
+    ) -> typing.Iterable[typing.Tuple[int, typing.Sequence[Node]]]:
+        return sequence_match(self.terms, text, pos, lang, cache, commit)
 
     def equals(self, other: 'TermGroup') -> Validity:
         if len(self.terms) != len(other.terms):
@@ -368,7 +601,12 @@ class TermGroup(object):
         else:
             return Validity.valid()
 
-    def validate(self, rule_name: RuleName, lang: 'Language') -> Validity:
+    def validate(
+        self,
+        rule_name: RuleName,  # pylint: disable=unused-argument
+        lang: 'Language'
+    ) -> Validity:
+        """Validity of the terms, see Syntax.validate for `rule_name`"""
         if not self.terms:
             return Validity.invalid(
                 'term group needs at least one term'
@@ -381,498 +619,8 @@ class TermGroup(object):
                 'shouldnt have an empty literal in a term group with more than '
                 'one term'
             )
-        elif self.terms[0].equals(RuleReference(rule_name)):
-            return Validity.invalid(
-                'term group cannot start with its own rule'
-            )
         else:
             return sum(
                 (t.validate(lang) for t in self.terms),
                 Validity.valid()
             )
-
-
-class Term(object, metaclass=abc.ABCMeta):
-    """Unit of a syntax"""
-    @abc.abstractmethod
-    def match(
-        self,
-        text: _SmartText,
-        lang: 'Language',
-        cache: RuleReferenceCache,
-    ) -> typing.Iterable[MatchResult]:
-        raise NotImplementedError
-
-    @abc.abstractmethod
-    def validate(self, lang: 'Language') -> Validity:
-        raise NotImplementedError
-
-    @abc.abstractmethod
-    def equals(self, other: 'Term') -> Validity:
-        raise NotImplementedError
-
-    @abc.abstractmethod
-    def get_transform_type(self, lt: 'LanguageTransformation') -> type:
-        raise NotImplementedError
-
-
-class RuleReference(Term):
-    """Term that represents a nested rule"""
-    def __init__(self, rule_name: RuleName) -> None:
-        self.rule_name = rule_name
-
-    def match(
-        self,
-        text: _SmartText,
-        lang: 'Language',
-        cache: RuleReferenceCache,
-    ) -> typing.Iterable[MatchResult]:
-        key = id(self), text, id(lang)
-        if key in cache:
-            yield from iter(cache[key])
-            return
-        results: typing.List[MatchResult] = []
-        cache[key] = results
-        matches = lang.get_rule(self.rule_name).match(text, lang, cache)
-        actual_match = False
-        for match in matches:
-            results.append(match)
-            lang.log_match(match[0], 'rule ref', self.rule_name)
-            if not actual_match:
-                if match[0] != text:
-                    # Since matching only moves forwards, as long as we match
-                    # any part of the text then we know that we will finish
-                    # exhausting this iterable before we hit this cache entry
-                    actual_match = True
-                    yield from results
-            else:
-                yield match
-        if not actual_match and results:
-            yield from results
-
-    def equals(self, other: Term) -> Validity:
-        if not isinstance(other, RuleReference):
-            return Validity.invalid(
-                'RuleReference: other is not rule reference'
-            )
-        elif self.rule_name != other.rule_name:
-            return Validity.invalid('RuleReference: different rule names')
-        else:
-            return Validity.valid()
-
-    def __repr__(self) -> str:
-        return '<RuleReference(Term) {0}>'.format(self.rule_name)
-
-    def validate(self, lang: 'Language') -> Validity:
-        if self.rule_name not in lang.rules:
-            return Validity.invalid(
-                'rule reference points to a rule that does not exist: {0!r}'
-                .format(self.rule_name)
-            )
-        else:
-            return Validity.valid()
-
-    def get_transform_type(self, lt: 'LanguageTransformation') -> type:
-        rules = lt.transformation_rules
-        return get_return_type(
-            rules[self.rule_name].tf_syntax.tf_term_groups[0].accumulator
-        )
-
-
-class Literal(Term):
-    """Term that represents a plaintext literal"""
-    def __init__(self, text: str, case_sensitive: bool = True) -> None:
-        self.text = text
-        self.case_sensitive = case_sensitive
-
-    def match(
-        self,
-        text: _SmartText,
-        lang: Language,
-        cache: RuleReferenceCache,
-    ) -> typing.Iterable[MatchResult]:
-        if text.startswith(self.text, self.case_sensitive):
-            lang.log_match(text, 'literal', self.text)
-            yield text[len(self.text):], LiteralNode(self.text)
-
-    def __repr__(self) -> str:
-        return '<Literal(Term) {0!r}>'.format(self.text)
-
-    def equals(self, other: Term) -> Validity:
-        if not isinstance(other, Literal):
-            return Validity.invalid('Literal: other is not a literal')
-        elif self.text != other.text:
-            return Validity.invalid('Literal: text is different')
-        else:
-            return Validity.valid()
-
-    def validate(self, lang: Language) -> Validity:
-        return Validity.valid()
-
-    def get_transform_type(self, lt: 'LanguageTransformation') -> type:
-        return get_return_type(LiteralNode.transform)
-
-
-class LiteralRange(Term):
-    def __init__(self, min_value: int, max_value: int) -> None:
-        self.min_value = min_value
-        self.max_value = max_value
-
-    def match(
-        self,
-        text: _SmartText,
-        lang: Language,
-        cache: RuleReferenceCache,
-    ) -> typing.Iterable[MatchResult]:
-        if text:
-            first_char = text[0]
-            if self.min_value <= ord(first_char) <= self.max_value:
-                lang.log_match(text, 'range', self.min_value, self.max_value)
-                yield text[1:], LiteralNode(first_char)
-
-    def __repr__(self) -> str:
-        return '<LiteralRange(Term) {0}, {1}>'.format(
-            self.min_value,
-            self.max_value
-        )
-
-    def equals(self, other: Term) -> Validity:
-        if not isinstance(other, LiteralRange):
-            return Validity.invalid(
-                'LiteralRange: other is not a literal range'
-            )
-        elif (
-            self.min_value != other.min_value
-            or self.max_value != other.max_value
-        ):
-            return Validity.invalid('LiteralRange: range values are different')
-        else:
-            return Validity.valid()
-
-    def validate(self, lang: Language) -> Validity:
-        if self.max_value < self.min_value:
-            return Validity.invalid('LiteralRange: max cannot be less than min')
-        elif self.max_value < 0 or self.min_value < 0:
-            return Validity.invalid(
-                'LiteralRange: cannot have negative range values'
-            )
-        else:
-            return Validity.valid()
-
-    def get_transform_type(self, lt: 'LanguageTransformation') -> type:
-        return get_return_type(LiteralNode.transform)
-
-
-class EOFTerm(Term):
-    def match(
-        self,
-        text: _SmartText,
-        lang: 'Language',
-        cache: RuleReferenceCache,
-    ) -> typing.Iterable[MatchResult]:
-        if not text:
-            lang.log_match(text, 'EOF')
-            yield text, LiteralNode('')
-
-    def __repr__(self) -> str:
-        return '<EOFTerm(Term)>'
-
-    def equals(self, other: Term) -> Validity:
-        if not isinstance(other, EOFTerm):
-            return Validity.invalid('EOFTerm: other is not an EOFTerm')
-        else:
-            return Validity.valid()
-
-    def validate(self, lang: Language) -> Validity:
-        return Validity.valid()
-
-    def get_transform_type(self, lt: 'LanguageTransformation') -> type:
-        return get_return_type(LiteralNode.transform)
-
-
-class RepeatTerm(Term):
-    def __init__(
-        self,
-        child: Term,
-        min_count: int,
-        max_count: typing.Optional[int]
-    ) -> None:
-        self.child = child
-        self.min_count = min_count
-        self.max_count = max_count
-
-    def __repr__(self) -> str:
-        return '<RepeatTerm(Term) {0!r},{1},{2}>'.format(
-            self.child,
-            self.min_count,
-            self.max_count
-        )
-
-    def match(
-        self,
-        text: _SmartText,
-        lang: Language,
-        cache: RuleReferenceCache,
-    ) -> typing.Iterable[MatchResult]:
-        match, more_funcs = self._match_impl(
-            text,
-            lang,
-            [],
-            cache,
-        )
-        if match:
-            yield match
-        for func in more_funcs:
-            match, even_more_funcs = func()
-            if match:
-                lang.log_match(match[0], 'repeat', len(match[1].children))
-                yield match
-            more_funcs += even_more_funcs
-
-    def _match_impl(
-        self,
-        text: _SmartText,
-        lang: Language,
-        matched_terms: typing.Sequence[Node],
-        cache: RuleReferenceCache,
-    ) -> typing.Tuple[
-        typing.Optional[typing.Tuple[_SmartText, MultiNode]],
-        typing.Iterable[typing.Callable[[], typing.Any]]
-    ]:
-        if self.max_count is not None and len(matched_terms) > self.max_count:
-            return None, []
-        if len(matched_terms) >= self.min_count:
-            match: typing.Optional[typing.Tuple[_SmartText, MultiNode]] = (
-                text, MultiNode(matched_terms)
-            )
-        else:
-            match = None
-
-        more_funcs = [
-            partial(
-                self._match_impl,
-                leftover_text,
-                lang,
-                list(matched_terms) + [term],
-                cache,
-            ) for leftover_text, term in self.child.match(text, lang, cache)
-        ]
-        return match, more_funcs
-
-    def equals(self, other: Term) -> Validity:
-        if not isinstance(other, RepeatTerm):
-            return Validity.invalid('RepeatTerm: other is not a RepeatTerm')
-        elif (
-            self.min_count != other.min_count
-            or self.max_count != other.max_count
-        ):
-            return Validity.invalid(
-                'RepeatTerm: other does not have same range'
-            )
-        validity = self.child.equals(other.child)
-        if not validity:
-            return validity + Validity.invalid(
-                'RepeatTerm: children are not equal'
-            )
-        else:
-            return Validity.valid()
-
-    def validate(self, lang: Language) -> Validity:
-        if (
-            self.max_count is not None
-            and self.max_count < self.min_count
-        ):
-            return Validity.invalid(
-                'RepeatTerm: max count is less than min count'
-            )
-        elif self.max_count is not None and self.max_count < 0:
-            return Validity.invalid(
-                'RepeatTerm: max count cannot be negative'
-            )
-        elif self.min_count < 0:
-            return Validity.invalid(
-                'RepeatTerm: min count cannot be negative'
-            )
-        validity = self.child.validate(lang)
-        if not validity:
-            return validity + Validity.invalid(
-                'RepeatTerm: child is not valid'
-            )
-        else:
-            return Validity.valid()
-
-    def get_transform_type(self, lt: 'LanguageTransformation') -> type:
-        return typing.Sequence[self.child.get_transform_type(lt)]  # type: ignore
-
-
-class GroupTerm(Term):
-    def __init__(
-        self,
-        children_groups: typing.Sequence[typing.Sequence[Term]]
-    ) -> None:
-        self.children_groups = children_groups
-
-    def __repr__(self) -> str:
-        return '<GroupTerm(Term) {0}>'.format(
-            ','.join(
-                '({0})'.format(
-                    ','.join(repr(c) for c in children)
-                ) for children in self.children_groups
-            )
-        )
-
-    def equals(self, other: object) -> Validity:
-        if not isinstance(other, GroupTerm):
-            return Validity.invalid(
-                'GroupTerm: other is not a GroupTerm'
-            )
-        elif len(self.children_groups) != len(other.children_groups):
-            return Validity.invalid(
-                'GroupTerm: this term has {0} children_groups and other has {1} '
-                'children_groups'.format(
-                    len(self.children_groups), len(other.children_groups)
-                )
-            )
-        validity = Validity.valid()
-        for index, (a, b) in enumerate(
-            zip(self.children_groups, other.children_groups)
-        ):
-            if len(a) != len(b):
-                validity += Validity.invalid(
-                    'GroupTerm: children_groups {0} are not the same length'
-                    .format(index)
-                )
-            else:
-                validity += sum(
-                    (c.equals(o) for c, o in zip(a, b)),
-                    Validity.valid()
-                )
-        return validity
-
-    def match(
-        self,
-        text: _SmartText,
-        lang: Language,
-        cache: RuleReferenceCache,
-    ) -> typing.Iterable[MatchResult]:
-        for index, children in enumerate(self.children_groups):
-            for leftover, match in _group_match(children, text, lang, cache):
-                yield leftover, MultiNode(match, (index, len(self.children_groups)))
-
-    def validate(self, lang: Language) -> Validity:
-        # TODO: validate if the grouping term is necessary, but requires extra context
-        if len(self.children_groups) <= 1 and len(self.children_groups[0]) <= 1:
-            return Validity.invalid(
-                'GroupTerm: must have at least two children'
-            )
-        children = [
-            c.validate(lang)
-            for children in self.children_groups
-            for c in children
-        ]
-        if all(children):
-            return Validity.valid()
-        else:
-            msg_groups = [
-                list(c.messages) + [
-                    'GroupTerm[{0}]: invalid child'.format(index)
-                ]
-                for index, c in enumerate(children) if not c
-            ]
-            return (
-                Validity(
-                    [msg for group in msg_groups for msg in group]
-                ) + Validity.invalid('GroupTerm: children are not valid')
-            )
-
-    def get_transform_type(self, lt: 'LanguageTransformation') -> type:  # pylint: disable=too-many-return-statements,too-many-branches
-        child_types = tuple(
-            typing.Tuple[tuple(
-                c.get_transform_type(lt) for c in children
-            )] for children in self.children_groups
-        )
-        # c0, c1, c2, c3, c4, c5, c6, c7, c8, c9, c10, c11, c12, c13, c14, c15 = \
-        #     itertools.islice(
-        #         itertools.chain(child_types_gen, itertools.repeat(None))
-        #         16
-        #     )
-        if len(self.children_groups) == 1:
-            return gt.Group[child_types]  # type: ignore
-        elif len(self.children_groups) == 2:
-            return gt.Group2[child_types]  # type: ignore
-        elif len(self.children_groups) == 3:
-            return gt.Group3[child_types]  # type: ignore
-        elif len(self.children_groups) == 4:
-            return gt.Group4[child_types]  # type: ignore
-        elif len(self.children_groups) == 5:
-            return gt.Group5[child_types]  # type: ignore
-        elif len(self.children_groups) == 6:
-            return gt.Group6[child_types]  # type: ignore
-        elif len(self.children_groups) == 7:
-            return gt.Group7[child_types]  # type: ignore
-        elif len(self.children_groups) == 8:
-            return gt.Group8[child_types]  # type: ignore
-        elif len(self.children_groups) == 9:
-            return gt.Group9[child_types]  # type: ignore
-        elif len(self.children_groups) == 10:
-            return gt.Group10[child_types]  # type: ignore
-        elif len(self.children_groups) == 11:
-            return gt.Group11[child_types]  # type: ignore
-        elif len(self.children_groups) == 12:
-            return gt.Group12[child_types]  # type: ignore
-        elif len(self.children_groups) == 13:
-            return gt.Group13[child_types]  # type: ignore
-        elif len(self.children_groups) == 14:
-            return gt.Group14[child_types]  # type: ignore
-        elif len(self.children_groups) == 15:
-            return gt.Group15[child_types]  # type: ignore
-        elif len(self.children_groups) == 16:
-            return gt.Group16[child_types]  # type: ignore
-        else:
-            raise ValueError('cant have more than 16 child groups')
-
-
-def _group_match(
-    children: typing.Sequence[Term],
-    text: _SmartText,
-    lang: Language,
-    cache: RuleReferenceCache,
-) -> typing.Iterable[typing.Tuple[_SmartText, typing.Sequence[Node]]]:
-    funcs: typing.List[typing.Callable[[], typing.Any]] = [
-        partial(_group_match_impl, children, text, lang, [], cache)
-    ]
-    for f in funcs:
-        result: typing.Union[
-            typing.Tuple[_SmartText, typing.Sequence[Node]],
-            typing.List[typing.Callable[[], typing.Any]]
-        ] = f()
-        if isinstance(result, tuple):
-            yield result
-        else:
-            funcs += result
-
-
-def _group_match_impl(
-    children: typing.Sequence[Term],
-    text: _SmartText,
-    lang: Language,
-    matched_terms: typing.Sequence[Node],
-    cache: RuleReferenceCache,
-) -> typing.Union[
-    typing.Tuple[_SmartText, typing.Sequence[Node]],
-    typing.List[typing.Callable[[], typing.Any]]
-]:
-    if len(matched_terms) == len(children):
-        return text, matched_terms
-    else:
-        target = children[len(matched_terms)]
-        return [
-            partial(
-                _group_match_impl,
-                children,
-                leftover,
-                lang,
-                list(matched_terms) + [node],
-                cache,
-            ) for leftover, node in target.match(text, lang, cache)
-        ]
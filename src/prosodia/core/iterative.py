@@ -0,0 +1,978 @@
+"""Iterative matching engine
+
+an alternative to the backtracking matcher in grammar.py that keeps its own
+stack of pending work instead of nesting generators, so the depth of a parse
+is bounded only by memory.
+
+a rule gets one _Call per offset that it is matched at. the call keeps its
+matches and the continuations waiting for them (a graph structured stack), so
+a rule is evaluated once per offset however many terms refer to it, and a
+left recursive reference just waits for more matches of the call it is part
+of. a match that contains a match of the same rule over the same span is
+dropped, since that derivation could repeat forever.
+
+a rule reference that ends a term group after some text was consumed is a tail
+call: the callee hands its matches straight to the continuations of its
+caller, wrapped in the RuleNode that the caller still has to build. right
+recursive rules like `<Rules> ::= <Rule> | <Rule> <Rules>` then take linear
+time instead of passing every match up through every level. trees are only
+built for the matches that are accepted, as soon as each one is found. a rule
+whose term groups only hold terminals is scanned like a terminal, and builds
+its RuleNode right away.
+
+work never moves backwards through the input, so the calls at an offset are
+forgotten as soon as no work is scheduled at or before it any more.
+"""
+import abc
+import typing
+
+from . import analysis
+from .memo import (
+    Expected, MatchCache, MatchResult, MemoKey, RuleName, collector_paused
+)
+from .terms import (
+    END_OF_TEXT,
+    CutTerm,
+    EOFTerm,
+    GroupTerm,
+    Literal,
+    LiteralRange,
+    RepeatTerm,
+    RuleReference,
+    Term,
+)
+from .tree import Node, LiteralNode, MultiNode, RuleNode
+if typing.TYPE_CHECKING:
+    from .grammar import Language, Rule  # pylint: disable=unused-import
+
+# children are kept as a reversed linked list of (last child, earlier ones)
+Children = typing.Optional[typing.Tuple[typing.Any, typing.Any]]
+Value = typing.Union[Node, '_Derivation', '_Tail']
+Nodes = typing.Tuple[Node, ...]
+# scanners report failures that are farther in than the offset they start at
+Scanner = typing.Callable[
+    [str, int, MatchCache],
+    typing.Sequence[MatchResult]
+]
+Op = typing.Union['_Terminal', '_Reference', '_Group', '_Repeat']
+Task = typing.Tuple[
+    int,
+    typing.Optional['_Call'],
+    typing.Callable[..., None],
+    typing.Tuple[typing.Any, ...]
+]
+
+
+class _Terminal(object):
+    """Term that is matched right away without waiting on other terms
+
+    `expected` is what failed when it does not match at all
+    """
+    __slots__ = ['scan', 'expected']
+
+    def __init__(self, scan: Scanner, expected: Expected) -> None:
+        self.scan = scan
+        self.expected = expected
+
+
+class _Reference(object):
+    __slots__ = ['rule_name']
+
+    def __init__(self, rule_name: RuleName) -> None:
+        self.rule_name = rule_name
+
+
+class _Group(object):
+    __slots__ = ['sequences']
+
+    def __init__(self, sequences: typing.Sequence['_Sequence']) -> None:
+        self.sequences = sequences
+
+
+class _Repeat(object):
+    __slots__ = ['child', 'min_count', 'max_count']
+
+    def __init__(
+        self,
+        child: Op,
+        min_count: int,
+        max_count: typing.Optional[int]
+    ) -> None:
+        self.child = child
+        self.min_count = min_count
+        self.max_count = max_count
+
+
+class _Sequence(object):
+    """Term group of a rule, or children of a group term
+
+    `rule_name` is None for the children of a group term, which is one of
+    `size` alternatives
+    """
+    __slots__ = ['rule_name', 'index', 'size', 'ops']
+
+    def __init__(
+        self,
+        rule_name: typing.Optional[RuleName],
+        index: int,
+        size: int,
+        ops: typing.Sequence[Op]
+    ) -> None:
+        self.rule_name = rule_name
+        self.index = index
+        self.size = size
+        self.ops = ops
+
+
+class _Program(object):
+    """Rules of a language turned into sequences of ops"""
+    def __init__(self, lang: 'Language') -> None:
+        self._lang = lang
+        self.rules: typing.Dict[RuleName, typing.List[_Sequence]] = dict()
+        self._scanned: typing.Dict[RuleName, _Terminal] = dict()
+        # only a left recursive rule can contain itself over the same span
+        self.recursive = analysis.left_recursive_rules(lang)
+        self.root = self._reference(lang.root_rule)
+
+    def _reference(self, rule_name: RuleName) -> Op:
+        rule = self._lang.get_rule(rule_name)
+        if rule.token:
+            return _Terminal(
+                _token_scanner(self._lang.token_pattern(rule_name)),
+                rule_name
+            )
+        elif analysis.is_literal_choice(rule):
+            # a single character decides these, which is cheaper than a call
+            return _Terminal(_literal_choice_scanner(rule), rule_name)
+        scanned = self._scanned.get(rule_name)
+        if scanned is not None:
+            return scanned
+        if rule_name not in self.rules:
+            sequences: typing.List[_Sequence] = []
+            self.rules[rule_name] = sequences
+            term_groups = rule.syntax.term_groups
+            for index, term_group in enumerate(term_groups):
+                sequences.append(
+                    _Sequence(
+                        rule_name,
+                        index,
+                        len(term_groups),
+                        [self._op(term) for term in term_group.terms]
+                    )
+                )
+            # a rule that refers to itself, even through other rules, has a
+            # _Reference for that, so only rules that can not recurse are left
+            if all(
+                op.__class__ is _Terminal
+                for sequence in sequences
+                for op in sequence.ops
+            ):
+                scanned = self._scanned[rule_name] = _Terminal(
+                    _rule_scanner(
+                        rule_name,
+                        sequences,
+                        self._lang.lookahead().alternatives
+                    ),
+                    rule_name
+                )
+                return scanned
+        return _Reference(rule_name)
+
+    def _op(self, term: Term) -> Op:  # pylint: disable=too-many-return-statements
+        if isinstance(term, RuleReference):
+            return self._reference(term.rule_name)
+        elif isinstance(term, Literal):
+            return _Terminal(_literal_scanner(term), term)
+        elif isinstance(term, LiteralRange):
+            return _Terminal(_range_scanner(term), term)
+        elif isinstance(term, EOFTerm):
+            return _Terminal(_scan_eof, term)
+        elif isinstance(term, CutTerm):
+            raise TypeError(
+                'the iterative engine does not support {0!r}'.format(term)
+            )
+        elif isinstance(term, RepeatTerm) and not term.possessive:
+            return _Repeat(
+                self._op(term.child),
+                term.min_count,
+                term.max_count
+            )
+        elif isinstance(term, GroupTerm):
+            size = len(term.children_groups)
+            return _Group([
+                _Sequence(None, index, size, [self._op(c) for c in children])
+                for index, children in enumerate(term.children_groups)
+            ])
+        else:
+            return _Terminal(_fallback_scanner(term, self._lang), term)
+
+
+def _literal_scanner(term: Literal) -> Scanner:
+    literal = term.text
+    size = len(literal)
+    # nodes are never changed once they are built, so one can be shared by
+    # every match of the term
+    node = LiteralNode(literal)
+    if term.case_sensitive:
+        def scan_literal(
+            text: str,
+            pos: int,
+            _failures: MatchCache
+        ) -> typing.Sequence[MatchResult]:
+            if text.startswith(literal, pos):
+                return ((pos + size, node),)
+            return ()
+    else:
+        lowered = literal.lower()
+
+        def scan_literal(
+            text: str,
+            pos: int,
+            _failures: MatchCache
+        ) -> typing.Sequence[MatchResult]:
+            if text[pos:pos + size].lower() == lowered:
+                return ((pos + size, node),)
+            return ()
+    return scan_literal
+
+
+def _range_scanner(term: LiteralRange) -> Scanner:
+    min_value = term.min_value
+    max_value = term.max_value
+    nodes: typing.Dict[str, LiteralNode] = dict()
+
+    def scan_range(
+        text: str,
+        pos: int,
+        _failures: MatchCache
+    ) -> typing.Sequence[MatchResult]:
+        if pos < len(text) and min_value <= ord(text[pos]) <= max_value:
+            char = text[pos]
+            node = nodes.get(char)
+            if node is None:
+                node = nodes[char] = LiteralNode(char)
+            return ((pos + 1, node),)
+        return ()
+
+    return scan_range
+
+
+def _literal_choice_scanner(rule: 'Rule') -> Scanner:
+    by_first: typing.Dict[str, typing.List[typing.Tuple[str, RuleNode]]] = (
+        dict()
+    )
+    for index, term_group in enumerate(rule.syntax.term_groups):
+        literal = typing.cast(Literal, term_group.terms[0]).text
+        by_first.setdefault(literal[0], []).append(
+            (literal, RuleNode(rule.name, index, (LiteralNode(literal),)))
+        )
+
+    def scan_literal_choice(
+        text: str,
+        pos: int,
+        _failures: MatchCache
+    ) -> typing.Sequence[MatchResult]:
+        return [
+            (pos + len(literal), node)
+            for literal, node in by_first.get(text[pos:pos + 1], ())
+            if text.startswith(literal, pos)
+        ]
+
+    return scan_literal_choice
+
+
+def _token_scanner(pattern: typing.Pattern[str]) -> Scanner:
+    match = pattern.match
+
+    def scan_token(
+        text: str,
+        pos: int,
+        _failures: MatchCache
+    ) -> typing.Sequence[MatchResult]:
+        lexeme = match(text, pos)
+        if lexeme is None:
+            return ()
+        return ((lexeme.end(), LiteralNode(lexeme.group())),)
+
+    return scan_token
+
+
+_EMPTY = LiteralNode('')
+
+
+def _scan_eof(
+    text: str,
+    pos: int,
+    _failures: MatchCache
+) -> typing.Sequence[MatchResult]:
+    if pos == len(text):
+        return ((pos, _EMPTY),)
+    return ()
+
+
+def _fallback_scanner(term: Term, lang: 'Language') -> Scanner:
+    cache = MatchCache()
+
+    def scan_term(
+        text: str,
+        pos: int,
+        _failures: MatchCache
+    ) -> typing.Sequence[MatchResult]:
+        return tuple(term.match(text, pos, lang, cache))
+
+    return scan_term
+
+
+def _rule_scanner(
+    rule_name: RuleName,
+    sequences: typing.Sequence[_Sequence],
+    viable: typing.Callable[[RuleName, str, int], typing.Sequence[int]]
+) -> Scanner:
+    """Scanner of a rule whose term groups only hold terminals"""
+    def scan_rule(
+        text: str,
+        pos: int,
+        failures: MatchCache
+    ) -> typing.Sequence[MatchResult]:
+        matches: typing.List[MatchResult] = []
+        for index in viable(rule_name, text, pos):
+            partial: typing.List[typing.Tuple[int, Nodes]] = [(pos, ())]
+            for op in typing.cast(
+                typing.Sequence[_Terminal],
+                sequences[index].ops
+            ):
+                found = []
+                for start, nodes in partial:
+                    scanned = op.scan(text, start, failures)
+                    if not scanned and start >= failures.farthest:
+                        failures.expect(start, op.expected)
+                    for end, node in scanned:
+                        found.append((end, nodes + (node,)))
+                partial = found
+            for end, nodes in partial:
+                matches.append((end, RuleNode(rule_name, index, nodes)))
+        return matches
+
+    return scan_rule
+
+
+class _Derivation(object):
+    """Match of a rule, group or repeat whose tree is not built yet
+
+    matches whose children are all built are built right away instead, see
+    _value. unlike the other children, these are a tuple in order, which is
+    fewer objects for the ones that are kept until the trees are built
+    """
+    __slots__ = ['rule_name', 'index', 'group_info', 'start', 'end', 'children']
+
+    def __init__(
+        self,
+        rule_name: typing.Optional[RuleName],
+        index: int,
+        group_info: typing.Optional[typing.Tuple[int, int]],
+        start: int,
+        end: int,
+        children: typing.Tuple[typing.Any, ...]
+    ) -> None:
+        self.rule_name = rule_name
+        self.index = index
+        self.group_info = group_info
+        self.start = start
+        self.end = end
+        self.children = children
+
+
+class _Wrap(object):
+    """RuleNode of a caller that only waits for its tail call
+
+    `outer` is the wrap of the caller's own caller if that was a tail call as
+    well, and `outermost` is the last wrap of the chain. a wrap without an
+    outer one leaves it None rather than point at itself, so that it is freed
+    as soon as it is dropped instead of waiting for the cycle collector
+    """
+    __slots__ = ['sequence', 'start', 'children', 'outer', 'outermost']
+
+    def __init__(
+        self,
+        sequence: _Sequence,
+        start: int,
+        children: Children,
+        outer: typing.Optional['_Wrap']
+    ) -> None:
+        self.sequence = sequence
+        self.start = start
+        self.children = children
+        self.outer = outer
+        self.outermost: typing.Optional[_Wrap] = (
+            None if outer is None else outer.outermost or outer
+        )
+
+
+class _Tail(object):
+    """Match of a tail call together with the RuleNodes around it"""
+    __slots__ = ['wrap', 'end', 'value']
+
+    def __init__(self, wrap: _Wrap, end: int, value: Value) -> None:
+        self.wrap = wrap
+        self.end = end
+        self.value = value
+
+
+# the values that are not built yet, which is quicker to check than Node
+_DEFERRED = (_Derivation, _Tail)
+
+
+class _Call(object):
+    """Rule matched at one offset, shared by every term that refers to it
+
+    `edges` are the continuations waiting for its matches, each with the wrap
+    to put around them, and `tails` are the calls it made in tail position.
+    `pending` counts the work left for its term groups: scheduled tasks and
+    continuations that wait on other calls. once nothing is pending the call
+    can not match anything new, so its edges are dropped along with the
+    partial matches that they hold on to.
+    """
+    __slots__ = ['pos', 'results', 'edges', 'tails', 'pending']
+
+    def __init__(self, pos: int) -> None:
+        self.pos = pos
+        self.results: typing.List[typing.Tuple[int, Value]] = []
+        self.edges: typing.Optional[typing.List[
+            typing.Tuple['_Continuation', typing.Optional[_Wrap]]
+        ]] = []
+        self.tails: typing.List[
+            typing.Tuple['_Call', _Sequence, int, Children]
+        ] = []
+        self.pending = 0
+
+
+class _Continuation(object, metaclass=abc.ABCMeta):
+    """Work that is resumed with every match of a term
+
+    `call` is the rule call that the work belongs to
+    """
+    __slots__ = ['call']
+
+    def __init__(self, call: typing.Optional[_Call]) -> None:
+        self.call = call
+
+    @abc.abstractmethod
+    def resume(self, parser: '_Parser', end: int, value: Value) -> None:
+        pass
+
+
+class _Frame(object):
+    """One attempt at matching a sequence from `start`
+
+    the owner is the call of the rule for term groups, or the continuation of
+    the group term for its children
+    """
+    __slots__ = ['sequence', 'start', 'owner', 'call']
+
+    def __init__(
+        self,
+        sequence: _Sequence,
+        start: int,
+        owner: typing.Union[_Call, _Continuation]
+    ) -> None:
+        self.sequence = sequence
+        self.start = start
+        self.owner = owner
+        self.call: typing.Optional[_Call] = (
+            owner if isinstance(owner, _Call) else owner.call
+        )
+
+
+class _Resume(_Continuation):
+    """Rest of a sequence after the term at `index`"""
+    __slots__ = ['frame', 'index', 'children']
+
+    def __init__(self, frame: _Frame, index: int, children: Children) -> None:
+        super().__init__(frame.call)
+        self.frame = frame
+        self.index = index
+        self.children = children
+
+    def resume(self, parser: '_Parser', end: int, value: Value) -> None:
+        parser.advance(self.frame, self.index + 1, end, (value, self.children))
+
+
+class _RepeatStep(_Continuation):
+    """Repeat term waiting for one more repetition of its child"""
+    __slots__ = ['op', 'start', 'pos', 'count', 'children', 'k']
+
+    def __init__(
+        self,
+        op: _Repeat,
+        start: int,
+        pos: int,
+        count: int,
+        children: Children,
+        k: _Continuation
+    ) -> None:
+        super().__init__(k.call)
+        self.op = op
+        self.start = start
+        self.pos = pos
+        self.count = count
+        self.children = children
+        self.k = k
+
+    def resume(self, parser: '_Parser', end: int, value: Value) -> None:
+        if end == self.pos and self.op.max_count is None:
+            # a repetition that matched nothing could be repeated forever
+            return
+        parser.repeat(
+            self.op,
+            self.start,
+            end,
+            self.count + 1,
+            (value, self.children),
+            self.k
+        )
+
+
+class _Accept(_Continuation):
+    __slots__ = ['results']
+
+    def __init__(self) -> None:
+        super().__init__(None)
+        self.results: typing.List[typing.Tuple[int, Value]] = []
+
+    def resume(self, parser: '_Parser', end: int, value: Value) -> None:
+        self.results.append((end, value))
+
+
+class _Parser(object):  # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        lang: 'Language',
+        program: _Program,
+        text: str,
+        failures: MatchCache
+    ) -> None:
+        self._program = program
+        self._failures = failures
+        self._recursive = program.recursive
+        self._text = text
+        self._viable = lang.lookahead().alternatives
+        self._calls: typing.Dict[MemoKey, _Call] = dict()
+        self._called: typing.Dict[int, typing.List[RuleName]] = dict()
+        self._tasks: typing.List[Task] = []
+        # new work never starts before the work that it came from, so nothing
+        # can refer to a call before the first offset that has work scheduled
+        self._scheduled = [0] * (len(text) + 1)
+        self._frontier = 0
+
+    def parse(self) -> typing.Iterator[typing.Tuple[int, Value]]:
+        """Matches of the root rule, each as soon as it is found"""
+        accept = _Accept()
+        results = accept.results
+        self.match(self._program.root, 0, accept)
+        try:
+            while self._tasks:
+                self._run(results)
+                yield from results
+                results.clear()
+        finally:
+            # calls that still wait on each other, like left recursive ones,
+            # are never resumed, and dropping their edges breaks the cycle.
+            # the tasks left when the caller stops early refer to the parser
+            self._tasks.clear()
+            for call in self._calls.values():
+                call.edges = None
+
+    def _run(self, results: typing.List[typing.Tuple[int, Value]]) -> None:
+        """Do the scheduled work until the root rule matches or none is left"""
+        tasks = self._tasks
+        scheduled = self._scheduled
+        with collector_paused():
+            while tasks and not results:
+                pos, call, func, args = tasks.pop()
+                func(*args)
+                if call is not None:
+                    call.pending -= 1
+                    if not call.pending:
+                        self._complete(call)
+                scheduled[pos] -= 1
+                if pos == self._frontier and not scheduled[pos]:
+                    self._forget_behind_frontier()
+
+    def advance(
+        self,
+        frame: _Frame,
+        index: int,
+        pos: int,
+        children: Children
+    ) -> None:
+        """Match the terms of a sequence from `index` on"""
+        ops = frame.sequence.ops
+        text = self._text
+        while index < len(ops):
+            op = ops[index]
+            if op.__class__ is not _Terminal:
+                break
+            matches = op.scan(text, pos, self._failures)
+            if len(matches) != 1:
+                if not matches and pos >= self._failures.farthest:
+                    self._failures.expect(pos, op.expected)
+                for end, node in reversed(matches):
+                    self._schedule(
+                        end,
+                        frame.call,
+                        self.advance,
+                        (frame, index + 1, end, (node, children))
+                    )
+                return
+            pos, node = matches[0]
+            children = (node, children)
+            index += 1
+        else:
+            self._finish(frame, pos, children)
+            return
+        owner = frame.owner
+        if (
+            index == len(ops) - 1
+            and op.__class__ is _Reference
+            and owner.__class__ is _Call
+            and pos > frame.start
+        ):
+            self._tail_call(
+                owner,
+                frame.sequence,
+                frame.start,
+                children,
+                self._call(op.rule_name, pos)
+            )
+        else:
+            self.match(op, pos, _Resume(frame, index, children))
+
+    def match(self, op: Op, pos: int, k: _Continuation) -> None:
+        if op.__class__ is _Terminal:
+            matches = op.scan(self._text, pos, self._failures)
+            if not matches and pos >= self._failures.farthest:
+                self._failures.expect(pos, op.expected)
+            for end, node in reversed(matches):
+                self._schedule(end, k.call, k.resume, (self, end, node))
+        elif op.__class__ is _Reference:
+            self._wait(self._call(op.rule_name, pos), k, None)
+        elif op.__class__ is _Group:
+            for sequence in reversed(op.sequences):
+                frame = _Frame(sequence, pos, k)
+                self._schedule(pos, k.call, self.advance, (frame, 0, pos, None))
+        else:
+            self.repeat(typing.cast(_Repeat, op), pos, pos, 0, None, k)
+
+    def repeat(
+        self,
+        op: _Repeat,
+        start: int,
+        pos: int,
+        count: int,
+        children: Children,
+        k: _Continuation
+    ) -> None:
+        if op.max_count is None or count < op.max_count:
+            self.match(
+                op.child,
+                pos,
+                _RepeatStep(op, start, pos, count, children, k)
+            )
+        if count >= op.min_count:
+            value = _value(None, 0, None, start, pos, _unwind(children))
+            self._schedule(pos, k.call, k.resume, (self, pos, value))
+
+    def _schedule(
+        self,
+        pos: int,
+        call: typing.Optional[_Call],
+        func: typing.Callable[..., None],
+        args: typing.Tuple[typing.Any, ...]
+    ) -> None:
+        if call is not None:
+            call.pending += 1
+        self._scheduled[pos] += 1
+        self._tasks.append((pos, call, func, args))
+
+    def _forget_behind_frontier(self) -> None:
+        """Drop the memo of offsets that no scheduled work can reach"""
+        scheduled = self._scheduled
+        frontier = self._frontier
+        while frontier < len(scheduled) and not scheduled[frontier]:
+            for rule_name in self._called.pop(frontier, ()):
+                del self._calls[rule_name, frontier]
+            frontier += 1
+        self._frontier = frontier
+
+    def _call(self, rule_name: RuleName, pos: int) -> _Call:
+        key = rule_name, pos
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(pos)
+            self._calls[key] = call
+            self._called.setdefault(pos, []).append(rule_name)
+            sequences = self._program.rules[rule_name]
+            viable = self._viable(rule_name, self._text, pos)
+            for index in reversed(viable):
+                frame = _Frame(sequences[index], pos, call)
+                self._schedule(pos, call, self.advance, (frame, 0, pos, None))
+            if not viable:
+                call.edges = None
+                if pos >= self._failures.farthest:
+                    self._failures.expect(pos, rule_name)
+        return call
+
+    def _complete(self, call: _Call) -> None:
+        """Drop the edges of a call that has no work left"""
+        done = [call]
+        while done:
+            call = done.pop()
+            edges = call.edges or ()
+            call.edges = None
+            for k, _ in edges:
+                waiting = k.call
+                if waiting is not None:
+                    waiting.pending -= 1
+                    if not waiting.pending:
+                        done.append(waiting)
+
+    def _wait(
+        self,
+        call: _Call,
+        k: _Continuation,
+        wrap: typing.Optional[_Wrap]
+    ) -> None:
+        """Pass every match of a call to `k`, including future ones"""
+        pending = [(call, wrap)]
+        while pending:
+            call, wrap = pending.pop()
+            if call.edges is not None:
+                call.edges.append((k, wrap))
+                if k.call is not None:
+                    k.call.pending += 1
+            for end, value in call.results:
+                self._deliver(k, wrap, end, value)
+            for callee, sequence, start, children in call.tails:
+                pending.append((callee, _Wrap(sequence, start, children, wrap)))
+
+    def _tail_call(
+        self,
+        caller: _Call,
+        sequence: _Sequence,
+        start: int,
+        children: Children,
+        callee: _Call
+    ) -> None:
+        caller.tails.append((callee, sequence, start, children))
+        for k, wrap in tuple(caller.edges or ()):
+            self._wait(callee, k, _Wrap(sequence, start, children, wrap))
+
+    def _finish(self, frame: _Frame, end: int, children: Children) -> None:
+        sequence = frame.sequence
+        owner = frame.owner
+        if sequence.rule_name is None:
+            value = _value(
+                None,
+                0,
+                (sequence.index, sequence.size),
+                frame.start,
+                end,
+                _unwind(children)
+            )
+            k = typing.cast(_Continuation, owner)
+            self._schedule(end, k.call, k.resume, (self, end, value))
+            return
+        call = typing.cast(_Call, owner)
+        values = _unwind(children)
+        if sequence.rule_name in self._recursive:
+            # the matches of these are checked against the spans of the
+            # matches in them, so they are never built before the end
+            if _is_cyclic(sequence.rule_name, call.pos, end, values):
+                return
+            value = _Derivation(
+                sequence.rule_name,
+                sequence.index,
+                None,
+                call.pos,
+                end,
+                tuple(values)
+            )
+        else:
+            value = _value(
+                sequence.rule_name,
+                sequence.index,
+                None,
+                call.pos,
+                end,
+                values
+            )
+        call.results.append((end, value))
+        for k, wrap in call.edges or ():
+            self._deliver(k, wrap, end, value)
+
+    def _deliver(
+        self,
+        k: _Continuation,
+        wrap: typing.Optional[_Wrap],
+        end: int,
+        value: Value
+    ) -> None:
+        if wrap is not None:
+            tail = _Tail(wrap, end, value)
+            self._schedule(end, k.call, k.resume, (self, end, tail))
+        else:
+            self._schedule(end, k.call, k.resume, (self, end, value))
+
+
+def _unwind(children: Children) -> typing.List[typing.Any]:
+    values = []
+    while children is not None:
+        value, children = children
+        values.append(value)
+    values.reverse()
+    return values
+
+
+def _value(
+    rule_name: typing.Optional[RuleName],
+    index: int,
+    group_info: typing.Optional[typing.Tuple[int, int]],
+    start: int,
+    end: int,
+    children: typing.List[typing.Any]
+) -> Value:
+    """Node of a match if all of its children are built, else a _Derivation
+
+    building these as they are found saves building them a second time once
+    the input is recognized
+    """
+    for child in children:
+        if isinstance(child, _DEFERRED):
+            return _Derivation(
+                rule_name,
+                index,
+                group_info,
+                start,
+                end,
+                tuple(children)
+            )
+    if rule_name is None:
+        return MultiNode(children, group_info)
+    return RuleNode(rule_name, index, tuple(children))
+
+
+def _is_cyclic(
+    rule_name: RuleName,
+    start: int,
+    end: int,
+    children: typing.Sequence[typing.Any]
+) -> bool:
+    """Whether a match of a rule contains a match of itself over its span"""
+    pending = list(children)
+    while pending:
+        value = pending.pop()
+        if isinstance(value, _Tail):
+            outermost = value.wrap.outermost or value.wrap
+            if (
+                outermost.start == start
+                and value.end == end
+                and outermost.sequence.rule_name == rule_name
+            ):
+                return True
+        elif (
+            isinstance(value, _Derivation)
+            and value.start == start
+            and value.end == end
+        ):
+            if value.rule_name == rule_name:
+                return True
+            pending.extend(value.children)
+    return False
+
+
+def _dependencies(value: Value) -> typing.Iterator[Value]:
+    if isinstance(value, _Derivation):
+        children = list(value.children)
+    else:
+        children = [typing.cast(_Tail, value).value]
+        wrap: typing.Optional[_Wrap] = typing.cast(_Tail, value).wrap
+        while wrap is not None:
+            children += _unwind(wrap.children)
+            wrap = wrap.outer
+    return (c for c in children if isinstance(c, _DEFERRED))
+
+
+def _build(value: Value, nodes: typing.Dict[int, Node]) -> Node:
+    if isinstance(value, _Derivation):
+        children = [
+            nodes[id(c)] if isinstance(c, _DEFERRED) else c
+            for c in value.children
+        ]
+        if value.rule_name is None:
+            return MultiNode(children, value.group_info)
+        return RuleNode(value.rule_name, value.index, tuple(children))
+    tail = typing.cast(_Tail, value)
+    node = tail.value
+    if isinstance(node, _DEFERRED):
+        node = nodes[id(node)]
+    wrap: typing.Optional[_Wrap] = tail.wrap
+    while wrap is not None:
+        node = RuleNode(
+            typing.cast(RuleName, wrap.sequence.rule_name),
+            wrap.sequence.index,
+            tuple(
+                nodes[id(c)] if isinstance(c, _DEFERRED) else c
+                for c in _unwind(wrap.children)
+            ) + (node,)
+        )
+        wrap = wrap.outer
+    return node
+
+
+def _materialize(value: Value, nodes: typing.Dict[int, Node]) -> Node:
+    """Build the tree of a match without recursing into its children
+
+    `nodes` maps the values that were already built to their nodes, so
+    matches that share a derivation share its nodes as well
+    """
+    if not isinstance(value, _DEFERRED):
+        return value
+    pending: typing.List[typing.Tuple[Value, bool]] = [(value, False)]
+    while pending:
+        current, ready = pending.pop()
+        if id(current) in nodes:
+            continue
+        if ready:
+            nodes[id(current)] = _build(current, nodes)
+        else:
+            pending.append((current, True))
+            pending.extend((d, False) for d in _dependencies(current))
+    return nodes[id(value)]
+
+
+def parse_all(
+    lang: 'Language',
+    text: str,
+    allow_partial_matches: bool,
+    failures: typing.Optional[MatchCache] = None
+) -> typing.Iterator[MatchResult]:
+    """Matches of the root rule
+
+    each match is yielded as soon as the text has been recognized up to its
+    end, so a caller that stops at the first one does not recognize the rest
+    """
+    if failures is None:
+        failures = MatchCache()
+    parser = _Parser(lang, _Program(lang), text, failures)
+    nodes: typing.Dict[int, Node] = dict()
+    # the values that were built stay alive, so that their ids in `nodes`
+    # are not taken by the values that are found after them
+    built: typing.List[Value] = []
+    for end, value in parser.parse():
+        if allow_partial_matches or end == len(text):
+            built.append(value)
+            with collector_paused():
+                node = _materialize(value, nodes)
+            yield end, node
+        elif end >= failures.farthest:
+            failures.expect(end, END_OF_TEXT)
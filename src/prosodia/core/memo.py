@@ -0,0 +1,481 @@
+"""Packrat memo of the matches of rules
+
+a MatchCache is shared by every RuleReference during one parse. it also
+notes the farthest failure of the parse, and can find the smallest span that
+was matched in more than one way when a parse is ambiguous.
+"""
+import contextlib
+import functools
+import gc
+import itertools
+import typing
+
+from .tree import Node, LiteralNode, RuleNode, MultiNode
+if typing.TYPE_CHECKING:
+    from .grammar import Language  # pylint: disable=unused-import
+    from .terms import Term  # pylint: disable=unused-import
+
+RuleName = str
+MatchResult = typing.Tuple[int, Node]
+# a term that failed to match, or the name of a rule that failed as a whole
+Expected = typing.Union['Term', str]
+MemoKey = typing.Tuple[RuleName, int]
+# the rule names noted at an offset, and how many of them there were
+Mark = typing.Tuple[typing.List[RuleName], int]
+RuleMatcher = typing.Callable[
+    [str, int, 'Language', 'MatchCache'],
+    typing.Iterable[MatchResult]
+]
+
+
+class _MemoEntry(object):  # pylint: disable=too-many-instance-attributes
+    """Lazily evaluated matches of one rule at one offset
+
+    every consumer walks the same results list and only pulls new matches from
+    the underlying generator once it has caught up with the list.
+
+    if the rule is re-entered at the same offset while it is being evaluated
+    then it is left recursive and its matches are grown from a seed: the
+    recursive call first fails, then each further pass feeds it every match
+    found by the passes before it until a pass finds nothing new (Warth et
+    al.). a pass only keeps the matches that use one of the matches of the
+    pass before it, since the others were already found then.
+
+    an eager entry finds all of its matches the first time it is asked for
+    one. rules that are left recursive through other rules need that: the
+    rules evaluated at the same offset while the rule grows only see its seed,
+    so they are evaluated again on every pass, and a lazy entry could let
+    another rule use them in the meantime
+    """
+    __slots__ = [
+        'key',
+        'results',
+        'seed',
+        'running',
+        'eager',
+        '_matcher',
+        '_cache',
+        '_matches',
+        '_mark',
+    ]
+
+    def __init__(
+        self,
+        rule_name: RuleName,
+        matcher: RuleMatcher,
+        text: str,
+        pos: int,
+        lang: 'Language',
+        cache: 'MatchCache',
+        eager: bool = False
+    ) -> None:
+        self.key = rule_name, pos
+        self.results: typing.List[MatchResult] = []
+        self.seed: typing.Optional[typing.Sequence[MatchResult]] = None
+        self.running = False
+        self.eager = eager
+        self._matcher = functools.partial(matcher, text, pos, lang, cache)
+        self._cache = cache
+        self._matches: typing.Optional[typing.Iterator[MatchResult]] = iter(
+            self._matcher()
+        )
+        self._mark = cache.mark(pos) if eager else None
+
+    def matches(self) -> typing.Iterator[MatchResult]:
+        """Matches for one more consumer of the entry
+
+        a consumer that gets here while the rule is running is its left
+        recursive call, which gets the seed
+        """
+        if self._matches is None:
+            return iter(self.results)
+        elif self.running:
+            if self.seed is None:
+                self.seed = []
+            return iter(self.seed)
+        return self.iterate()
+
+    def iterate(self) -> typing.Iterator[MatchResult]:
+        # the next match is pulled in here rather than in a helper method,
+        # since this is the only frame that a rule adds to the stack
+        results = self.results
+        index = 0
+        while True:
+            while index < len(results):
+                yield results[index]
+                index += 1
+            matches = self._matches
+            if matches is None or self.running:
+                return
+            self.running = True
+            try:
+                while True:
+                    match = next(matches, None)
+                    if match is not None:
+                        results.append(match)
+                    elif self.seed is not None:
+                        matches = self._matches = self._grow()
+                        continue
+                    else:
+                        matches = self._matches = None
+                    if matches is None or not self.eager:
+                        break
+            finally:
+                self.running = False
+
+    def _grow(self) -> typing.Iterator[MatchResult]:
+        pos = self.key[1]
+        grown = 0
+        empty: typing.List[MatchResult] = []
+        seed_ends: typing.Dict[int, int] = dict()
+        while grown < len(self.results):
+            newest = self.results[grown:]
+            for end, node in newest:
+                seed_ends[id(node)] = end
+            # the seeds that a match uses at pos are all empty but the last,
+            # and only the first pass finds empty matches. so from the third
+            # pass on, a match that uses none of the newest seeds was found
+            # before, and the recursive call only needs the empty seeds and
+            # the newest ones
+            self.seed = empty + newest
+            newest_ids = {id(node) for _, node in newest}
+            if not grown:
+                empty = [match for match in newest if match[0] == pos]
+            grown = len(self.results)
+            self._forget_dependents()
+            for end, node in self._matcher():
+                # a recursive step has to consume text or it could repeat
+                # forever
+                seeds: typing.List[Node] = []
+                _leading_seeds(node, pos, seed_ends, seeds)
+                if (
+                    any(id(seed) in newest_ids for seed in seeds)
+                    and all(seed_ends[id(seed)] < end for seed in seeds)
+                ):
+                    yield end, node
+        self.seed = None
+        self._forget_dependents()
+
+    def _forget_dependents(self) -> None:
+        # the rules that were evaluated at this offset since this rule
+        # started only saw the seed if they got to the recursive call
+        if self._mark is not None:
+            self._cache.forget_since(self.key[1], self._mark)
+
+
+def _leading_seeds(
+    node: Node,
+    start: int,
+    seed_ends: typing.Mapping[int, int],
+    seeds: typing.List[Node]
+) -> bool:
+    """Add the seed matches that a node uses at `start` to `seeds`
+
+    returns whether the node matched text, since its next sibling can only
+    use a seed when it did not
+    """
+    seed_end = seed_ends.get(id(node))
+    if seed_end is not None:
+        seeds.append(node)
+        return seed_end > start
+    elif isinstance(node, (RuleNode, MultiNode)):
+        return any(
+            _leading_seeds(child, start, seed_ends, seeds)
+            for child in node.children
+        )
+    elif isinstance(node, LiteralNode) and not node.value:
+        return False
+    else:
+        return True
+
+
+class Ambiguity(object):
+    """Span of the text that a rule matched in more than one way
+
+    `term_groups` holds the term group of each derivation. the same index
+    shows up more than once when the derivations only differ inside a group
+    or repeat term of that term group
+    """
+    __slots__ = ['rule_name', 'start', 'end', 'term_groups']
+
+    def __init__(
+        self,
+        rule_name: RuleName,
+        start: int,
+        end: int,
+        term_groups: typing.Sequence[int]
+    ) -> None:
+        self.rule_name = rule_name
+        self.start = start
+        self.end = end
+        self.term_groups = tuple(term_groups)
+
+    def __repr__(self) -> str:
+        return '<Ambiguity {0} {1}:{2} {3}>'.format(
+            self.rule_name,
+            self.start,
+            self.end,
+            list(self.term_groups)
+        )
+
+    def __str__(self) -> str:
+        return '{0!r} matches offsets {1} to {2} with term groups {3}'.format(
+            self.rule_name,
+            self.start,
+            self.end,
+            ', '.join(str(index) for index in self.term_groups)
+        )
+
+
+class MatchCache(object):  # pylint: disable=too-many-instance-attributes
+    """Packrat memo shared by every RuleReference during one parse
+
+    entries are keyed by rule name and offset, so separate references to the
+    same rule at the same position share a single evaluation of that rule.
+    rules that were evaluated all at once keep their matches in `finished`,
+    which is filled through `finish`
+    """
+    def __init__(self) -> None:
+        self.entries: typing.Dict[MemoKey, _MemoEntry] = dict()
+        self.finished: typing.Dict[MemoKey, typing.List[MatchResult]] = dict()
+        # the rules that have memo entries at each offset, which a cut drops
+        # from the lowest offset up, and the offsets below `_lowest` that
+        # have none. running entries that a cut had to keep are in `_kept`
+        self._offsets: typing.Dict[int, typing.List[RuleName]] = dict()
+        self._lowest = 0
+        self._kept: typing.List[MemoKey] = []
+        self.saved_invocations = 0
+        # the farthest offset that something failed to match at, and what
+        # failed there
+        self.farthest = -1
+        self.expected: typing.List[Expected] = []
+
+    def clear(self) -> None:
+        """Forget every match and failure, to match another text"""
+        self.entries.clear()
+        self.finished.clear()
+        self._offsets.clear()
+        self._lowest = 0
+        del self._kept[:]
+        self.farthest = -1
+        self.expected = []
+
+    def expect(self, pos: int, expected: Expected) -> None:
+        """Note that `expected` did not match at pos
+
+        matchers only call this when pos is not before `farthest`, so a
+        failure costs one comparison unless it is the farthest one so far
+        """
+        if pos > self.farthest:
+            self.farthest = pos
+            self.expected = [expected]
+        else:
+            self.expected.append(expected)
+
+    def match_term(
+        self,
+        term: 'Term',
+        text: str,
+        pos: int,
+        lang: 'Language',
+    ) -> typing.Iterable[MatchResult]:
+        """Matches of a term of a rule
+
+        terms match their children through here, so a memo that traces the
+        parse sees every term that is tried
+        """
+        return term.match(text, pos, lang, self)
+
+    def backtrack(self, rule_name: RuleName, pos: int, index: int) -> None:
+        """Note that a term group of a rule was tried and did not match"""
+
+    def finish(self, key: MemoKey, results: typing.List[MatchResult]) -> None:
+        """Keep the matches of a rule that was evaluated all at once"""
+        self.finished[key] = results
+        self._note(key)
+
+    def _note(self, key: MemoKey) -> None:
+        rule_name, pos = key
+        names = self._offsets.get(pos)
+        if names is None:
+            self._offsets[pos] = [rule_name]
+            self._lowest = min(self._lowest, pos)
+        else:
+            names.append(rule_name)
+
+    def match(
+        self,
+        rule_name: RuleName,
+        text: str,
+        pos: int,
+        lang: 'Language',
+    ) -> typing.Iterable[MatchResult]:
+        """Memoized matches of a rule of the language
+
+        a rule that can not start at pos gets no memo entry, it is only noted
+        as expected there. the lookahead is only asked when a rule is first
+        matched at pos, since an entry is only made when it lets the rule in
+        """
+        if (rule_name, pos) not in self.entries and not (
+            lang.lookahead().alternatives(rule_name, text, pos)
+        ):
+            if pos >= self.farthest:
+                self.expect(pos, rule_name)
+            return ()
+        return self.match_with(
+            rule_name,
+            lang.get_rule(rule_name).match,
+            text,
+            pos,
+            lang,
+            rule_name in lang.mutually_left_recursive()
+        )
+
+    def match_with(
+        self,
+        rule_name: RuleName,
+        matcher: RuleMatcher,
+        text: str,
+        pos: int,
+        lang: 'Language',
+        eager: bool = False
+    ) -> typing.Iterator[MatchResult]:
+        """Memoized matches of a rule that is matched by `matcher`
+
+        the matches of an eager rule are all found at once, see _MemoEntry
+        """
+        key = rule_name, pos
+        entry = self.entries.get(key)
+        if entry is None:
+            self._note(key)
+            entry = _MemoEntry(
+                rule_name,
+                matcher,
+                text,
+                pos,
+                lang,
+                self,
+                eager
+            )
+            self.entries[key] = entry
+            return entry.iterate()
+        self.saved_invocations += 1
+        return entry.matches()
+
+    def mark(self, pos: int) -> Mark:
+        """Where the rules that are noted at pos from now on start"""
+        names = self._offsets.setdefault(pos, [])
+        return names, len(names)
+
+    def forget_since(self, pos: int, mark: Mark) -> None:
+        """Drop the matches of the rules noted at pos after the mark
+
+        rules that are still running are kept
+        """
+        marked, start = mark
+        names = self._offsets.get(pos)
+        if names is not marked:
+            # a cut dropped the offset, along with the rules before it
+            marked, start = names or [], 0
+        running = []
+        for rule_name in marked[start:]:
+            entry = self.entries.get((rule_name, pos))
+            if entry is not None and entry.running:
+                running.append(rule_name)
+            else:
+                self.entries.pop((rule_name, pos), None)
+                self.finished.pop((rule_name, pos), None)
+        marked[start:] = running
+
+    def forget_before(self, pos: int) -> None:
+        """Drop the matches of rules that started before pos
+
+        a cut promises that the parse never backtracks past it, so the rules
+        that started before it are not asked for again. if they are, they are
+        just evaluated again. rules that are still running are kept, since
+        their entries are needed to notice left recursion.
+
+        only the offsets between the last cut and pos are looked at, so the
+        cuts of a parse look at every offset once, however big the memo is
+        """
+        kept = self._kept
+        self._kept = []
+        for key in kept:
+            self._forget(key, pos)
+        offsets = self._offsets
+        for offset in range(self._lowest, pos):
+            names = offsets.pop(offset, None)
+            for rule_name in names or ():
+                self._forget((rule_name, offset), pos)
+        self._lowest = max(self._lowest, pos)
+
+    def _forget(self, key: MemoKey, pos: int) -> None:
+        entry = self.entries.get(key)
+        if entry is not None and (entry.running or key[1] >= pos):
+            self._kept.append(key)
+        else:
+            self.entries.pop(key, None)
+            self.finished.pop(key, None)
+
+    def ambiguity(
+        self,
+        matches: typing.Sequence[Node]
+    ) -> typing.Optional[Ambiguity]:
+        """Smallest span that a rule matched in more than one way
+
+        only memo entries whose nodes are part of `matches` count. the matches
+        share those nodes, so each distinct node is visited once however many
+        trees it is part of
+        """
+        used = _node_ids(matches)
+        smallest: typing.Optional[Ambiguity] = None
+        memo = itertools.chain(
+            ((key, entry.results) for key, entry in self.entries.items()),
+            self.finished.items()
+        )
+        for (rule_name, pos), results in memo:
+            term_groups: typing.Dict[int, typing.List[int]] = dict()
+            for end, node in results:
+                if isinstance(node, RuleNode) and id(node) in used:
+                    term_groups.setdefault(end, []).append(node.term_group_id)
+            for end, indices in term_groups.items():
+                # a rule that only wraps an ambiguous rule matches the same
+                # span, and its entry was made before the one it wraps
+                if len(indices) > 1 and (
+                    smallest is None
+                    or end - pos <= smallest.end - smallest.start
+                ):
+                    smallest = Ambiguity(rule_name, pos, end, indices)
+        return smallest
+
+
+def _node_ids(nodes: typing.Iterable[Node]) -> typing.Set[int]:
+    """Ids of the nodes and all of their descendants"""
+    seen: typing.Set[int] = set()
+    pending = list(nodes)
+    while pending:
+        node = pending.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, (RuleNode, MultiNode)):
+            pending.extend(node.children)
+    return seen
+
+
+@contextlib.contextmanager
+def collector_paused() -> typing.Iterator[None]:
+    """Pause the cycle collector while a parse runs
+
+    a parse keeps its memo until it ends and frees the rest of its work by
+    reference counting, so a collection while it runs finds nothing. it would
+    only scan the entries and nodes that were kept so far again, and those
+    grow with the text
+    """
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
@@ -0,0 +1,764 @@
+"""Ordered choice matching engine
+
+matches a language like a parsing expression grammar: the term groups of a
+rule and the alternatives of a group are tried in order and the first one that
+matches wins, repeats are greedy and never give back a repetition, and every
+rule keeps a single result per offset. a parse therefore takes time linear in
+the length of the text, but it only finds the matches that the ordered
+choices lead to. analysis.ordered_choice_conflicts points out the places where
+that is not every match.
+
+a cut makes a failure after it fail the whole choice it is part of, instead of
+moving on to the next alternative. the parse then never backtracks past the
+cut, so the results of rules before it are dropped, like
+MatchCache.forget_before does for the packrat memo.
+
+failures are noted in a MatchCache like the packrat matcher does, which is
+all that the cache is used for apart from the terms that are matched by the
+packrat matcher.
+
+a left recursive rule grows its result from a failing seed, keeping each
+longer match until the rule stops getting longer (Warth et al.). while it
+grows, the results of the other left recursive rules at the same offset are
+thrown away after every pass, since they were built on the previous seed.
+
+given a LanguageTransformation, the accumulator of a term group is called as
+soon as the group has matched, and only the values are kept, so the parse
+tree is never built. an accumulator then also runs for matches that do not
+end up in the result, such as a rule that matched before the term it was
+followed by failed, or the shorter matches of a left recursive rule.
+"""
+import typing
+
+from . import analysis, chars
+from .memo import MatchCache, MatchResult, RuleName
+from .terms import (
+    END_OF_TEXT,
+    AtomicTerm,
+    CutTerm,
+    EOFTerm,
+    GroupTerm,
+    Literal,
+    LiteralRange,
+    RepeatTerm,
+    RuleReference,
+    Term,
+)
+from .tree import Node, LiteralNode, MultiNode, RuleNode
+from ..validation import group_types as gt
+
+if typing.TYPE_CHECKING:
+    from .grammar import Language, Rule  # pylint: disable=unused-import
+    from .transform import LanguageTransformation  # pylint: disable=unused-import
+
+Result = typing.Optional[MatchResult]
+Matcher = typing.Callable[[str, int], Result]
+# the result of a rule at each offset
+Memo = typing.Dict[int, Result]
+Nodes = typing.Tuple[Node, ...]
+# the end of a term list and its nodes, None if it failed, or _CUT_FAILED if
+# it failed after getting past a cut
+SequenceMatch = typing.Tuple[int, Nodes]
+SequenceResult = typing.Union[None, str, SequenceMatch]
+SequenceMatcher = typing.Callable[[str, int], SequenceResult]
+# makes the result of a rule out of the index of its term group, the results
+# of the terms, and its start and end
+MakeRule = typing.Callable[
+    [int, typing.Tuple[typing.Any, ...], int, int],
+    typing.Any
+]
+# makes the results of the characters of a run out of the text and the run
+MakeRun = typing.Callable[[str, int, int], typing.Any]
+
+_CUT_FAILED = 'cut failed'
+_UNKNOWN = object()
+
+
+class _NodeBuilder(object):
+    """Makes the nodes of a parse tree out of the matches
+
+    the builders are used in place of each other, so they all take the same
+    arguments even where one of them has no use for some
+    """
+    __slots__ = ['leaf', 'repeat', 'empty']
+
+    def __init__(self) -> None:
+        self.leaf: typing.Callable[[str], typing.Any] = LiteralNode
+        self.repeat: typing.Callable[[typing.List[typing.Any]], typing.Any] = (
+            MultiNode
+        )
+        self.empty: typing.Any = LiteralNode('')
+
+    def group(self, items: Nodes, index: int, size: int) -> typing.Any:
+        return MultiNode(list(items), (index, size))
+
+    def rule(self, rule_name: RuleName) -> MakeRule:
+        def make_rule_node(
+            index: int,
+            nodes: Nodes,
+            _start: int,
+            _end: int
+        ) -> RuleNode:
+            return RuleNode(rule_name, index, nodes)
+
+        return make_rule_node
+
+    def char_run(self, run: chars.CharRun) -> MakeRun:
+        make_nodes = run.nodes
+
+        def run_nodes(text: str, pos: int, end: int) -> typing.List[Node]:
+            return make_nodes(text[pos:end])
+
+        return run_nodes
+
+    def tree(self, node: Node, _pos: int) -> typing.Any:
+        return node
+
+
+class _ValueBuilder(object):
+    """Transforms the matches into values right away
+
+    the values take the place of the nodes that they would be transformed
+    from, so the matchers work the same with either builder
+    """
+    __slots__ = ['leaf', 'repeat', 'empty', '_transform']
+
+    def __init__(self, transform: 'LanguageTransformation') -> None:
+        self.leaf: typing.Callable[[str], typing.Any] = str
+        self.repeat: typing.Callable[[typing.List[typing.Any]], typing.Any] = (
+            _identity
+        )
+        self.empty: typing.Any = ''
+        self._transform = transform
+
+    def group(
+        self,
+        items: typing.Tuple[typing.Any, ...],
+        index: int,
+        size: int
+    ) -> typing.Any:
+        output: typing.List[typing.Any] = [gt.NoValue.Sentinel] * size
+        output[index] = list(items)
+        return output
+
+    def rule(self, rule_name: RuleName) -> MakeRule:
+        accumulators = tuple(
+            tgt.accumulator
+            for tgt in self._transform.transformation_rules[
+                rule_name
+            ].tf_syntax.tf_term_groups
+        )
+
+        def accumulate(
+            index: int,
+            values: typing.Tuple[typing.Any, ...],
+            _start: int,
+            _end: int
+        ) -> typing.Any:
+            return accumulators[index](values)
+
+        return accumulate
+
+    def char_run(self, run: chars.CharRun) -> MakeRun:
+        transform = self._transform.transform
+        make_nodes = run.nodes
+
+        def run_values(
+            text: str,
+            pos: int,
+            end: int
+        ) -> typing.List[typing.Any]:
+            return [transform(node) for node in make_nodes(text[pos:end])]
+
+        return run_values
+
+    def tree(self, node: Node, _pos: int) -> typing.Any:
+        return self._transform.transform(node)
+
+
+class RuleSpan(object):
+    """Where a rule matched, and the spans of the rules that it is made of
+
+    `children` holds the spans nested in lists and tuples the way the terms
+    of the rule matched, with None for the terms that hold no rule
+    """
+    __slots__ = ['rule_name', 'term_group_id', 'start', 'end', 'children']
+
+    def __init__(
+        self,
+        rule_name: RuleName,
+        term_group_id: int,
+        start: int,
+        end: int,
+        children: typing.Sequence[typing.Any]
+    ) -> None:
+        self.rule_name = rule_name
+        self.term_group_id = term_group_id
+        self.start = start
+        self.end = end
+        self.children = children
+
+    def __repr__(self) -> str:
+        return '<RuleSpan {0} {1}-{2}>'.format(
+            self.rule_name,
+            self.start,
+            self.end
+        )
+
+
+class _SpanBuilder(object):
+    """Keeps only where the rules matched, without making any nodes"""
+    __slots__ = ['leaf', 'repeat', 'empty']
+
+    def __init__(self) -> None:
+        self.leaf: typing.Callable[[str], typing.Any] = _nothing
+        self.repeat: typing.Callable[[typing.List[typing.Any]], typing.Any] = (
+            _identity
+        )
+        self.empty: typing.Any = None
+
+    def group(
+        self,
+        items: typing.Tuple[typing.Any, ...],
+        _index: int,
+        _size: int
+    ) -> typing.Any:
+        return items
+
+    def rule(self, rule_name: RuleName) -> MakeRule:
+        def make_span(
+            index: int,
+            items: typing.Tuple[typing.Any, ...],
+            start: int,
+            end: int
+        ) -> RuleSpan:
+            return RuleSpan(rule_name, index, start, end, items)
+
+        return make_span
+
+    def char_run(self, run: chars.CharRun) -> MakeRun:
+        rules = run.rules
+        choice = run.choice
+        if not any(rules):
+            return _no_spans
+
+        def run_spans(
+            text: str,
+            pos: int,
+            end: int
+        ) -> typing.List[typing.Any]:
+            spans: typing.List[typing.Any] = []
+            for offset in range(pos, end):
+                rule = rules[choice(text[offset])]
+                if rule is not None:
+                    spans.append(
+                        RuleSpan(rule[0], rule[1], offset, offset + 1, ())
+                    )
+            return spans
+
+        return run_spans
+
+    def tree(self, node: Node, pos: int) -> typing.Any:
+        return tree_spans(node, pos)
+
+
+Builder = typing.Union[_NodeBuilder, _ValueBuilder, _SpanBuilder]
+
+
+def _identity(values: typing.List[typing.Any]) -> typing.List[typing.Any]:
+    return values
+
+
+def _nothing(_literal: str) -> None:
+    return None
+
+
+def _no_spans(_text: str, _pos: int, _end: int) -> None:
+    return None
+
+
+def tree_spans(node: Node, pos: int) -> typing.List[RuleSpan]:
+    """Spans of the outermost rules of a tree whose text starts at pos"""
+    # the span of each rule node is made once all of its children are done
+    children: typing.List[typing.List[typing.Any]] = [[]]
+    pending: typing.List[typing.Tuple[Node, int]] = [(node, -1)]
+    while pending:
+        node, start = pending.pop()
+        if start >= 0:
+            items = children.pop()
+            children[-1].append(
+                RuleSpan(
+                    typing.cast(RuleNode, node).matched_rule,
+                    typing.cast(RuleNode, node).term_group_id,
+                    start,
+                    pos,
+                    items
+                )
+            )
+        elif isinstance(node, LiteralNode):
+            pos += len(node.value)
+        else:
+            if isinstance(node, RuleNode):
+                children.append([])
+                pending.append((node, pos))
+            pending.extend([(c, -1) for c in reversed(node.children)])
+    return children[0]
+
+
+class _Program(object):  # pylint: disable=too-many-instance-attributes
+    """Rules of a language turned into matchers with one result each"""
+    def __init__(
+        self,
+        lang: 'Language',
+        cache: MatchCache,
+        build: Builder,
+        root_rule: typing.Optional[RuleName] = None
+    ) -> None:
+        self._lang = lang
+        self._cache = cache
+        self._build = build
+        self._references: typing.Dict[RuleName, Matcher] = dict()
+        self._bodies: typing.Dict[RuleName, typing.List[Matcher]] = dict()
+        self._recursive = analysis.left_recursive_rules(lang)
+        self._memos: typing.List[Memo] = []
+        self._growing: typing.List[Memo] = []
+        # the memos with a result at each offset, which a cut drops from the
+        # lowest offset up, and the offsets that rules are growing at
+        self._offsets: typing.Dict[int, typing.List[Memo]] = dict()
+        self._lowest = 0
+        self._kept: typing.List[typing.Tuple[Memo, int]] = []
+        self._grown_at: typing.List[int] = []
+        self._pending: typing.List[RuleName] = []
+        self.root = self._reference(root_rule or lang.root_rule)
+        # the body of a rule is filled in once it has a reference, which lets
+        # recursive rules point at each other
+        while self._pending:
+            rule_name = self._pending.pop()
+            self._bodies[rule_name].append(
+                self._rule(lang.get_rule(rule_name))
+            )
+
+    def forget(self) -> None:
+        """Drop the results of every rule, to match another text"""
+        for memo in self._memos:
+            memo.clear()
+        self._offsets.clear()
+        self._lowest = 0
+        del self._kept[:]
+
+    def _note(self, memo: Memo, pos: int) -> None:
+        memos = self._offsets.get(pos)
+        if memos is None:
+            self._offsets[pos] = [memo]
+            self._lowest = min(self._lowest, pos)
+        else:
+            memos.append(memo)
+
+    def _forget_before(self, pos: int) -> None:
+        """Drop the results of rules that started before pos
+
+        results at the offsets that a rule is still growing at are kept, as
+        that rule needs them to notice its recursion
+        """
+        kept = self._kept
+        self._kept = []
+        for memo, offset in kept:
+            self._forget(memo, offset, pos)
+        offsets = self._offsets
+        for offset in range(self._lowest, pos):
+            for memo in offsets.pop(offset, ()):
+                self._forget(memo, offset, pos)
+        self._lowest = max(self._lowest, pos)
+
+    def _forget(self, memo: Memo, offset: int, pos: int) -> None:
+        if offset >= pos or offset in self._grown_at:
+            self._kept.append((memo, offset))
+        else:
+            memo.pop(offset, None)
+
+    def _reference(self, rule_name: RuleName) -> Matcher:
+        reference = self._references.get(rule_name)
+        if reference is not None:
+            return reference
+        rule = self._lang.get_rule(rule_name)
+        if rule.token:
+            reference = _token(
+                rule_name,
+                self._lang.token_pattern(rule_name),
+                self._cache,
+                self._build.leaf
+            )
+        elif rule_name in self._recursive:
+            reference = self._growing_reference(rule_name)
+        else:
+            reference = self._memo_reference(rule_name)
+        self._references[rule_name] = reference
+        return reference
+
+    def _body(self, rule_name: RuleName) -> typing.List[Matcher]:
+        body: typing.List[Matcher] = []
+        self._bodies[rule_name] = body
+        self._pending.append(rule_name)
+        return body
+
+    def _memo_reference(self, rule_name: RuleName) -> Matcher:
+        body = self._body(rule_name)
+        memo: Memo = dict()
+        self._memos.append(memo)
+
+        note = self._note
+
+        def match_reference(text: str, pos: int) -> Result:
+            result = memo.get(pos, _UNKNOWN)
+            if result is _UNKNOWN:
+                result = memo[pos] = body[0](text, pos)
+                note(memo, pos)
+            return typing.cast(Result, result)
+
+        return match_reference
+
+    def _growing_reference(self, rule_name: RuleName) -> Matcher:
+        body = self._body(rule_name)
+        memo: Memo = dict()
+        self._memos.append(memo)
+        growing = self._growing
+        growing.append(memo)
+        grown_at = self._grown_at
+        note = self._note
+
+        def match_growing(text: str, pos: int) -> Result:
+            if pos in memo:
+                return memo[pos]
+            # the recursive call fails at first, every further pass feeds it
+            # the longest match so far
+            result: Result = None
+            memo[pos] = None
+            note(memo, pos)
+            grown_at.append(pos)
+            try:
+                while True:
+                    grown = body[0](text, pos)
+                    if grown is None or (
+                        result is not None and grown[0] <= result[0]
+                    ):
+                        break
+                    result = memo[pos] = grown
+                    for other in growing:
+                        if other is not memo:
+                            other.pop(pos, None)
+            finally:
+                grown_at.pop()
+            return result
+
+        return match_growing
+
+    def _rule(self, rule: 'Rule') -> Matcher:
+        rule_name = rule.name
+        sequences = [
+            self._sequence(term_group.terms)
+            for term_group in rule.syntax.term_groups
+        ]
+        alternatives = self._lang.lookahead().alternatives
+        cache = self._cache
+        make_rule = self._build.rule(rule_name)
+
+        def match_rule(text: str, pos: int) -> Result:
+            indexes = alternatives(rule_name, text, pos)
+            if not indexes and pos >= cache.farthest:
+                cache.expect(pos, rule_name)
+            for index in indexes:
+                result = sequences[index](text, pos)
+                if result is _CUT_FAILED:
+                    return None
+                elif result is not None:
+                    end, nodes = typing.cast(SequenceMatch, result)
+                    return end, make_rule(index, nodes, pos, end)
+            return None
+
+        return match_rule
+
+    def _sequence(self, terms: typing.Sequence[Term]) -> SequenceMatcher:
+        matchers = [
+            None if isinstance(term, CutTerm) else self._term(term)
+            for term in terms
+        ]
+        forget_before = self._forget_before
+
+        def match_sequence(text: str, pos: int) -> SequenceResult:
+            nodes: typing.List[Node] = []
+            cut = False
+            for matcher in matchers:
+                if matcher is None:
+                    cut = True
+                    forget_before(pos)
+                    continue
+                result = matcher(text, pos)
+                if result is None:
+                    return _CUT_FAILED if cut else None
+                pos, node = result
+                nodes.append(node)
+            return pos, tuple(nodes)
+
+        return match_sequence
+
+    def _term(self, term: Term) -> Matcher:  # pylint: disable=too-many-return-statements
+        build = self._build
+        if isinstance(term, RuleReference):
+            return self._reference(term.rule_name)
+        elif isinstance(term, Literal):
+            return _literal(term, self._cache, build.leaf)
+        elif isinstance(term, LiteralRange):
+            return _literal_range(term, self._cache, build.leaf)
+        elif isinstance(term, EOFTerm):
+            return _eof(term, self._cache, build.leaf)
+        elif isinstance(term, RepeatTerm):
+            run = self._lang.char_run(term)
+            if run is not None:
+                return _char_run(term, run, self._cache, build)
+            return _repeat(term, self._term(term.child), build.repeat)
+        elif isinstance(term, GroupTerm):
+            return _group(
+                [
+                    self._sequence(children)
+                    for children in term.children_groups
+                ],
+                build.group
+            )
+        elif isinstance(term, AtomicTerm):
+            # every term already keeps just its first match
+            return self._term(term.child)
+        elif isinstance(term, CutTerm):
+            return _match_empty(build.empty)
+        else:
+            return _fallback(term, self._lang, self._cache, build.tree)
+
+
+def _literal(
+    term: Literal,
+    cache: MatchCache,
+    leaf: typing.Callable[[str], typing.Any]
+) -> Matcher:
+    literal = term.text
+    size = len(literal)
+    # nodes are never changed once they are built, so one can be shared by
+    # every match of the term
+    node = leaf(literal)
+    if term.case_sensitive:
+        def match_literal(text: str, pos: int) -> Result:
+            if text.startswith(literal, pos):
+                return pos + size, node
+            elif pos >= cache.farthest:
+                cache.expect(pos, term)
+            return None
+    else:
+        lowered = literal.lower()
+
+        def match_literal(text: str, pos: int) -> Result:
+            if text[pos:pos + size].lower() == lowered:
+                return pos + size, node
+            elif pos >= cache.farthest:
+                cache.expect(pos, term)
+            return None
+    return match_literal
+
+
+def _literal_range(
+    term: LiteralRange,
+    cache: MatchCache,
+    leaf: typing.Callable[[str], typing.Any]
+) -> Matcher:
+    min_value = term.min_value
+    max_value = term.max_value
+
+    def match_literal_range(text: str, pos: int) -> Result:
+        if pos < len(text) and min_value <= ord(text[pos]) <= max_value:
+            return pos + 1, leaf(text[pos])
+        elif pos >= cache.farthest:
+            cache.expect(pos, term)
+        return None
+
+    return match_literal_range
+
+
+def _token(
+    rule_name: RuleName,
+    pattern: typing.Pattern[str],
+    cache: MatchCache,
+    leaf: typing.Callable[[str], typing.Any]
+) -> Matcher:
+    match = pattern.match
+
+    def match_token(text: str, pos: int) -> Result:
+        lexeme = match(text, pos)
+        if lexeme is None:
+            if pos >= cache.farthest:
+                cache.expect(pos, rule_name)
+            return None
+        return lexeme.end(), leaf(lexeme.group())
+
+    return match_token
+
+
+def _eof(
+    term: EOFTerm,
+    cache: MatchCache,
+    leaf: typing.Callable[[str], typing.Any]
+) -> Matcher:
+    def match_eof(text: str, pos: int) -> Result:
+        if pos == len(text):
+            return pos, leaf('')
+        elif pos >= cache.farthest:
+            cache.expect(pos, term)
+        return None
+
+    return match_eof
+
+
+def _match_empty(empty: typing.Any) -> Matcher:
+    def match_empty(_text: str, pos: int) -> Result:
+        return pos, empty
+
+    return match_empty
+
+
+def _repeat(
+    term: RepeatTerm,
+    child: Matcher,
+    repeat: typing.Callable[[typing.List[typing.Any]], typing.Any]
+) -> Matcher:
+    min_count = term.min_count
+    max_count = term.max_count
+
+    def match_repeat(text: str, pos: int) -> Result:
+        nodes: typing.List[Node] = []
+        while max_count is None or len(nodes) < max_count:
+            result = child(text, pos)
+            if result is None:
+                break
+            end, node = result
+            nodes.append(node)
+            if end == pos:
+                # the child would match the same empty string forever
+                break
+            pos = end
+        if len(nodes) < min_count:
+            return None
+        return pos, repeat(nodes)
+
+    return match_repeat
+
+
+def _char_run(
+    term: RepeatTerm,
+    run: chars.CharRun,
+    cache: MatchCache,
+    build: Builder
+) -> Matcher:
+    min_count = term.min_count
+    max_count = term.max_count
+    child = term.child
+    scan = run.scan
+    make_nodes = build.char_run(run)
+    repeat = build.repeat
+
+    def match_char_run(text: str, pos: int) -> Result:
+        end = scan(text, pos)
+        if end >= cache.farthest and (
+            max_count is None or end - pos < max_count
+        ):
+            cache.expect(end, child)
+        if end - pos < min_count:
+            return None
+        return end, repeat(make_nodes(text, pos, end))
+
+    return match_char_run
+
+
+def _group(
+    sequences: typing.Sequence[SequenceMatcher],
+    group: typing.Callable[[Nodes, int, int], typing.Any]
+) -> Matcher:
+    alternatives = tuple(enumerate(sequences))
+    size = len(sequences)
+
+    def match_group(text: str, pos: int) -> Result:
+        for index, sequence in alternatives:
+            result = sequence(text, pos)
+            if result is _CUT_FAILED:
+                return None
+            elif result is not None:
+                end, nodes = typing.cast(SequenceMatch, result)
+                return end, group(nodes, index, size)
+        return None
+
+    return match_group
+
+
+def _fallback(
+    term: Term,
+    lang: 'Language',
+    cache: MatchCache,
+    tree: typing.Callable[[Node, int], typing.Any]
+) -> Matcher:
+    def match_term(text: str, pos: int) -> Result:
+        for end, node in term.match(text, pos, lang, cache):
+            return end, tree(node, pos)
+        return None
+
+    return match_term
+
+
+def parse_all(
+    lang: 'Language',
+    text: str,
+    allow_partial_matches: bool,
+    cache: typing.Optional[MatchCache] = None,
+    transform: typing.Optional['LanguageTransformation'] = None,
+    spans: bool = False
+) -> typing.List[MatchResult]:
+    """The match of the root rule
+
+    it is a value of the transform if one is given, or the RuleSpan of the
+    root rule if `spans` is set
+    """
+    if cache is None:
+        cache = MatchCache()
+    build: Builder
+    if spans:
+        build = _SpanBuilder()
+    elif transform is not None:
+        build = _ValueBuilder(transform)
+    else:
+        build = _NodeBuilder()
+    result = _Program(lang, cache, build).root(text, 0)
+    if result is None:
+        return []
+    elif allow_partial_matches or result[0] == len(text):
+        return [result]
+    elif result[0] >= cache.farthest:
+        cache.expect(result[0], END_OF_TEXT)
+    return []
+
+
+def rule_matcher(
+    lang: 'Language',
+    rule_name: RuleName,
+    cache: MatchCache,
+    transform: typing.Optional['LanguageTransformation'] = None
+) -> Matcher:
+    """Matcher of one rule that forgets the previous results on every call
+
+    the rule can then be matched at offsets that are not ordered, or in a text
+    that changed in between, as long as `cache` is cleared along with it
+    """
+    build: Builder = (
+        _NodeBuilder() if transform is None else _ValueBuilder(transform)
+    )
+    program = _Program(lang, cache, build, rule_name)
+    root = program.root
+
+    def match_rule(text: str, pos: int) -> Result:
+        program.forget()
+        return root(text, pos)
+
+    return match_rule
@@ -0,0 +1,286 @@
+"""Recognizer that tells whether a text is in a language
+
+instead of matches, the memo keeps the set of offsets that each rule can end
+at for each offset it starts at, and a term list passes on the set of
+offsets that its terms reach. no nodes are made, and every way of matching
+is followed, so the text is accepted exactly when the packrat matcher would
+find a match for it.
+
+a left recursive rule grows its set of ends from an empty seed until a pass
+adds nothing to it. the sets found by the rules that it called while it grew
+depend on the seed, so they are only kept until the next pass, and the ones
+of the last pass are kept for good once the rule is done.
+
+atomic terms, cuts and possessive repeats depend on the order that matches
+are found in, so a rule that has one of them is matched by the packrat
+matcher and only the ends of its matches are kept. that matcher makes
+nodes, and nests a call for each rule it enters.
+"""
+import typing
+
+from .memo import MatchCache, MemoKey, RuleName
+from .terms import (
+    AtomicTerm,
+    CutTerm,
+    EOFTerm,
+    GroupTerm,
+    Literal,
+    LiteralRange,
+    RepeatTerm,
+    RuleReference,
+    Term,
+)
+if typing.TYPE_CHECKING:
+    from .grammar import Language, Rule  # pylint: disable=unused-import
+
+Ends = typing.Set[int]
+# a search yields the key of every rule that it has to wait for, and finds
+# the ends of that rule in _Recognizer._searched once it is resumed
+Search = typing.Generator[MemoKey, None, Ends]
+
+
+class _Frame(object):
+    """A rule that is being matched"""
+    __slots__ = ['depth', 'head', 'ends', 'recursive', 'mark']
+
+    def __init__(self, depth: int, mark: int) -> None:
+        self.depth = depth
+        # the lowest depth of a running rule that the ends depend on
+        self.head = depth
+        self.ends: Ends = set()
+        self.recursive = False
+        # the tentative ends that were found while this rule ran start here
+        self.mark = mark
+
+
+class _Recognizer(object):  # pylint: disable=too-many-instance-attributes
+    def __init__(self, lang: 'Language', text: str) -> None:
+        self._lang = lang
+        self._text = text
+        self._alternatives = lang.lookahead().alternatives
+        self._done: typing.Dict[MemoKey, Ends] = dict()
+        # ends that depend on the seed of a running left recursive rule,
+        # along with its depth, in the order they were found
+        self._tentative: typing.Dict[MemoKey, typing.Tuple[Ends, int]] = (
+            dict()
+        )
+        self._found: typing.List[MemoKey] = []
+        self._running: typing.Dict[MemoKey, _Frame] = dict()
+        self._stack: typing.List[_Frame] = []
+        self._ordered: typing.Dict[RuleName, bool] = dict()
+        self._cache = MatchCache()
+        # the ends of the last rule whose search is done
+        self._searched: Ends = set()
+
+    def rule_ends(self, rule_name: RuleName, pos: int) -> Ends:
+        """Offsets that the rule can end at when it starts at pos"""
+        ends = self._known(rule_name, pos)
+        return self._search((rule_name, pos)) if ends is None else ends
+
+    def _search(self, key: MemoKey) -> Ends:
+        """Grow a rule, and every rule that its search has to wait for
+
+        the searches that wait are kept on a stack of their own, so deep
+        input does not reach the recursion limit
+        """
+        searches = [self._grow(key)]
+        while searches:
+            waited = next(searches[-1], None)
+            if waited is None:
+                searches.pop()
+            else:
+                searches.append(self._grow(waited))
+        return self._searched
+
+    def _known(self, rule_name: RuleName, pos: int) -> typing.Optional[Ends]:
+        """Ends of the rule that need no search, None if it has to be grown"""
+        key = rule_name, pos
+        ends = self._done.get(key)
+        if ends is not None:
+            return ends
+        tentative = self._tentative.get(key)
+        if tentative is not None:
+            self._depend(tentative[1])
+            return tentative[0]
+        frame = self._running.get(key)
+        if frame is not None:
+            # left recursion, which gets the ends found so far
+            frame.recursive = True
+            self._depend(frame.depth)
+            return frame.ends
+        rule = self._lang.get_rule(rule_name)
+        if rule.token:
+            lexeme = self._lang.token_pattern(rule_name).match(self._text, pos)
+            ends = set() if lexeme is None else {lexeme.end()}
+            self._done[key] = ends
+            return ends
+        if self._is_ordered(rule):
+            ends = {
+                end for end, _ in self._cache.match(
+                    rule_name,
+                    self._text,
+                    pos,
+                    self._lang
+                )
+            }
+            self._done[key] = ends
+            return ends
+        return None
+
+    def _depend(self, depth: int) -> None:
+        """Note that the running rule uses the seed of the rule at depth"""
+        caller = self._stack[-1]
+        caller.head = min(caller.head, depth)
+
+    def _grow(self, key: MemoKey) -> typing.Iterator[MemoKey]:
+        """Search for the ends of a rule, which are kept once it is done"""
+        rule = self._lang.get_rule(key[0])
+        frame = _Frame(len(self._stack), len(self._found))
+        self._running[key] = frame
+        self._stack.append(frame)
+        term_groups = rule.syntax.term_groups
+        pos = key[1]
+        while True:
+            frame.recursive = False
+            ends: Ends = set()
+            for index in self._alternatives(key[0], self._text, pos):
+                ends |= yield from self._sequence_ends(
+                    term_groups[index].terms,
+                    {pos}
+                )
+            if not frame.recursive or ends <= frame.ends:
+                break
+            frame.ends |= ends
+            # the next pass starts from a bigger seed
+            for found in self._found[frame.mark:]:
+                del self._tentative[found]
+            del self._found[frame.mark:]
+        ends |= frame.ends
+        self._stack.pop()
+        del self._running[key]
+        if frame.head < frame.depth:
+            self._tentative[key] = ends, frame.head
+            self._found.append(key)
+            self._depend(frame.head)
+        else:
+            # the last pass was run with the final ends as its seed
+            for found in self._found[frame.mark:]:
+                self._done[found] = self._tentative.pop(found)[0]
+            del self._found[frame.mark:]
+            self._done[key] = ends
+        self._searched = ends
+
+    def _sequence_ends(
+        self,
+        terms: typing.Sequence[Term],
+        positions: Ends
+    ) -> Search:
+        """Ends of a sequence of terms that starts at any of the positions"""
+        for term in terms:
+            reached: Ends = set()
+            for start in positions:
+                if isinstance(term, RuleReference):
+                    ends = self._known(term.rule_name, start)
+                    if ends is None:
+                        yield term.rule_name, start
+                        ends = self._searched
+                else:
+                    ends = self._terminal_ends(term, start)
+                    if ends is None:
+                        ends = yield from self._compound_ends(term, start)
+                reached |= ends
+            if not reached:
+                return reached
+            positions = reached
+        return positions
+
+    def _terminal_ends(self, term: Term, pos: int) -> typing.Optional[Ends]:
+        """Ends of a term that holds no rule reference, else None"""
+        text = self._text
+        if isinstance(term, Literal):
+            end = pos + len(term.text)
+            if term.case_sensitive:
+                matched = text.startswith(term.text, pos)
+            else:
+                matched = text[pos:end].lower() == term.text.lower()
+            return {end} if matched else set()
+        elif isinstance(term, LiteralRange):
+            matched = pos < len(text) and (
+                term.min_value <= ord(text[pos]) <= term.max_value
+            )
+            return {pos + 1} if matched else set()
+        elif isinstance(term, EOFTerm):
+            return {pos} if pos == len(text) else set()
+        elif isinstance(term, GroupTerm):
+            return None
+        elif isinstance(term, RepeatTerm):
+            run = self._lang.char_run(term)
+            return None if run is None else set(
+                range(pos + term.min_count, run.scan(text, pos) + 1)
+            )
+        return {
+            end for end, _ in term.match(text, pos, self._lang, self._cache)
+        }
+
+    def _compound_ends(self, term: Term, pos: int) -> Search:
+        """Ends of a group or a repeat that is not scanned as a run"""
+        ends: Ends = set()
+        if isinstance(term, GroupTerm):
+            for children in term.children_groups:
+                ends |= yield from self._sequence_ends(children, {pos})
+            return ends
+        repeat = typing.cast(RepeatTerm, term)
+        frontier = {pos}
+        count = 0
+        while True:
+            if count >= repeat.min_count:
+                # offsets that were already reached have been followed
+                frontier -= ends
+                ends |= frontier
+            if not frontier or count == repeat.max_count:
+                return ends
+            frontier = yield from self._sequence_ends(
+                (repeat.child,),
+                frontier
+            )
+            count += 1
+
+    def _is_ordered(self, rule: 'Rule') -> bool:
+        """Whether the matches of the rule depend on the order they are in"""
+        ordered = self._ordered.get(rule.name)
+        if ordered is None:
+            ordered = any(
+                _has_ordered_term(term_group.terms)
+                for term_group in rule.syntax.term_groups
+            )
+            self._ordered[rule.name] = ordered
+        return ordered
+
+
+def _has_ordered_term(terms: typing.Sequence[Term]) -> bool:
+    for term in terms:
+        if isinstance(term, (AtomicTerm, CutTerm)):
+            return True
+        elif isinstance(term, RepeatTerm):
+            if term.possessive or _has_ordered_term([term.child]):
+                return True
+        elif isinstance(term, GroupTerm):
+            if any(_has_ordered_term(c) for c in term.children_groups):
+                return True
+    return False
+
+
+def recognize(
+    lang: 'Language',
+    text: str,
+    allow_partial_matches: bool = True
+) -> bool:
+    """Whether the packrat matcher finds a match of the root rule
+
+    the match has to end at the end of the text unless
+    `allow_partial_matches` is set
+    """
+    ends = _Recognizer(lang, text).rule_ends(lang.root_rule, 0)
+    if allow_partial_matches:
+        return bool(ends)
+    return len(text) in ends
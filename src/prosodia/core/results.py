@@ -0,0 +1,191 @@
+"""Engines and match policies, and how the matches of a parse become its result
+
+the errors that a parse raises when the text has no match, or more than one
+that the policy accepts, are here too, so that the engines can pick a match
+without importing the grammar that they parse.
+"""
+from bisect import bisect_right
+import itertools
+import re
+import typing
+
+from .memo import Ambiguity, Expected, MatchResult
+from .terms import describe_expected
+from .tree import Node
+
+PACKRAT = 'packrat'
+EARLEY = 'earley'
+ITERATIVE = 'iterative'
+PEG = 'peg'
+
+# how parse picks the match it returns
+ALL_MATCHES = 'all'
+FIRST_MATCH = 'first'
+UNIQUE_MATCH = 'unique'
+LONGEST_MATCH = 'longest'
+
+
+class LineIndex(object):
+    """Line and column of offsets in a text
+
+    the offsets where lines start are only found the first time a position is
+    asked for. a text that is the end of a longer one starts at `first_line`
+    """
+    def __init__(self, text: str, first_line: int = 1) -> None:
+        self._text = text
+        self._first_line = first_line
+        self._starts: typing.Optional[typing.List[int]] = None
+
+    def position(self, offset: int) -> typing.Tuple[int, int]:
+        """Line and column of an offset, both counted from 1
+
+        offsets before the text are clamped to its start
+        """
+        offset = max(offset, 0)
+        if self._starts is None:
+            self._starts = [0]
+            self._starts.extend(
+                match.end() for match in re.finditer('\n', self._text)
+            )
+        line = bisect_right(self._starts, offset) - 1
+        return line + self._first_line, offset - self._starts[line] + 1
+
+
+class NoMatches(Exception):
+    """Text that the language does not match
+
+    `offset` is the farthest offset that the parse got to, and `expected`
+    describes what it tried to match there. both are unknown for engines that
+    do not keep track of failures. `first_line` is the line that the text
+    starts at, when it is the end of a longer text
+    """
+    def __init__(
+        self,
+        text: str = '',
+        offset: typing.Optional[int] = None,
+        expected: typing.Iterable[Expected] = (),
+        first_line: int = 1
+    ) -> None:
+        self.text = text
+        self.offset = offset
+        self.expected = list(
+            dict.fromkeys(describe_expected(e) for e in expected)
+        )
+        self.first_line = first_line
+        # the text can be long, so it is left out of the args
+        super().__init__(offset, self.expected)
+        self._lines = LineIndex(text, first_line)
+
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        return (
+            NoMatches,
+            (self.text, self.offset, self.expected, self.first_line)
+        )
+
+    @property
+    def line(self) -> typing.Optional[int]:
+        if self.offset is None:
+            return None
+        return self._lines.position(self.offset)[0]
+
+    @property
+    def column(self) -> typing.Optional[int]:
+        if self.offset is None:
+            return None
+        return self._lines.position(self.offset)[1]
+
+    def __str__(self) -> str:
+        if self.offset is None:
+            return 'no matches'
+        return 'no matches, expected {0} at line {1}, column {2}'.format(
+            ' or '.join(self.expected) or 'nothing',
+            self.line,
+            self.column
+        )
+
+
+class TooManyMatches(Exception):
+    """Text that the language matches in more than one way
+
+    `found` holds the matches that were found before the error was raised.
+    the matches after them are only found the first time `matches` is read,
+    so a highly ambiguous text is not enumerated unless it is asked for.
+    they are found with the memo of the parse, which has to be left alone
+    until then
+    """
+    def __init__(
+        self,
+        matches: typing.Sequence[Node],
+        ambiguity: typing.Optional[Ambiguity] = None,
+        rest: typing.Optional[typing.Iterator[Node]] = None
+    ) -> None:
+        super().__init__(self)
+        self.found = tuple(matches)
+        self.ambiguity = ambiguity
+        self._matches = list(matches)
+        self._rest = rest
+
+    @property
+    def matches(self) -> typing.Sequence[Node]:
+        if self._rest is not None:
+            self._matches.extend(self._rest)
+            self._rest = None
+        return self._matches
+
+    def __str__(self) -> str:
+        if self._rest is None:
+            count = '{0} matches'.format(len(self._matches))
+        else:
+            count = 'at least {0} matches'.format(len(self._matches))
+        if self.ambiguity is None:
+            return count
+        return '{0}, {1}'.format(count, self.ambiguity)
+
+
+def single_match(
+    matches: typing.Sequence[Node],
+    rest: typing.Optional[typing.Iterator[Node]] = None
+) -> Node:
+    if not matches:
+        raise NoMatches
+    elif len(matches) > 1:
+        raise TooManyMatches(matches, rest=rest)
+    else:
+        return matches[0]
+
+
+def select_match(
+    matches: typing.Iterable[MatchResult],
+    size: int,
+    policy: str = ALL_MATCHES
+) -> Node:
+    """The match that the policy picks out of lazily found matches
+
+    ALL_MATCHES and UNIQUE_MATCH both stop at the second match. the error of
+    ALL_MATCHES can still find the matches after it when they are read, while
+    that of UNIQUE_MATCH only has the two. a match can not be longer than the
+    text, so LONGEST_MATCH stops at the first match that ends at `size`
+    """
+    if policy == ALL_MATCHES:
+        nodes = (node for _, node in matches)
+        return single_match(list(itertools.islice(nodes, 2)), nodes)
+    elif policy == UNIQUE_MATCH:
+        return single_match(
+            [node for _, node in itertools.islice(matches, 2)]
+        )
+    elif policy == FIRST_MATCH:
+        for _, node in matches:
+            return node
+        raise NoMatches
+    elif policy == LONGEST_MATCH:
+        longest: typing.Optional[MatchResult] = None
+        for match in matches:
+            if longest is None or match[0] > longest[0]:
+                longest = match
+                if match[0] == size:
+                    break
+        if longest is None:
+            raise NoMatches
+        return longest[1]
+    else:
+        raise ValueError('unknown match policy: {0!r}'.format(policy))
@@ -0,0 +1,281 @@
+"""Per rule parse statistics
+
+a Profiler is a tracer that adds up what every rule of a packrat parse did:
+how often it was called and matched, how its memo lookups went, the time
+spent in it, and how many of its matches did not make it into the result.
+
+it also adds up the time spent under each stack of rules, which can be
+written in the collapsed stack format that flamegraph tools read.
+"""
+import time
+import typing
+
+from .memo import RuleName
+from .results import ALL_MATCHES
+from .trace import Tracer, TracingCache
+from .tree import Node, MultiNode, RuleNode
+if typing.TYPE_CHECKING:
+    from .grammar import Language  # pylint: disable=unused-import
+
+RuleStack = typing.Tuple[RuleName, ...]
+
+
+class RuleStats(object):  # pylint: disable=too-many-instance-attributes
+    """What one rule did during a parse
+
+    `inclusive` is the time spent in the rule including the rules it called,
+    counted once for recursive calls, and `exclusive` leaves the called rules
+    out. `discarded` is the number of matches that are not part of the result
+    """
+    __slots__ = [
+        'rule_name',
+        'invocations',
+        'successes',
+        'matches',
+        'memo_hits',
+        'memo_misses',
+        'backtracks',
+        'discarded',
+        'inclusive',
+        'exclusive',
+    ]
+
+    def __init__(self, rule_name: RuleName) -> None:
+        self.rule_name = rule_name
+        self.invocations = 0
+        self.successes = 0
+        self.matches = 0
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self.backtracks = 0
+        self.discarded = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memo_hits + self.memo_misses
+        return self.memo_hits / lookups if lookups else 0.0
+
+    def __repr__(self) -> str:
+        return '<RuleStats {0} {1} calls>'.format(
+            self.rule_name,
+            self.invocations
+        )
+
+
+class ParseStats(object):
+    """Rule statistics of a parse along with its totals
+
+    `nodes` counts the nodes that the parse created, whether or not they
+    were kept, and `peak_memo` is the most memo entries there were at once.
+    `stacks` maps each stack of rule names, outermost first, to the time
+    spent in its innermost rule by itself
+    """
+    def __init__(
+        self,
+        rules: typing.Dict[RuleName, RuleStats],
+        elapsed: float,
+        nodes: int,
+        peak_memo: int,
+        stacks: typing.Optional[typing.Dict[RuleStack, float]] = None
+    ) -> None:
+        self.rules = rules
+        self.elapsed = elapsed
+        self.nodes = nodes
+        self.peak_memo = peak_memo
+        self.stacks = stacks or dict()
+
+    def collapsed(self) -> typing.Iterator[str]:
+        """Lines of the rule stacks in the collapsed stack format
+
+        every line is the rule names joined by semicolons and the time spent
+        in microseconds, as flamegraph.pl and speedscope read them
+        """
+        for stack, spent in self.stacks.items():
+            microseconds = round(spent * 1e6)
+            if microseconds:
+                yield '{0} {1}'.format(';'.join(stack), microseconds)
+
+    def write_collapsed(self, stream: typing.TextIO) -> None:
+        for line in self.collapsed():
+            stream.write(line + '\n')
+
+    def report(self, limit: typing.Optional[int] = None) -> str:
+        """Table of the rules that took the most time by themselves first"""
+        rows = sorted(
+            self.rules.values(),
+            key=lambda r: r.exclusive,
+            reverse=True
+        )[:limit]
+        lines = [
+            '{0:<24} {1:>9} {2:>9} {3:>9} {4:>6} {5:>9} {6:>9} {7:>9} {8:>9}'
+            .format(
+                'rule', 'calls', 'matches', 'discarded', 'hits',
+                'backtrack', 'incl ms', 'excl ms', 'excl %'
+            )
+        ]
+        for rule in rows:
+            lines.append(
+                '{0:<24} {1:>9} {2:>9} {3:>9} {4:>6.0%} {5:>9} {6:>9.1f} '
+                '{7:>9.1f} {8:>9.1%}'.format(
+                    rule.rule_name[:24],
+                    rule.invocations,
+                    rule.matches,
+                    rule.discarded,
+                    rule.hit_rate,
+                    rule.backtracks,
+                    rule.inclusive * 1e3,
+                    rule.exclusive * 1e3,
+                    rule.exclusive / self.elapsed if self.elapsed else 0.0
+                )
+            )
+        lines.append(
+            '{0:.1f} ms, {1} nodes created, at most {2} memo entries'
+            .format(self.elapsed * 1e3, self.nodes, self.peak_memo)
+        )
+        return '\n'.join(lines)
+
+    def __str__(self) -> str:
+        return self.report()
+
+
+class Profiler(Tracer):
+    """Tracer that gathers ParseStats for the parse that uses its `cache`
+
+    the cache keeps every match that a rule found, so that the matches in
+    the result can be told apart from nodes that only look like them, such
+    as the rule nodes that a scanned run of characters makes without
+    matching the rule
+    """
+    def __init__(self) -> None:
+        self.cache = TracingCache(self, keep_matches=True)
+        self._rules: typing.Dict[RuleName, RuleStats] = dict()
+        # the rules that are running, as the stack up to each of them, when
+        # it started or was resumed, the time spent in the rules that it
+        # called since then and how many matches it found
+        self._stack: typing.List[typing.List[typing.Any]] = []
+        # the frames of the rules that found a match and wait to be asked
+        # for the next one, by rule and offset
+        self._suspended: typing.Dict[
+            typing.Tuple[RuleName, int],
+            typing.List[typing.List[typing.Any]]
+        ] = dict()
+        self._stacks: typing.Dict[RuleStack, float] = dict()
+        self._active: typing.Dict[RuleName, int] = dict()
+        # time spent in the outermost rules, which leaves out compiling
+        self._elapsed = 0.0
+
+    def _rule(self, rule_name: RuleName) -> RuleStats:
+        stats = self._rules.get(rule_name)
+        if stats is None:
+            stats = self._rules[rule_name] = RuleStats(rule_name)
+        return stats
+
+    def enter_rule(self, rule_name: str, pos: int) -> None:
+        self._rule(rule_name).invocations += 1
+        self._start(rule_name, [(), 0.0, 0.0, 0])
+
+    def exit_rule(self, rule_name: str, pos: int, matches: int) -> None:
+        self._stop(rule_name)
+
+    def suspend_rule(self, rule_name: str, pos: int, end: int) -> None:
+        frame = self._stop(rule_name)
+        frame[3] += 1
+        stats = self._rule(rule_name)
+        stats.matches += 1
+        if frame[3] == 1:
+            stats.successes += 1
+        self._suspended.setdefault((rule_name, pos), []).append(frame)
+
+    def resume_rule(self, rule_name: str, pos: int) -> None:
+        self._start(rule_name, self._suspended[rule_name, pos].pop())
+
+    def _start(self, rule_name: str, frame: typing.List[typing.Any]) -> None:
+        # a resumed rule is counted as called by the rule that asked for
+        # its next match
+        self._active[rule_name] = self._active.get(rule_name, 0) + 1
+        outer: RuleStack = self._stack[-1][0] if self._stack else ()
+        frame[:3] = [outer + (rule_name,), time.perf_counter(), 0.0]
+        self._stack.append(frame)
+
+    def _stop(self, rule_name: str) -> typing.List[typing.Any]:
+        frame = self._stack.pop()
+        stack, start, nested = frame[:3]
+        elapsed = time.perf_counter() - start
+        stats = self._rule(rule_name)
+        stats.exclusive += elapsed - nested
+        self._stacks[stack] = self._stacks.get(stack, 0.0) + elapsed - nested
+        self._active[rule_name] -= 1
+        if not self._active[rule_name]:
+            stats.inclusive += elapsed
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        else:
+            self._elapsed += elapsed
+        return frame
+
+    def memo_hit(self, rule_name: str, pos: int) -> None:
+        self._rule(rule_name).memo_hits += 1
+
+    def memo_miss(self, rule_name: str, pos: int) -> None:
+        self._rule(rule_name).memo_misses += 1
+
+    def backtrack(self, rule_name: str, pos: int, index: int) -> None:
+        self._rule(rule_name).backtracks += 1
+
+    def stats(self, results: typing.Sequence[Node] = ()) -> ParseStats:
+        """Statistics so far, with `results` as the matches that were kept"""
+        used: typing.Dict[RuleName, int] = dict()
+        matches = self.cache.rule_matches or dict()
+        for node in _distinct_nodes(results):
+            match = matches.get(id(node))
+            if match is not None:
+                used[match[0]] = used.get(match[0], 0) + 1
+        for stats in self._rules.values():
+            stats.discarded = stats.matches - used.get(stats.rule_name, 0)
+        return ParseStats(
+            self._rules,
+            self._elapsed,
+            self.cache.nodes,
+            self.cache.peak_memo,
+            self._stacks
+        )
+
+
+def profile(
+    lang: 'Language',
+    raw_text: str,
+    allow_partial_matches: bool = True,
+    policy: str = ALL_MATCHES
+) -> typing.Tuple[Node, ParseStats]:
+    """Parse the text with the packrat engine and report on every rule
+
+    only the matches of the returned node count as kept, so a rule's
+    other matches are reported as discarded
+    """
+    profiler = Profiler()
+    node = lang.parse(
+        raw_text,
+        allow_partial_matches,
+        profiler.cache,
+        policy=policy
+    )
+    return node, profiler.stats([node])
+
+
+def _distinct_nodes(nodes: typing.Iterable[Node]) -> typing.List[Node]:
+    """The nodes and their descendants, each once however often it is shared
+    """
+    seen: typing.Set[int] = set()
+    found = []
+    pending = list(nodes)
+    while pending:
+        node = pending.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        found.append(node)
+        if isinstance(node, (RuleNode, MultiNode)):
+            pending.extend(node.children)
+    return found
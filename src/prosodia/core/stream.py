@@ -0,0 +1,136 @@
+"""Streaming transforms of texts that are a series of records
+
+a text like a log or a file of rules is a repeat of one rule, and each of its
+matches can be transformed as soon as it is parsed. the records are matched
+one after the other, each at the end of the one before, and each time the
+memo and the nodes of the previous record are let go, so the memory used is
+that of the largest record rather than of the whole text.
+
+a source that is a stream is read in chunks, and the lines of the records
+that are done are dropped once they add up to more than a chunk. a record is
+only taken once its parse stayed `lookahead` characters away from the end of
+the text read so far, as a parse that got closer might have turned out
+differently with more text. the reads get larger while a record goes on, and
+are back to `chunk_size` for the next one.
+"""
+import typing
+
+from .memo import MatchCache, RuleName
+from .results import PACKRAT, PEG, NoMatches, select_match
+from .terms import RuleReference
+from .peg import rule_matcher
+from .tree import Node
+if typing.TYPE_CHECKING:
+    from .grammar import Grammar  # pylint: disable=unused-import
+
+# the end of a record and its node or value, None if there is no record
+Record = typing.Optional[typing.Tuple[int, typing.Any]]
+RecordMatcher = typing.Callable[[str, int], Record]
+
+
+def iter_records(  # pylint: disable=too-many-locals
+    grammar: 'Grammar[typing.Any]',
+    source: typing.Union[str, typing.TextIO],
+    rule_name: RuleName,
+    chunk_size: int = 1 << 16,
+    lookahead: int = 4096
+) -> typing.Iterator[typing.Any]:
+    """Transformed values of the matches of rule_name that make up source
+
+    a packrat grammar takes the longest match of every record, and its
+    policy picks between the matches that end there. the source must be
+    nothing but records, anything else raises NoMatches
+    """
+    cache = MatchCache()
+    match = _record_matcher(grammar, rule_name, cache)
+    if isinstance(source, str):
+        read: typing.Optional[typing.Callable[[int], str]] = None
+        text = source
+    else:
+        read = source.read
+        text = ''
+    pos = 0
+    # the line that the text starts at, once its start has been dropped
+    first_line = 1
+    read_size = chunk_size
+    while True:
+        if read is not None and len(text) - pos < read_size + lookahead:
+            chunk = read(read_size)
+            if chunk:
+                text += chunk
+                continue
+            read = None
+        if pos == len(text) and read is None:
+            return
+        cache.clear()
+        record = match(text, pos)
+        reached = max(cache.farthest, pos if record is None else record[0])
+        if read is not None and reached + lookahead >= len(text):
+            # the record may go on in the text that was not read yet
+            read_size = max(read_size, len(text) - pos) * 2
+            continue
+        if record is None or record[0] == pos:
+            raise NoMatches(
+                text,
+                max(cache.farthest, pos),
+                cache.expected,
+                first_line
+            )
+        pos, value = record
+        read_size = chunk_size
+        cache.clear()
+        yield value
+        if read is not None and pos > chunk_size:
+            line_start = text.rfind('\n', 0, pos) + 1
+            if line_start > chunk_size:
+                first_line += text.count('\n', 0, line_start)
+                text = text[line_start:]
+                pos -= line_start
+
+
+def _record_matcher(
+    grammar: 'Grammar[typing.Any]',
+    rule_name: RuleName,
+    cache: MatchCache
+) -> RecordMatcher:
+    lang = grammar.language
+    transform = grammar.transform
+    if grammar.engine == PEG:
+        match_rule = rule_matcher(
+            lang,
+            rule_name,
+            cache,
+            transform if grammar.fused else None
+        )
+        if grammar.fused:
+            return match_rule
+
+        def match_transformed(text: str, pos: int) -> Record:
+            result = match_rule(text, pos)
+            if result is None:
+                return None
+            return result[0], transform.transform(result[1])
+
+        return match_transformed
+    elif grammar.engine == PACKRAT:
+        reference = RuleReference(rule_name)
+        policy = grammar.policy
+
+        def match_longest(text: str, pos: int) -> Record:
+            matches = list(reference.match(text, pos, lang, cache))
+            if not matches:
+                return None
+            end = max(match[0] for match in matches)
+            node: Node = select_match(
+                [match for match in matches if match[0] == end],
+                end,
+                policy
+            )
+            return end, transform.transform(node)
+
+        return match_longest
+    else:
+        raise ValueError(
+            'records can only be streamed with the packrat or peg engine, '
+            'not {0!r}'.format(grammar.engine)
+        )
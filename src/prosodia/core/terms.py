@@ -0,0 +1,690 @@
+"""Terms that the term groups of a syntax are made of
+
+each term matches a part of the text and yields every way it can do so, as
+the end offset and the node of each match, in the order that the packrat
+engine tries them.
+"""
+import abc
+from collections import deque
+import typing
+
+from .memo import Expected, MatchCache, MatchResult, RuleName
+from .tree import (
+    Links,
+    LinkedNodes,
+    Node,
+    LiteralNode,
+    MultiNode,
+    PrefixNodes,
+)
+from ..validation.validity import Validity
+from ..validation import group_types as gt
+from ..validation.transform_validation import get_return_type
+if typing.TYPE_CHECKING:
+    from .chars import CharRun  # pylint: disable=unused-import
+    from .grammar import Language  # pylint: disable=unused-import
+    from .transform import LanguageTransformation  # pylint: disable=unused-import
+
+
+class Term(object, metaclass=abc.ABCMeta):
+    """Unit of a syntax"""
+    @abc.abstractmethod
+    def match(
+        self,
+        text: str,
+        pos: int,
+        lang: 'Language',
+        cache: 'MatchCache',
+    ) -> typing.Iterable[MatchResult]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def validate(self, lang: 'Language') -> Validity:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def equals(self, other: 'Term') -> Validity:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_transform_type(self, lt: 'LanguageTransformation') -> type:
+        raise NotImplementedError
+
+
+class RuleReference(Term):
+    """Term that represents a nested rule"""
+    def __init__(self, rule_name: RuleName) -> None:
+        self.rule_name = rule_name
+
+    def match(
+        self,
+        text: str,
+        pos: int,
+        lang: 'Language',
+        cache: 'MatchCache',
+    ) -> typing.Iterable[MatchResult]:
+        # the iterator of the memo is returned rather than yielded from, so
+        # the memo entry is the only frame that a rule reference keeps on the
+        # stack
+        return cache.match(self.rule_name, text, pos, lang)
+
+    def equals(self, other: Term) -> Validity:
+        if not isinstance(other, RuleReference):
+            return Validity.invalid(
+                'RuleReference: other is not rule reference'
+            )
+        elif self.rule_name != other.rule_name:
+            return Validity.invalid('RuleReference: different rule names')
+        else:
+            return Validity.valid()
+
+    def __repr__(self) -> str:
+        return '<RuleReference(Term) {0}>'.format(self.rule_name)
+
+    def validate(self, lang: 'Language') -> Validity:
+        if self.rule_name not in lang.rules:
+            return Validity.invalid(
+                'rule reference points to a rule that does not exist: {0!r}'
+                .format(self.rule_name)
+            )
+        else:
+            return Validity.valid()
+
+    def get_transform_type(self, lt: 'LanguageTransformation') -> type:
+        rules = lt.transformation_rules
+        return get_return_type(
+            rules[self.rule_name].tf_syntax.tf_term_groups[0].accumulator
+        )
+
+
+class Literal(Term):
+    """Term that represents a plaintext literal"""
+    def __init__(self, text: str, case_sensitive: bool = True) -> None:
+        self.text = text
+        self.case_sensitive = case_sensitive
+
+    def match(
+        self,
+        text: str,
+        pos: int,
+        lang: 'Language',
+        cache: 'MatchCache',
+    ) -> typing.Iterable[MatchResult]:
+        if self.case_sensitive:
+            matched = text.startswith(self.text, pos)
+        else:
+            end = pos + len(self.text)
+            matched = text[pos:end].lower() == self.text.lower()
+        if matched:
+            yield pos + len(self.text), LiteralNode(self.text)
+        elif pos >= cache.farthest:
+            cache.expect(pos, self)
+
+    def __repr__(self) -> str:
+        return '<Literal(Term) {0!r}>'.format(self.text)
+
+    def equals(self, other: Term) -> Validity:
+        if not isinstance(other, Literal):
+            return Validity.invalid('Literal: other is not a literal')
+        elif self.text != other.text:
+            return Validity.invalid('Literal: text is different')
+        else:
+            return Validity.valid()
+
+    def validate(self, lang: 'Language') -> Validity:
+        return Validity.valid()
+
+    def get_transform_type(self, lt: 'LanguageTransformation') -> type:
+        return get_return_type(LiteralNode.transform)
+
+
+class LiteralRange(Term):
+    def __init__(self, min_value: int, max_value: int) -> None:
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def match(
+        self,
+        text: str,
+        pos: int,
+        lang: 'Language',
+        cache: 'MatchCache',
+    ) -> typing.Iterable[MatchResult]:
+        if pos < len(text):
+            first_char = text[pos]
+            if self.min_value <= ord(first_char) <= self.max_value:
+                yield pos + 1, LiteralNode(first_char)
+                return
+        if pos >= cache.farthest:
+            cache.expect(pos, self)
+
+    def __repr__(self) -> str:
+        return '<LiteralRange(Term) {0}, {1}>'.format(
+            self.min_value,
+            self.max_value
+        )
+
+    def equals(self, other: Term) -> Validity:
+        if not isinstance(other, LiteralRange):
+            return Validity.invalid(
+                'LiteralRange: other is not a literal range'
+            )
+        elif (
+            self.min_value != other.min_value
+            or self.max_value != other.max_value
+        ):
+            return Validity.invalid('LiteralRange: range values are different')
+        else:
+            return Validity.valid()
+
+    def validate(self, lang: 'Language') -> Validity:
+        if self.max_value < self.min_value:
+            return Validity.invalid('LiteralRange: max cannot be less than min')
+        elif self.max_value < 0 or self.min_value < 0:
+            return Validity.invalid(
+                'LiteralRange: cannot have negative range values'
+            )
+        else:
+            return Validity.valid()
+
+    def get_transform_type(self, lt: 'LanguageTransformation') -> type:
+        return get_return_type(LiteralNode.transform)
+
+
+class EOFTerm(Term):
+    def match(
+        self,
+        text: str,
+        pos: int,
+        lang: 'Language',
+        cache: 'MatchCache',
+    ) -> typing.Iterable[MatchResult]:
+        if pos == len(text):
+            yield pos, LiteralNode('')
+        elif pos >= cache.farthest:
+            cache.expect(pos, self)
+
+    def __repr__(self) -> str:
+        return '<EOFTerm(Term)>'
+
+    def equals(self, other: Term) -> Validity:
+        if not isinstance(other, EOFTerm):
+            return Validity.invalid('EOFTerm: other is not an EOFTerm')
+        else:
+            return Validity.valid()
+
+    def validate(self, lang: 'Language') -> Validity:
+        return Validity.valid()
+
+    def get_transform_type(self, lt: 'LanguageTransformation') -> type:
+        return get_return_type(LiteralNode.transform)
+
+
+# what a parse that does not allow partial matches expects after a match
+END_OF_TEXT = EOFTerm()
+
+
+class RepeatTerm(Term):
+    """Term that matches its child a number of times in a row
+
+    a possessive repeat never gives back a repetition: each repetition takes
+    the first match of the child, and only the longest match is kept.
+    matches come with the fewest repetitions first, also for a repeat of
+    single characters that is scanned at once, so FIRST_MATCH and the
+    generated parsers pick the same match whichever way a repeat is matched
+    """
+    def __init__(
+        self,
+        child: Term,
+        min_count: int,
+        max_count: typing.Optional[int],
+        possessive: bool = False
+    ) -> None:
+        self.child = child
+        self.min_count = min_count
+        self.max_count = max_count
+        self.possessive = possessive
+
+    def __repr__(self) -> str:
+        return '<RepeatTerm(Term) {0!r},{1},{2}{3}>'.format(
+            self.child,
+            self.min_count,
+            self.max_count,
+            ',possessive' if self.possessive else ''
+        )
+
+    def match(
+        self,
+        text: str,
+        pos: int,
+        lang: 'Language',
+        cache: 'MatchCache',
+    ) -> typing.Iterable[MatchResult]:
+        run = lang.char_run(self)
+        if run is not None:
+            return self._match_run(run, text, pos, lang, cache)
+        elif self.possessive:
+            return self._match_possessive(text, pos, lang, cache)
+        return self._match_repetitions(text, pos, lang, cache)
+
+    def _match_run(
+        self,
+        run: 'CharRun',
+        text: str,
+        pos: int,
+        _lang: 'Language',
+        cache: 'MatchCache',
+    ) -> typing.Iterator[MatchResult]:
+        # the longest run is scanned at once and every shorter match is a
+        # prefix of its nodes, with the fewest repetitions first like the
+        # other repeats
+        end = run.scan(text, pos)
+        count = end - pos
+        if end >= cache.farthest and (
+            self.max_count is None or count < self.max_count
+        ):
+            cache.expect(end, self.child)
+        if count < self.min_count:
+            return
+        nodes = run.nodes(text[pos:end])
+        lowest = count if self.possessive else self.min_count
+        for size in range(lowest, count + 1):
+            yield pos + size, MultiNode(PrefixNodes(nodes, size))
+
+    def _match_possessive(
+        self,
+        text: str,
+        pos: int,
+        lang: 'Language',
+        cache: 'MatchCache',
+    ) -> typing.Iterator[MatchResult]:
+        nodes: typing.List[Node] = []
+        start = pos
+        while self.max_count is None or len(nodes) < self.max_count:
+            match = next(
+                iter(cache.match_term(self.child, text, start, lang)),
+                None
+            )
+            if match is None:
+                break
+            end, node = match
+            nodes.append(node)
+            if end == start:
+                # the child would match the same empty string forever
+                break
+            start = end
+        if len(nodes) >= self.min_count:
+            yield start, MultiNode(nodes)
+
+    def _match_repetitions(
+        self,
+        text: str,
+        pos: int,
+        lang: 'Language',
+        cache: 'MatchCache',
+    ) -> typing.Iterator[MatchResult]:
+        # breadth first, so matches come out with the fewest repetitions
+        # first. every repetition only adds a link to the nodes before it
+        queue: typing.Deque[typing.Tuple[int, int, Links]] = deque(
+            [(pos, 0, None)]
+        )
+        while queue:
+            start, count, links = queue.popleft()
+            if count >= self.min_count:
+                yield start, MultiNode(LinkedNodes(links, count))
+            if self.max_count is None or count < self.max_count:
+                for end, node in cache.match_term(
+                    self.child, text, start, lang
+                ):
+                    queue.append((end, count + 1, (node, links)))
+
+    def equals(self, other: Term) -> Validity:
+        if not isinstance(other, RepeatTerm):
+            return Validity.invalid('RepeatTerm: other is not a RepeatTerm')
+        elif (
+            self.min_count != other.min_count
+            or self.max_count != other.max_count
+        ):
+            return Validity.invalid(
+                'RepeatTerm: other does not have same range'
+            )
+        elif self.possessive != other.possessive:
+            return Validity.invalid('RepeatTerm: only one repeat is possessive')
+        validity = self.child.equals(other.child)
+        if not validity:
+            return validity + Validity.invalid(
+                'RepeatTerm: children are not equal'
+            )
+        else:
+            return Validity.valid()
+
+    def validate(self, lang: 'Language') -> Validity:
+        if (
+            self.max_count is not None
+            and self.max_count < self.min_count
+        ):
+            return Validity.invalid(
+                'RepeatTerm: max count is less than min count'
+            )
+        elif self.max_count is not None and self.max_count < 0:
+            return Validity.invalid(
+                'RepeatTerm: max count cannot be negative'
+            )
+        elif self.min_count < 0:
+            return Validity.invalid(
+                'RepeatTerm: min count cannot be negative'
+            )
+        validity = self.child.validate(lang)
+        if not validity:
+            return validity + Validity.invalid(
+                'RepeatTerm: child is not valid'
+            )
+        else:
+            return Validity.valid()
+
+    def get_transform_type(self, lt: 'LanguageTransformation') -> type:
+        return typing.Sequence[self.child.get_transform_type(lt)]  # type: ignore
+
+
+class GroupTerm(Term):
+    def __init__(
+        self,
+        children_groups: typing.Sequence[typing.Sequence[Term]]
+    ) -> None:
+        self.children_groups = children_groups
+
+    def __repr__(self) -> str:
+        return '<GroupTerm(Term) {0}>'.format(
+            ','.join(
+                '({0})'.format(
+                    ','.join(repr(c) for c in children)
+                ) for children in self.children_groups
+            )
+        )
+
+    def equals(self, other: object) -> Validity:
+        if not isinstance(other, GroupTerm):
+            return Validity.invalid(
+                'GroupTerm: other is not a GroupTerm'
+            )
+        elif len(self.children_groups) != len(other.children_groups):
+            return Validity.invalid(
+                'GroupTerm: this term has {0} children_groups and other has {1} '
+                'children_groups'.format(
+                    len(self.children_groups), len(other.children_groups)
+                )
+            )
+        validity = Validity.valid()
+        for index, (a, b) in enumerate(
+            zip(self.children_groups, other.children_groups)
+        ):
+            if len(a) != len(b):
+                validity += Validity.invalid(
+                    'GroupTerm: children_groups {0} are not the same length'
+                    .format(index)
+                )
+            else:
+                validity += sum(
+                    (c.equals(o) for c, o in zip(a, b)),
+                    Validity.valid()
+                )
+        return validity
+
+    def match(
+        self,
+        text: str,
+        pos: int,
+        lang: 'Language',
+        cache: 'MatchCache',
+    ) -> typing.Iterable[MatchResult]:
+        size = len(self.children_groups)
+        commit = Commit()
+        for index, children in enumerate(self.children_groups):
+            for end, nodes in sequence_match(
+                children, text, pos, lang, cache, commit
+            ):
+                yield end, MultiNode(list(nodes), (index, size))
+            if commit.cut:
+                return
+
+    def validate(self, lang: 'Language') -> Validity:
+        # TODO: validate if the grouping term is necessary, but requires extra context
+        if len(self.children_groups) <= 1 and len(self.children_groups[0]) <= 1:
+            return Validity.invalid(
+                'GroupTerm: must have at least two children'
+            )
+        children = [
+            c.validate(lang)
+            for children in self.children_groups
+            for c in children
+        ]
+        if all(children):
+            return Validity.valid()
+        else:
+            msg_groups = [
+                list(c.messages) + [
+                    'GroupTerm[{0}]: invalid child'.format(index)
+                ]
+                for index, c in enumerate(children) if not c
+            ]
+            return (
+                Validity(
+                    [msg for group in msg_groups for msg in group]
+                ) + Validity.invalid('GroupTerm: children are not valid')
+            )
+
+    def get_transform_type(self, lt: 'LanguageTransformation') -> type:  # pylint: disable=too-many-return-statements,too-many-branches
+        child_types = tuple(
+            typing.Tuple[tuple(
+                c.get_transform_type(lt)
+                for c in children
+                if not isinstance(c, CutTerm)
+            )] for children in self.children_groups
+        )
+        # c0, c1, c2, c3, c4, c5, c6, c7, c8, c9, c10, c11, c12, c13, c14, c15 = \
+        #     itertools.islice(
+        #         itertools.chain(child_types_gen, itertools.repeat(None))
+        #         16
+        #     )
+        if len(self.children_groups) == 1:
+            return gt.Group[child_types]  # type: ignore
+        elif len(self.children_groups) == 2:
+            return gt.Group2[child_types]  # type: ignore
+        elif len(self.children_groups) == 3:
+            return gt.Group3[child_types]  # type: ignore
+        elif len(self.children_groups) == 4:
+            return gt.Group4[child_types]  # type: ignore
+        elif len(self.children_groups) == 5:
+            return gt.Group5[child_types]  # type: ignore
+        elif len(self.children_groups) == 6:
+            return gt.Group6[child_types]  # type: ignore
+        elif len(self.children_groups) == 7:
+            return gt.Group7[child_types]  # type: ignore
+        elif len(self.children_groups) == 8:
+            return gt.Group8[child_types]  # type: ignore
+        elif len(self.children_groups) == 9:
+            return gt.Group9[child_types]  # type: ignore
+        elif len(self.children_groups) == 10:
+            return gt.Group10[child_types]  # type: ignore
+        elif len(self.children_groups) == 11:
+            return gt.Group11[child_types]  # type: ignore
+        elif len(self.children_groups) == 12:
+            return gt.Group12[child_types]  # type: ignore
+        elif len(self.children_groups) == 13:
+            return gt.Group13[child_types]  # type: ignore
+        elif len(self.children_groups) == 14:
+            return gt.Group14[child_types]  # type: ignore
+        elif len(self.children_groups) == 15:
+            return gt.Group15[child_types]  # type: ignore
+        elif len(self.children_groups) == 16:
+            return gt.Group16[child_types]  # type: ignore
+        else:
+            raise ValueError('cant have more than 16 child groups')
+
+
+class AtomicTerm(Term):
+    """Term that commits to the first match of its child
+
+    the other matches of the child are never tried, like an atomic group in a
+    regular expression
+    """
+    def __init__(self, child: Term) -> None:
+        self.child = child
+
+    def __repr__(self) -> str:
+        return '<AtomicTerm(Term) {0!r}>'.format(self.child)
+
+    def match(
+        self,
+        text: str,
+        pos: int,
+        lang: 'Language',
+        cache: 'MatchCache',
+    ) -> typing.Iterable[MatchResult]:
+        for match in cache.match_term(self.child, text, pos, lang):
+            yield match
+            return
+
+    def equals(self, other: Term) -> Validity:
+        if not isinstance(other, AtomicTerm):
+            return Validity.invalid('AtomicTerm: other is not an AtomicTerm')
+        validity = self.child.equals(other.child)
+        if not validity:
+            return validity + Validity.invalid(
+                'AtomicTerm: children are not equal'
+            )
+        else:
+            return Validity.valid()
+
+    def validate(self, lang: 'Language') -> Validity:
+        validity = self.child.validate(lang)
+        if not validity:
+            return validity + Validity.invalid(
+                'AtomicTerm: child is not valid'
+            )
+        else:
+            return Validity.valid()
+
+    def get_transform_type(self, lt: 'LanguageTransformation') -> type:
+        return self.child.get_transform_type(lt)
+
+
+class CutTerm(Term):
+    """Term that commits the choice it is part of
+
+    it matches the empty string. once a term list gets past a cut, the terms
+    before the cut keep their first match and the other alternatives of the
+    enclosing rule or group are not tried. the parse promises not to
+    backtrack past the cut, so the memo entries before it are dropped. a cut
+    leaves no node in the matches of its term list, and so no value for the
+    accumulator of the term group
+    """
+    def match(
+        self,
+        text: str,
+        pos: int,
+        lang: 'Language',
+        cache: 'MatchCache',
+    ) -> typing.Iterable[MatchResult]:
+        yield pos, _CUT
+
+    def __repr__(self) -> str:
+        return '<CutTerm(Term)>'
+
+    def equals(self, other: Term) -> Validity:
+        if not isinstance(other, CutTerm):
+            return Validity.invalid('CutTerm: other is not a CutTerm')
+        else:
+            return Validity.valid()
+
+    def validate(self, lang: 'Language') -> Validity:
+        return Validity.valid()
+
+    def get_transform_type(self, lt: 'LanguageTransformation') -> type:
+        return get_return_type(LiteralNode.transform)
+
+
+# the node of every cut, which lets a term list spot the cut by identity
+_CUT = LiteralNode('')
+
+
+class Commit(object):
+    """Whether a term list of a choice got past a cut"""
+    __slots__ = ['cut']
+
+    def __init__(self) -> None:
+        self.cut = False
+
+
+def describe_expected(expected: Expected) -> str:  # pylint: disable=too-many-return-statements
+    """Short description of something that failed to match"""
+    if isinstance(expected, str):
+        return expected
+    elif isinstance(expected, Literal):
+        return repr(expected.text)
+    elif isinstance(expected, LiteralRange):
+        return '{0!r}-{1!r}'.format(
+            chr(expected.min_value),
+            chr(expected.max_value)
+        )
+    elif isinstance(expected, EOFTerm):
+        return 'end of text'
+    elif isinstance(expected, RuleReference):
+        return expected.rule_name
+    elif isinstance(expected, GroupTerm):
+        return ' or '.join(
+            ' '.join(describe_expected(c) for c in children)
+            for children in expected.children_groups
+        )
+    elif isinstance(expected, (RepeatTerm, AtomicTerm)):
+        return describe_expected(expected.child)
+    return repr(expected)
+
+
+def sequence_match(
+    terms: typing.Sequence[Term],
+    text: str,
+    pos: int,
+    lang: 'Language',
+    cache: 'MatchCache',
+    commit: typing.Optional[Commit] = None,
+) -> typing.Iterator[typing.Tuple[int, typing.Tuple[Node, ...]]]:
+    """Matches of terms that follow each other, in depth first order
+
+    the nodes matched so far are kept in one list that is cut back to the
+    current term whenever the search backtracks. a cut leaves no node
+    """
+    if not terms:
+        yield pos, ()
+        return
+    last = len(terms) - 1
+    nodes: typing.List[Node] = []
+    cut = False
+    matches = [iter(cache.match_term(terms[0], text, pos, lang))]
+    while matches:
+        depth = len(matches) - 1
+        match = next(matches[depth], None)
+        if match is None:
+            matches.pop()
+            continue
+        end, node = match
+        if node is _CUT:
+            # the terms before the cut keep the match they have now
+            matches[:depth] = [iter(())] * depth
+            if commit is not None:
+                commit.cut = True
+            cache.forget_before(end)
+            cut = True
+        del nodes[depth:]
+        nodes.append(node)
+        if depth == last:
+            # the search never backtracks past a cut, so every match after
+            # it has the cut in its nodes
+            if cut:
+                yield end, tuple(n for n in nodes if n is not _CUT)
+            else:
+                yield end, tuple(nodes)
+        else:
+            matches.append(
+                iter(cache.match_term(terms[depth + 1], text, end, lang))
+            )
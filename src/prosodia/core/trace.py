@@ -0,0 +1,319 @@
+"""Parse tracers
+
+a tracer is told about every step of a packrat parse: rules that are entered
+and left, memo lookups, terminals that match or fail, and term groups that
+are given up on. rules find their matches lazily, so a rule that found a
+match is suspended until it is asked for the next one, and it is only left
+once it has no more. a parse is only traced when it uses a TracingCache:
+the memo matches every rule, terms match their children through
+`MatchCache.match_term`, and a TracingCache reports what goes through both,
+so a traced parse runs the same matchers as any other.
+
+the bundled tracers write one event per step to a file, either as JSON lines
+or as fixed size binary records, and each comes with a reader that turns the
+file back into TraceEvents for offline analysis.
+"""
+import abc
+import json
+import struct
+import typing
+
+from .memo import MatchCache, MatchResult, MemoKey, RuleMatcher, RuleName
+from .terms import (
+    EOFTerm,
+    GroupTerm,
+    Literal,
+    LiteralRange,
+    RepeatTerm,
+    Term,
+    describe_expected,
+)
+from .tree import Node
+if typing.TYPE_CHECKING:
+    from .grammar import Language  # pylint: disable=unused-import
+
+ENTER = 'enter'
+EXIT = 'exit'
+MEMO_HIT = 'hit'
+MEMO_MISS = 'miss'
+MATCH = 'match'
+FAIL = 'fail'
+BACKTRACK = 'backtrack'
+SUSPEND = 'suspend'
+RESUME = 'resume'
+
+# the order of the kinds is the code of each kind in binary traces
+_KINDS = (
+    ENTER, EXIT, MEMO_HIT, MEMO_MISS, MATCH, FAIL, BACKTRACK, SUSPEND, RESUME
+)
+_CODES = {kind: code for code, kind in enumerate(_KINDS, 1)}
+# a record with code 0 gives the next name id to the utf-8 bytes after it,
+# and its position holds their length
+_NAME = 0
+_RECORD = struct.Struct('<BIqq')
+
+
+class TraceEvent(typing.NamedTuple):
+    """One step of a parse
+
+    `name` is a rule name or the description of a terminal. `value` is the end
+    of a match, the number of matches a rule found when it is left, or the
+    index of a term group that was given up on, and -1 for events without one
+    """
+    kind: str
+    name: str
+    pos: int
+    value: int = -1
+
+
+class Tracer(object):
+    """Hooks for the steps of a parse, which do nothing unless overridden"""
+    def enter_rule(self, rule_name: str, pos: int) -> None:
+        pass
+
+    def exit_rule(self, rule_name: str, pos: int, matches: int) -> None:
+        """The rule has no more matches, after finding `matches` of them"""
+
+    def suspend_rule(self, rule_name: str, pos: int, end: int) -> None:
+        """The rule found a match up to end and waits to be asked for more"""
+
+    def resume_rule(self, rule_name: str, pos: int) -> None:
+        """A suspended rule is asked for its next match"""
+
+    def memo_hit(self, rule_name: str, pos: int) -> None:
+        pass
+
+    def memo_miss(self, rule_name: str, pos: int) -> None:
+        """The rule is not in the memo, or the lookahead ruled it out"""
+
+    def term_matched(self, term: str, pos: int, end: int) -> None:
+        pass
+
+    def term_failed(self, term: str, pos: int) -> None:
+        pass
+
+    def backtrack(self, rule_name: str, pos: int, index: int) -> None:
+        """A term group of the rule was tried and did not match"""
+
+
+class EventTracer(Tracer, metaclass=abc.ABCMeta):
+    """Tracer that handles every step as a TraceEvent"""
+    @abc.abstractmethod
+    def event(self, event: TraceEvent) -> None:
+        pass
+
+    def enter_rule(self, rule_name: str, pos: int) -> None:
+        self.event(TraceEvent(ENTER, rule_name, pos))
+
+    def exit_rule(self, rule_name: str, pos: int, matches: int) -> None:
+        self.event(TraceEvent(EXIT, rule_name, pos, matches))
+
+    def suspend_rule(self, rule_name: str, pos: int, end: int) -> None:
+        self.event(TraceEvent(SUSPEND, rule_name, pos, end))
+
+    def resume_rule(self, rule_name: str, pos: int) -> None:
+        self.event(TraceEvent(RESUME, rule_name, pos))
+
+    def memo_hit(self, rule_name: str, pos: int) -> None:
+        self.event(TraceEvent(MEMO_HIT, rule_name, pos))
+
+    def memo_miss(self, rule_name: str, pos: int) -> None:
+        self.event(TraceEvent(MEMO_MISS, rule_name, pos))
+
+    def term_matched(self, term: str, pos: int, end: int) -> None:
+        self.event(TraceEvent(MATCH, term, pos, end))
+
+    def term_failed(self, term: str, pos: int) -> None:
+        self.event(TraceEvent(FAIL, term, pos))
+
+    def backtrack(self, rule_name: str, pos: int, index: int) -> None:
+        self.event(TraceEvent(BACKTRACK, rule_name, pos, index))
+
+
+class JsonLinesTracer(EventTracer):
+    """Writes every event as a JSON array on a line of its own"""
+    def __init__(self, stream: typing.TextIO) -> None:
+        self._write = stream.write
+        self._encode = json.JSONEncoder(separators=(',', ':')).encode
+
+    def event(self, event: TraceEvent) -> None:
+        self._write(self._encode(event) + '\n')
+
+
+def read_json_lines(stream: typing.TextIO) -> typing.Iterator[TraceEvent]:
+    for line in stream:
+        if line.strip():
+            yield TraceEvent(*json.loads(line))
+
+
+class BinaryTracer(EventTracer):
+    """Writes every event as a fixed size record
+
+    names are written once, the first time they are used, and records refer
+    to them by number after that
+    """
+    def __init__(self, stream: typing.BinaryIO) -> None:
+        self._write = stream.write
+        self._names: typing.Dict[str, int] = dict()
+
+    def event(self, event: TraceEvent) -> None:
+        name_id = self._names.get(event.name)
+        if name_id is None:
+            name_id = len(self._names)
+            self._names[event.name] = name_id
+            encoded = event.name.encode('utf-8')
+            self._write(_RECORD.pack(_NAME, name_id, len(encoded), 0))
+            self._write(encoded)
+        self._write(
+            _RECORD.pack(_CODES[event.kind], name_id, event.pos, event.value)
+        )
+
+
+def read_binary(stream: typing.BinaryIO) -> typing.Iterator[TraceEvent]:
+    names: typing.List[str] = []
+    while True:
+        record = stream.read(_RECORD.size)
+        if len(record) < _RECORD.size:
+            return
+        code, name_id, pos, value = _RECORD.unpack(record)
+        if code == _NAME:
+            names.append(stream.read(pos).decode('utf-8'))
+        else:
+            yield TraceEvent(_KINDS[code - 1], names[name_id], pos, value)
+
+
+class TracingCache(MatchCache):
+    """Packrat memo of a parse that reports every step to a tracer
+
+    rules are traced where the memo matches them, and terms where they are
+    matched through `match_term`, so the parse runs the matchers of the
+    language itself. `nodes` counts the nodes that the parse created, and
+    `peak_memo` is the most memo entries there were at once. with
+    `keep_matches`, `rule_matches` holds the rule and node of every match
+    that a rule found, by the id of the node, and keeps the nodes alive so
+    that the ids stay theirs
+    """
+    def __init__(self, tracer: Tracer, keep_matches: bool = False) -> None:
+        super().__init__()
+        self.tracer = tracer
+        self.nodes = 0
+        self.peak_memo = 0
+        self.rule_matches: typing.Optional[
+            typing.Dict[int, typing.Tuple[RuleName, Node]]
+        ] = dict() if keep_matches else None
+
+    def match(
+        self,
+        rule_name: RuleName,
+        text: str,
+        pos: int,
+        lang: 'Language',
+    ) -> typing.Iterable[MatchResult]:
+        key = rule_name, pos
+        if key in self.finished or key in self.entries:
+            self.tracer.memo_hit(rule_name, pos)
+        else:
+            self.tracer.memo_miss(rule_name, pos)
+        return super().match(rule_name, text, pos, lang)
+
+    def match_with(
+        self,
+        rule_name: RuleName,
+        matcher: RuleMatcher,
+        text: str,
+        pos: int,
+        lang: 'Language',
+        eager: bool = False
+    ) -> typing.Iterator[MatchResult]:
+        matches = super().match_with(
+            rule_name,
+            self._traced(rule_name, matcher),
+            text,
+            pos,
+            lang,
+            eager
+        )
+        self._sample()
+        return matches
+
+    def match_term(
+        self,
+        term: Term,
+        text: str,
+        pos: int,
+        lang: 'Language',
+    ) -> typing.Iterable[MatchResult]:
+        matches = term.match(text, pos, lang, self)
+        if isinstance(term, (Literal, LiteralRange, EOFTerm)):
+            found = list(matches)
+            self._terminal(term, pos, found[-1][0] if found else None)
+            self.nodes += len(found)
+            return found
+        elif isinstance(term, RepeatTerm):
+            run = lang.char_run(term)
+            if run is not None:
+                # the run is scanned like a terminal, so it is traced as one,
+                # up to the end of the longest run. its nodes are made once
+                # and shared by every match
+                end = run.scan(text, pos)
+                if end - pos >= term.min_count:
+                    self.nodes += (end - pos) * run.nodes_per_char
+                    self._terminal(term, pos, end)
+                else:
+                    self._terminal(term, pos, None)
+        elif not isinstance(term, GroupTerm):
+            # rule references, cuts and atomic terms make no node of their own
+            return matches
+        return self._counted(matches)
+
+    def backtrack(self, rule_name: RuleName, pos: int, index: int) -> None:
+        self.tracer.backtrack(rule_name, pos, index)
+
+    def finish(self, key: MemoKey, results: typing.List[MatchResult]) -> None:
+        super().finish(key, results)
+        self._sample()
+
+    def _sample(self) -> None:
+        size = len(self.entries) + len(self.finished)
+        self.peak_memo = max(self.peak_memo, size)
+
+    def _terminal(self, term: Term, pos: int, end: typing.Optional[int]) -> None:
+        if end is None:
+            self.tracer.term_failed(describe_expected(term), pos)
+        else:
+            self.tracer.term_matched(describe_expected(term), pos, end)
+
+    def _counted(
+        self,
+        matches: typing.Iterable[MatchResult]
+    ) -> typing.Iterator[MatchResult]:
+        """The matches of a term that makes a new node for each of them"""
+        for match in matches:
+            self.nodes += 1
+            yield match
+
+    def _traced(self, rule_name: RuleName, matcher: RuleMatcher) -> RuleMatcher:
+        tracer = self.tracer
+        kept = self.rule_matches
+
+        def match_rule(
+            text: str,
+            pos: int,
+            lang: 'Language',
+            cache: MatchCache
+        ) -> typing.Iterator[MatchResult]:
+            # the rule is suspended while its caller uses a match, so the
+            # rules that run meanwhile are not counted as called by it
+            tracer.enter_rule(rule_name, pos)
+            count = 0
+            for end, node in matcher(text, pos, lang, cache):
+                count += 1
+                self.nodes += 1
+                if kept is not None:
+                    kept[id(node)] = rule_name, node
+                tracer.suspend_rule(rule_name, pos, end)
+                yield end, node
+                tracer.resume_rule(rule_name, pos)
+            tracer.exit_rule(rule_name, pos, count)
+
+        return match_rule
@@ -2,14 +2,7 @@ import typing
 
 from .grammar import RuleName
 from . import grammar as g
-from .resolvable import (
-    Resolvable,
-    ResolvableFunc,
-    ResolvablePair,
-    resolve,
-    resolve_map
-)
-from .tree import Node, RuleNode
+from .tree import Node, LiteralNode, MultiNode, RuleNode
 from ..validation.validity import Validity
 from ..validation.transform_validation import (
     check_composability, check_isomorphic)
@@ -39,10 +32,7 @@ class LanguageTransformation(typing.Generic[T]):
             rule_name,
             SyntaxTransformation(
                 tuple(
-                    TermGroupTransformation(t) for t in typing.cast(
-                        typing.Sequence[typing.Callable[..., Resolvable[T]]],
-                        root_accums
-                    )
+                    TermGroupTransformation(t) for t in root_accums
                 )
             )
         )
@@ -56,7 +46,45 @@ class LanguageTransformation(typing.Generic[T]):
         return self
 
     def transform(self, node: Node) -> typing.Any:
-        return resolve(node.transform(self))
+        """Transform the tree bottom up
+
+        the nodes are visited in post order from an explicit stack, so deep
+        trees do not run into the recursion limit. when a node is finished
+        the values of its children are the last ones on the value stack, and
+        they are taken off it at once and handed to the accumulator of the
+        term group that the node matched. the rule transformations are looked
+        up as the nodes are visited, so a change to transformation_rules is
+        seen by the next transform
+        """
+        rules = self.transformation_rules
+        values: typing.List[typing.Any] = []
+        # nodes to visit, each with whether its children are done
+        pending: typing.List[typing.Tuple[Node, bool]] = [(node, False)]
+        while pending:
+            node, finished = pending.pop()
+            children = node.children
+            if children:
+                if not finished:
+                    pending.append((node, True))
+                    pending.extend([(c, False) for c in reversed(children)])
+                    continue
+                start = len(values) - len(children)
+                child_values = values[start:]
+                del values[start:]
+            else:
+                child_values = []
+            if isinstance(node, RuleNode):
+                tgt = rules[node.matched_rule].tf_syntax.tf_term_groups[
+                    node.term_group_id
+                ]
+                values.append(tgt.accumulator(tuple(child_values)))
+            elif isinstance(node, MultiNode):
+                values.append(node.group_value(child_values))
+            elif isinstance(node, LiteralNode):
+                values.append(node.value)
+            else:
+                raise TypeError('cannot transform {0!r}'.format(node))
+        return values[0]
 
     def __ilshift__(
         self,
@@ -105,18 +133,6 @@ class RuleTransformation(typing.Generic[OutputType]):
         self.rule_name = rule_name
         self.tf_syntax = tf_syntax
 
-    def transform(
-        self,
-        rule_node: RuleNode,
-        lang: 'LanguageTransformation'
-    ) -> Resolvable[OutputType]:
-        return ResolvableFunc(
-            self.tf_syntax.transform,
-            rule_node.children,
-            rule_node.term_group_id,
-            lang
-        )
-
     def validate(
         self,
         rule: g.Rule,
@@ -151,18 +167,6 @@ class SyntaxTransformation(typing.Generic[OutputType]):
     ) -> 'SyntaxTransformation':
         return cls(tf_term_groups)
 
-    def transform(
-        self,
-        values: typing.Sequence[Node],
-        index: int,
-        lang: 'LanguageTransformation'
-    ) -> Resolvable[OutputType]:
-        return ResolvableFunc(
-            self.tf_term_groups[index].transform,
-            values,
-            lang
-        )
-
     def validate(
         self,
         syntax: g.Syntax,
@@ -195,23 +199,10 @@ class SyntaxTransformation(typing.Generic[OutputType]):
 class TermGroupTransformation(typing.Generic[OutputType]):
     def __init__(
         self,
-        accumulator: typing.Callable[[typing.Any], Resolvable[OutputType]]
+        accumulator: typing.Callable[[typing.Any], OutputType]
     ) -> None:
         self.accumulator = accumulator
 
-    def transform(
-        self,
-        values: typing.Sequence[Node],
-        lang: 'LanguageTransformation'
-    ) -> Resolvable[OutputType]:
-        return ResolvablePair(
-            resolve_map(
-                values,
-                lambda v: v.transform(lang)
-            ),
-            self.accumulator
-        )
-
     def validate(
         self,
         term_group: g.TermGroup,
@@ -220,6 +211,7 @@ class TermGroupTransformation(typing.Generic[OutputType]):
         transform_types = [
             term.get_transform_type(lt)
             for term in term_group.terms
+            if not isinstance(term, g.CutTerm)
         ]
         is_composable = check_composability(transform_types, self.accumulator)
         if not is_composable:
@@ -1,8 +1,8 @@
 import abc
+import itertools
 import re
 import typing
 
-from .resolvable import resolve_map, ResolvablePair, ResolvableFunc, Resolvable
 from ..validation import group_types as gt
 
 if typing.TYPE_CHECKING:
@@ -10,12 +10,15 @@ if typing.TYPE_CHECKING:
 
 RE_LINE_START = re.compile('^', flags=re.MULTILINE)
 RuleName = str
+# a reversed linked list of (last node, links of the nodes before it)
+Links = typing.Optional[typing.Tuple['Node', typing.Any]]
 
 
 class Node(object, metaclass=abc.ABCMeta):
-    @abc.abstractmethod
+    children: typing.Sequence['Node'] = ()
+
     def transform(self, lang: 'LanguageTransformation') -> typing.Any:
-        raise NotImplementedError
+        return lang.transform(self)
 
     @abc.abstractmethod
     def draw(self) -> str:
@@ -39,12 +42,6 @@ class RuleNode(Node):
     def __repr__(self) -> str:
         return '<RuleNode {0}>'.format(repr(self.matched_rule))
 
-    def transform(self, lang: 'LanguageTransformation') -> typing.Any:
-        return lang.transformation_rules[self.matched_rule].transform(
-            self,
-            lang
-        )
-
     def draw(self) -> str:
         children = (
             RE_LINE_START.sub('  ', child.draw()) for child in self.children
@@ -74,6 +71,72 @@ class LiteralNode(Node):
         return repr(self)
 
 
+class LinkedNodes(typing.Sequence['Node']):
+    """Nodes that are stored as a reversed linked list
+
+    repetitions that start out the same share the links of their common
+    prefix, so a repeat term can hand out each of its matches in constant
+    time. the links are unwound into a list the first time they are read
+    """
+    __slots__ = ['_links', '_size', '_nodes']
+
+    def __init__(self, links: Links, size: int) -> None:
+        self._links = links
+        self._size = size
+        self._nodes: typing.Optional[typing.List[Node]] = None
+
+    def _unwind(self) -> typing.List['Node']:
+        if self._nodes is None:
+            nodes = []
+            links = self._links
+            while links is not None:
+                node, links = links
+                nodes.append(node)
+            nodes.reverse()
+            self._nodes = nodes
+            self._links = None
+        return self._nodes
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: typing.Any) -> typing.Any:
+        return self._unwind()[index]
+
+    def __iter__(self) -> typing.Iterator['Node']:
+        return iter(self._unwind())
+
+    def __repr__(self) -> str:
+        return '<LinkedNodes {0}>'.format(self._size)
+
+
+class PrefixNodes(typing.Sequence['Node']):
+    """The first nodes of a list that is shared with longer matches"""
+    __slots__ = ['_nodes', '_size']
+
+    def __init__(self, nodes: typing.List['Node'], size: int) -> None:
+        self._nodes = nodes
+        self._size = size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: typing.Any) -> typing.Any:
+        if isinstance(index, slice):
+            return self._nodes[:self._size][index]
+        elif index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        return self._nodes[index]
+
+    def __iter__(self) -> typing.Iterator['Node']:
+        return itertools.islice(self._nodes, self._size)
+
+    def __repr__(self) -> str:
+        return '<PrefixNodes {0}>'.format(self._size)
+
+
 class MultiNode(Node):
     def __init__(
         self,
@@ -85,18 +148,6 @@ class MultiNode(Node):
         # group_info[0] index of the group that matched
         # group_info[1] total number of groups
 
-    def transform(self, lang: 'LanguageTransformation') -> typing.Any:
-        resolvable_result = resolve_map(
-            self.children,
-            lambda c: c.transform(lang)
-        )
-        if self.group_info is None:
-            return resolvable_result
-        else:
-            return self._make_group_result(
-                resolvable_result
-            )
-
     def __str__(self) -> str:
         return ''.join(str(child) for child in self.children)
 
@@ -119,16 +170,16 @@ class MultiNode(Node):
             ]
         )
 
-    def _make_group_result(self, resolvable: Resolvable) -> Resolvable:
-        def func(result: typing.Any) -> Resolvable:
-            def nested() -> typing.Any:
-                if self.group_info:
-                    output = [gt.NoValue.Sentinel] * self.group_info[1]
-                    output[self.group_info[0]] = result
-                    return output
-                else:
-                    raise RuntimeError
-
-            return ResolvableFunc(nested)
+    def group_value(self, values: typing.List[typing.Any]) -> typing.Any:
+        """The values of the children, placed at the index of their group
 
-        return ResolvablePair(resolvable, func)
+        the other groups are given NoValue, so a term with several groups
+        transforms into one slot per group
+        """
+        if self.group_info is None:
+            return values
+        output: typing.List[typing.Any] = (
+            [gt.NoValue.Sentinel] * self.group_info[1]
+        )
+        output[self.group_info[0]] = values
+        return output
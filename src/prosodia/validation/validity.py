@@ -2,8 +2,14 @@ import typing
 
 
 class Validity(object):
-    def __init__(self, messages: typing.Sequence[str]) -> None:
+    """Problems that make something invalid, and warnings that do not"""
+    def __init__(
+        self,
+        messages: typing.Sequence[str],
+        warnings: typing.Sequence[str] = ()
+    ) -> None:
         self.messages = messages
+        self.warnings = warnings
 
     @classmethod
     def valid(cls) -> 'Validity':
@@ -27,5 +33,6 @@ class Validity(object):
             return NotImplemented
         else:
             return Validity(
-                list(self.messages) + list(other.messages)
+                list(self.messages) + list(other.messages),
+                list(self.warnings) + list(other.warnings)
             )
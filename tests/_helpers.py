@@ -14,7 +14,8 @@ def validate_recursive_grammar(test_case, grammar, text):  # type: ignore
     parsed_grammar = Grammar(
         parsed_lang,
         grammar.transform,
-        grammar.allow_partial_matches
+        grammar.allow_partial_matches,
+        grammar.engine
     )
     validate(test_case, parsed_lang.equals(grammar.language))
     validate(test_case, parsed_grammar.validate())
@@ -23,7 +24,8 @@ def validate_recursive_grammar(test_case, grammar, text):  # type: ignore
     parsed_grammar2 = Grammar(
         parsed_lang2,
         grammar.transform,
-        grammar.allow_partial_matches
+        grammar.allow_partial_matches,
+        grammar.engine
     )
     validate(test_case, parsed_lang2.equals(grammar.language))
     validate(test_case, parsed_lang2.equals(parsed_lang))
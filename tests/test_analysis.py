@@ -0,0 +1,267 @@
+import unittest
+
+from prosodia.core import grammar as g
+from prosodia.core import earley
+from prosodia.core.analysis import (
+    left_recursive_rules,
+    mutually_left_recursive_rules,
+    nullable_rules,
+    regular_pattern,
+)
+from prosodia.core.tree import LiteralNode, RuleNode
+
+from .test_codegen import _load
+from .test_grammar import (
+    _create_indirect_left_recursive_language,
+    _create_left_recursive_language,
+    _create_nullable_left_recursive_language,
+)
+
+
+def _create_statement_language() -> g.Language:
+    lang = g.Language.create('Statement')
+    lang.add_rule(
+        g.Rule(
+            'Statement',
+            g.Syntax.create(
+                g.TermGroup.create(
+                    g.Literal('let', False),
+                    g.RuleReference('Name')
+                ),
+                g.TermGroup.create(g.RuleReference('Number')),
+                g.TermGroup.create(
+                    g.RuleReference('Space'),
+                    g.Literal(';')
+                ),
+                g.TermGroup.create(
+                    g.GroupTerm([[g.Literal('-')], [g.Literal('+')]]),
+                    g.RuleReference('Number')
+                ),
+            )
+        )
+    )
+    lang.add_rule(
+        g.Rule(
+            'Name',
+            g.Syntax.create(
+                g.TermGroup.create(
+                    g.RepeatTerm(g.LiteralRange(ord('a'), ord('z')), 1, None)
+                )
+            )
+        )
+    )
+    lang.add_rule(
+        g.Rule(
+            'Number',
+            g.Syntax.create(
+                g.TermGroup.create(
+                    g.RepeatTerm(g.LiteralRange(ord('0'), ord('9')), 1, None)
+                )
+            )
+        )
+    )
+    lang.add_rule(
+        g.Rule(
+            'Space',
+            g.Syntax.create(
+                g.TermGroup.create(g.RepeatTerm(g.Literal(' '), 0, None))
+            )
+        )
+    )
+    return lang
+
+
+def _term_group_id(lang: g.Language, text: str) -> int:
+    node = lang.parse(text, False)
+    assert isinstance(node, RuleNode)
+    return node.term_group_id
+
+
+class TestAnalysis(unittest.TestCase):
+    def test_nullable_rules(self) -> None:
+        lang = _create_statement_language()
+        self.assertEqual(nullable_rules(lang), {'Space'})
+
+    def test_analysis_is_kept(self) -> None:
+        # each rule is only nullable through the one after it
+        lang = g.Language.create('R0')
+        for i in range(500):
+            lang.add_rule(
+                g.Rule(
+                    'R{0}'.format(i),
+                    g.Syntax.create(
+                        g.TermGroup.create(
+                            g.RuleReference('R{0}'.format(i + 1)),
+                            g.Literal('x')
+                        ),
+                        g.TermGroup.create(
+                            g.RuleReference('R{0}'.format(i + 1))
+                        )
+                    )
+                )
+            )
+        self.assertEqual(lang.nullable(), set())
+        self.assertFalse(lang.first_sets()['R0'].overlaps(
+            lang.first_sets()['R499']
+        ))
+        lang.add_rule(
+            g.Rule('R500', g.Syntax.create(g.TermGroup.create(g.Literal(''))))
+        )
+        self.assertEqual(len(lang.nullable()), 501)
+        self.assertIs(lang.nullable(), lang.nullable())
+        self.assertIn('x', lang.first_sets()['R0'])
+        self.assertIn('x', lang.first_sets()['R499'])
+        self.assertNotIn('x', lang.first_sets()['R500'])
+
+    def test_left_recursive_rules(self) -> None:
+        self.assertEqual(
+            left_recursive_rules(_create_left_recursive_language()),
+            {'Expr'}
+        )
+        self.assertEqual(
+            left_recursive_rules(_create_indirect_left_recursive_language()),
+            {'A', 'B'}
+        )
+        self.assertEqual(
+            left_recursive_rules(_create_statement_language()),
+            set()
+        )
+
+    def test_mutually_left_recursive_rules(self) -> None:
+        self.assertEqual(
+            mutually_left_recursive_rules(
+                _create_nullable_left_recursive_language()
+            ),
+            set()
+        )
+        self.assertEqual(
+            mutually_left_recursive_rules(
+                _create_indirect_left_recursive_language()
+            ),
+            {'A', 'B'}
+        )
+
+    def test_dispatch_on_next_character(self) -> None:
+        lookahead = _create_statement_language().lookahead()
+        self.assertEqual(lookahead.alternatives('Statement', 'Lx', 0), (0,))
+        self.assertEqual(lookahead.alternatives('Statement', '12', 0), (1,))
+        self.assertEqual(lookahead.alternatives('Statement', '-1', 0), (3,))
+        self.assertEqual(lookahead.alternatives('Statement', ' ;', 0), (2,))
+        self.assertEqual(lookahead.alternatives('Statement', ';', 0), (2,))
+        self.assertEqual(lookahead.alternatives('Statement', '', 0), ())
+        self.assertEqual(lookahead.alternatives('Space', '', 0), (0,))
+        self.assertEqual(lookahead.alternatives('Name', '1', 0), ())
+
+    def test_rule_reference_fails_before_memo(self) -> None:
+        lang = _create_statement_language()
+        cache = g.MatchCache()
+        matches = list(g.RuleReference('Number').match('x', 0, lang, cache))
+        self.assertEqual(matches, [])
+        self.assertEqual(cache.entries, dict())
+
+    def test_same_matches_with_lookahead(self) -> None:
+        lang = _create_statement_language()
+        self.assertEqual(_term_group_id(lang, 'LETabc'), 0)
+        self.assertEqual(_term_group_id(lang, '+42'), 3)
+        self.assertEqual(_term_group_id(lang, '  ;'), 2)
+        with self.assertRaises(g.NoMatches):
+            lang.parse('*', False)
+
+    def test_adding_rules_resets_lookahead(self) -> None:
+        lang = _create_statement_language()
+        with self.assertRaises(g.NoMatches):
+            lang.parse('x', False)
+        lang.add_to_rule('Statement', [g.TermGroup.create(g.Literal('x'))])
+        self.assertEqual(_term_group_id(lang, 'x'), 4)
+
+    def test_regular_pattern(self) -> None:
+        lang = _create_statement_language()
+        self.assertEqual(
+            regular_pattern(lang, 'Number'),
+            '(?:(?:[\\U00000030-\\U00000039]){1,})'
+        )
+        self.assertIsNotNone(regular_pattern(lang, 'Statement'))
+        self.assertIsNone(
+            regular_pattern(_create_left_recursive_language(), 'Expr')
+        )
+
+    def test_token_rule_is_one_lexeme(self) -> None:
+        lang = _create_statement_language().mark_token('Number')
+        for node in (
+            lang.parse('-123', False),
+            _load(lang).parse('-123', False),
+            earley.parse_forest(lang, '-123', False).choose(),
+        ):
+            assert isinstance(node, RuleNode)
+            number = node.children[1]
+            assert isinstance(number, LiteralNode)
+            self.assertEqual(number.value, '123')
+        self.assertTrue(lang.validate())
+
+    def test_token_rule_must_be_regular(self) -> None:
+        lang = _create_left_recursive_language()
+        with self.assertRaises(ValueError):
+            lang.mark_token('Expr')
+        self.assertFalse(lang.get_rule('Expr').token)
+
+    def test_token_rule_needs_a_valid_pattern(self) -> None:
+        lang = g.Language.create('Root')
+        lang.add_rule(
+            g.Rule(
+                'Root',
+                g.Syntax.create(
+                    g.TermGroup.create(g.RepeatTerm(g.Literal('a'), 5, 2))
+                )
+            )
+        )
+        with self.assertRaises(ValueError):
+            lang.mark_token('Root')
+        self.assertFalse(lang.get_rule('Root').token)
+
+    def test_token_rule_takes_the_longest_match(self) -> None:
+        lang = g.Language.create('Root')
+        lang.add_rule(
+            g.Rule(
+                'Root',
+                g.Syntax.create(
+                    g.TermGroup.create(g.Literal('a')),
+                    g.TermGroup.create(g.Literal('ab')),
+                )
+            )
+        )
+        lang.mark_token('Root')
+        self.assertEqual(str(lang.parse('ab', False)), 'ab')
+        self.assertEqual(str(lang.parse('a', False)), 'a')
+        self.assertTrue(lang.validate())
+
+    def test_token_rule_must_find_its_longest_match(self) -> None:
+        lang = g.Language.create('Root')
+        lang.add_rule(
+            g.Rule(
+                'Root',
+                g.Syntax.create(
+                    g.TermGroup.create(
+                        g.RuleReference('Name'),
+                        g.RepeatTerm(g.Literal('b'), 0, 1)
+                    )
+                )
+            )
+        )
+        lang.add_rule(
+            g.Rule(
+                'Name',
+                g.Syntax.create(
+                    g.TermGroup.create(
+                        g.RepeatTerm(g.LiteralRange(ord('a'), ord('z')), 1, None)
+                    )
+                )
+            )
+        )
+        # the repeat would take the 'b' that the last term could match
+        with self.assertRaises(ValueError):
+            lang.mark_token('Root')
+        self.assertFalse(lang.get_rule('Root').token)
+        lang.mark_token('Name')
+        # an alternative that the rule gets later is reported by validate
+        lang.add_to_rule('Name', [g.TermGroup.create(g.Literal('x'))])
+        self.assertFalse(lang.validate())
@@ -1,5 +1,6 @@
 import unittest
 
+from prosodia.core import grammar as g
 from prosodia.base.augmentedbnf import create_augmentedbnf
 from prosodia.base.augmentedbnf._text import text
 from prosodia.base.augmentedbnf._intermediate_parser import (
@@ -22,3 +23,23 @@ class TestAugmentedBNF(unittest.TestCase):
         parsed_lang = inter_abnf.apply(text)
         add_freebie_rules(parsed_lang)
         validate(self, parsed_lang.validate())
+
+    def test_committing_terms(self) -> None:
+        lang = create_augmentedbnf().apply(
+            'Root = *+DIGIT (?> "x" / "xy") ~ (?> Root)\n'
+        )
+        expected = g.TermGroup.create(
+            g.RepeatTerm(g.RuleReference('DIGIT'), 0, None, possessive=True),
+            g.AtomicTerm(
+                g.GroupTerm([
+                    [g.Literal('x', False)],
+                    [g.Literal('xy', False)],
+                ])
+            ),
+            g.CutTerm(),
+            g.AtomicTerm(g.RuleReference('Root')),
+        )
+        validate(
+            self,
+            lang.get_rule('Root').syntax.term_groups[0].equals(expected)
+        )
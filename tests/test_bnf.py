@@ -1,20 +1,18 @@
+import contextlib
 import traceback
 from unittest import TestCase, mock
 
 from prosodia.core.grammar import Grammar
 from prosodia.base.bnf import create_bnf
 from prosodia.base.bnf._text import text
-from prosodia.core.transform import TermGroupTransformation
 
 from ._helpers import validate, validate_recursive_grammar
 
 
-def fake_tgt(stacks):  # type: ignore
-    real_transform = TermGroupTransformation.transform
-
+def fake_accumulator(stacks, accumulator):  # type: ignore
     def wrapped(*args, **kwargs):  # type: ignore
         stacks.append(traceback.extract_stack())
-        return real_transform(*args, **kwargs)
+        return accumulator(*args, **kwargs)
     return wrapped
 
 
@@ -26,10 +24,16 @@ class TestBNF(TestCase):
         bnf = create_bnf()
         stack = traceback.extract_stack()
         stacks = []  # type: ignore
-        with mock.patch(
-            'prosodia.base.bnf._transform.t.TermGroupTransformation.transform',
-            new=fake_tgt(stacks)
-        ):
+        with contextlib.ExitStack() as patches:
+            for rt in bnf.transform.transformation_rules.values():
+                for tgt in rt.tf_syntax.tf_term_groups:
+                    patches.enter_context(
+                        mock.patch.object(
+                            tgt,
+                            'accumulator',
+                            new=fake_accumulator(stacks, tgt.accumulator)
+                        )
+                    )
             parsed_lang = bnf.apply(text)
             parsed_grammar = Grammar(parsed_lang, bnf.transform)
             parsed_lang2 = parsed_grammar.apply(text)
@@ -42,3 +46,10 @@ class TestBNF(TestCase):
         # 5 is kind of an arbitrary number and the minimum that makes this test
         # pass, it should just be low
         self.assertTrue(len(largest) <= len(stack) + 5)
+
+    def test_many_rules(self) -> None:
+        # each rule is nested one level deeper in the rule list, so the memo
+        # must not add stack frames per level beyond what it always cost
+        many = ''.join('<r{0}> ::= "a"\n'.format(i) for i in range(235))
+        lang = create_bnf().apply(many)
+        self.assertIn('r234', lang.rules)
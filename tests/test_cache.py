@@ -0,0 +1,52 @@
+from unittest import TestCase, mock
+
+from prosodia.core import grammar as g
+from prosodia.base.bnf import create_bnf
+from prosodia.base.bnf._text import text
+
+
+def _create_shared_language() -> g.Language:
+    lang = g.Language.create('Root')
+    lang.add_rule(
+        g.Rule(
+            'Root',
+            g.Syntax.create(
+                g.TermGroup.create(
+                    g.RuleReference('Word'),
+                    g.Literal('!')
+                ),
+                g.TermGroup.create(
+                    g.RuleReference('Word'),
+                    g.Literal('?')
+                )
+            )
+        )
+    )
+    lang.add_rule(
+        g.Rule(
+            'Word',
+            g.Syntax.create(
+                g.TermGroup.create(g.Literal('hi'))
+            )
+        )
+    )
+    return lang
+
+
+class TestMatchCache(TestCase):
+    def test_references_share_rule_evaluation(self) -> None:
+        lang = _create_shared_language()
+        cache = g.MatchCache()
+        word = lang.get_rule('Word')
+        with mock.patch.object(word, 'match', wraps=word.match) as m:
+            node = lang.parse('hi?', cache=cache)
+
+        self.assertEqual(str(node), 'hi?')
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(cache.saved_invocations, 1)
+
+    def test_saved_invocations_on_bnf(self) -> None:
+        bnf = create_bnf()
+        cache = g.MatchCache()
+        bnf.language.parse(text, bnf.allow_partial_matches, cache)
+        self.assertGreater(cache.saved_invocations, 0)
@@ -0,0 +1,131 @@
+import importlib.util
+import os
+import tempfile
+import types
+import unittest
+
+from prosodia.core import grammar as g
+from prosodia.core.codegen import generate_module, write_module
+from prosodia.base.augmentedbnf import create_augmentedbnf
+from prosodia.base.augmentedbnf._text import text as abnf_text
+from prosodia.base.bnf import create_bnf
+from prosodia.base.bnf._text import text as bnf_text
+from prosodia.base.bnfrange._grammar import create_bnfrange
+from prosodia.base.bnfrange._text import text as bnfrange_text
+from prosodia.base.bnfrepeat._grammar import create_bnfrepeat
+from prosodia.base.bnfrepeat._text import text as bnfrepeat_text
+
+from .test_earley import _create_ambiguous_language
+from .test_grammar import _create_left_recursive_language, _left_operands
+
+
+def _load(lang: g.Language) -> types.ModuleType:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'generated_parser.py')
+        write_module(lang, path)
+        spec = importlib.util.spec_from_file_location('generated_parser', path)
+        assert spec is not None and spec.loader is not None
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    return module
+
+
+class TestCodegen(unittest.TestCase):
+    def assert_same_trees(
+        self,
+        lang: g.Language,
+        text: str,
+        allow_partial_matches: bool
+    ) -> None:
+        expected = lang.parse(text, allow_partial_matches)
+        actual = _load(lang).parse(text, allow_partial_matches)
+        self.assertEqual(expected.draw(), actual.draw())
+
+    def test_same_trees_as_parse(self) -> None:
+        for grammar, text in (
+            (create_bnf(), bnf_text),
+            (create_bnfrange(), bnfrange_text),
+            (create_bnfrepeat(), bnfrepeat_text),
+            (create_augmentedbnf(), abnf_text),
+        ):
+            self.assert_same_trees(
+                grammar.language,
+                text,
+                grammar.allow_partial_matches
+            )
+
+    def test_language_from_abnf(self) -> None:
+        lang = create_augmentedbnf().apply(abnf_text)
+        self.assert_same_trees(lang, abnf_text, False)
+
+    def test_ambiguous_and_left_recursive(self) -> None:
+        module = _load(_create_ambiguous_language())
+        with self.assertRaises(g.TooManyMatches) as ctx:
+            module.parse('1+1+1', False)
+        self.assertEqual(len(ctx.exception.matches), 2)
+
+        module = _load(_create_left_recursive_language())
+        node = module.parse('1-2-3', False)
+        self.assertEqual(_left_operands(node), ['3', '2', '1'])
+
+    def test_scanned_repeat_gives_fewest_repetitions_first(self) -> None:
+        for child in (g.LiteralRange(ord('a'), ord('a')), g.Literal('a', False)):
+            lang = g.Language.create('Root')
+            lang.add_rule(
+                g.Rule(
+                    'Root',
+                    g.Syntax.create(
+                        g.TermGroup.create(g.RepeatTerm(child, 1, None))
+                    )
+                )
+            )
+            node = _load(lang).parse('aaa', policy=g.FIRST_MATCH)
+            self.assertEqual(str(node), 'a')
+
+    def test_cuts_are_rejected(self) -> None:
+        lang = g.Language.create('Root')
+        lang.add_rule(
+            g.Rule(
+                'Root',
+                g.Syntax.create(
+                    g.TermGroup.create(
+                        g.RepeatTerm(
+                            g.GroupTerm([[g.Literal('a'), g.CutTerm()]]),
+                            0,
+                            None
+                        )
+                    )
+                )
+            )
+        )
+        with self.assertRaises(ValueError) as ctx:
+            generate_module(lang)
+        self.assertIn('Root', str(ctx.exception))
+
+    def test_long_term_group(self) -> None:
+        lang = g.Language.create('Long')
+        lang.add_rule(
+            g.Rule(
+                'Long',
+                g.Syntax.create(
+                    g.TermGroup(
+                        [g.RuleReference('Digit') for _ in range(44)]
+                    )
+                )
+            )
+        )
+        lang.add_rule(
+            g.Rule(
+                'Digit',
+                g.Syntax.create(
+                    g.TermGroup.create(g.LiteralRange(ord('0'), ord('9'))),
+                    g.TermGroup.create(
+                        g.RepeatTerm(g.Literal('x'), 2, 3)
+                    )
+                )
+            )
+        )
+        text = '0123456789xx' * 4
+        self.assert_same_trees(lang, text, False)
+        with self.assertRaises(g.NoMatches):
+            _load(lang).parse(text + '0', False)
@@ -0,0 +1,107 @@
+import unittest
+
+from prosodia.core import grammar as g
+from prosodia.core.earley import parse_forest
+from prosodia.core.tree import RuleNode
+from prosodia.base.augmentedbnf import create_augmentedbnf
+from prosodia.base.augmentedbnf._text import text as abnf_text
+from prosodia.base.bnf import create_bnf
+from prosodia.base.bnf._text import text as bnf_text
+from prosodia.base.bnfrange._grammar import create_bnfrange
+from prosodia.base.bnfrange._text import text as bnfrange_text
+from prosodia.base.bnfrepeat._grammar import create_bnfrepeat
+from prosodia.base.bnfrepeat._text import text as bnfrepeat_text
+
+from ._helpers import validate_recursive_grammar
+
+
+def _create_ambiguous_language() -> g.Language:
+    lang = g.Language.create('E')
+    lang.add_rule(
+        g.Rule(
+            'E',
+            g.Syntax.create(
+                g.TermGroup.create(
+                    g.RuleReference('E'),
+                    g.Literal('+'),
+                    g.RuleReference('E')
+                ),
+                g.TermGroup.create(g.Literal('1'))
+            )
+        )
+    )
+    return lang
+
+
+def _create_right_recursive_language() -> g.Language:
+    lang = g.Language.create('L')
+    lang.add_rule(
+        g.Rule(
+            'L',
+            g.Syntax.create(
+                g.TermGroup.create(g.Literal('a'), g.RuleReference('L')),
+                g.TermGroup.create(g.Literal('a'))
+            )
+        )
+    )
+    return lang
+
+
+class TestEarley(unittest.TestCase):
+    def assert_same_trees(self, grammar: g.Grammar, text: str) -> None:
+        lang = grammar.language
+        packrat = lang.parse(text, grammar.allow_partial_matches)
+        earley = lang.parse(
+            text,
+            grammar.allow_partial_matches,
+            engine=g.EARLEY
+        )
+        self.assertEqual(packrat.draw(), earley.draw())
+
+    def test_same_trees_as_packrat(self) -> None:
+        self.assert_same_trees(create_bnf(), bnf_text)
+        self.assert_same_trees(create_bnfrange(), bnfrange_text)
+        self.assert_same_trees(create_bnfrepeat(), bnfrepeat_text)
+        self.assert_same_trees(create_augmentedbnf(), abnf_text)
+
+    def test_bnf_grammar_with_earley(self) -> None:
+        bnf = create_bnf()
+        grammar = g.Grammar(bnf.language, bnf.transform, engine=g.EARLEY)
+        validate_recursive_grammar(self, grammar, bnf_text)
+
+    def test_ambiguous_matches(self) -> None:
+        lang = _create_ambiguous_language()
+        drawings = []
+        for engine in (g.PACKRAT, g.EARLEY):
+            with self.assertRaises(g.TooManyMatches) as ctx:
+                lang.parse('1+1+1+1', False, engine=engine)
+            drawings.append(sorted(m.draw() for m in ctx.exception.matches))
+        self.assertEqual(len(drawings[0]), 5)
+        self.assertEqual(drawings[0], drawings[1])
+
+    def test_right_recursion(self) -> None:
+        lang = _create_right_recursive_language()
+        node = lang.parse('a' * 100, False, engine=g.EARLEY)
+        self.assertEqual(str(node), 'a' * 100)
+        self.assertEqual(node.draw(), lang.parse('a' * 100, False).draw())
+
+    def test_deep_trees(self) -> None:
+        # every 'a' nests the tree one level deeper, which is deeper than
+        # building trees recursively could go
+        lang = _create_right_recursive_language()
+        text = 'a' * 600
+        forest = parse_forest(lang, text, False)
+        for node in (
+            lang.parse(text, False, engine=g.EARLEY),
+            forest.choose(),
+        ):
+            depth = 0
+            while isinstance(node, RuleNode) and node.children:
+                node = node.children[-1]
+                depth += 1
+            self.assertEqual(depth, 600)
+
+    def test_unknown_engine(self) -> None:
+        lang = _create_right_recursive_language()
+        with self.assertRaises(ValueError):
+            lang.parse('a', engine='cyk')
@@ -0,0 +1,113 @@
+import typing
+import unittest
+
+from prosodia.core import grammar as g
+from prosodia.core.events import RuleHandler, emit_tree
+from prosodia.core.tree import Node, LiteralNode, MultiNode, RuleNode
+from prosodia.base.augmentedbnf import create_augmentedbnf
+
+_expression_text = '''Expr = Term *(("+" / "-") Term)
+Term = Factor *(("*" / "/") Factor)
+Factor = 1*DIGIT / "(" Expr ")"
+'''
+
+Event = typing.Tuple[str, str, int, int, int]
+
+
+class _Recorder(RuleHandler):
+    def __init__(self) -> None:
+        self.events: typing.List[Event] = []
+
+    def enter_rule(
+        self,
+        rule_name: str,
+        term_group_id: int,
+        start: int
+    ) -> None:
+        self.events.append(('enter', rule_name, term_group_id, start, -1))
+
+    def exit_rule(
+        self,
+        rule_name: str,
+        term_group_id: int,
+        start: int,
+        end: int
+    ) -> None:
+        self.events.append(('exit', rule_name, term_group_id, start, end))
+
+
+def _tree_events(node: Node, pos: int, events: typing.List[Event]) -> int:
+    if isinstance(node, LiteralNode):
+        return pos + len(node.value)
+    start = pos
+    if isinstance(node, RuleNode):
+        events.append(
+            ('enter', node.matched_rule, node.term_group_id, pos, -1)
+        )
+    for child in typing.cast(typing.Union[RuleNode, MultiNode], node).children:
+        pos = _tree_events(child, pos, events)
+    if isinstance(node, RuleNode):
+        events.append(
+            ('exit', node.matched_rule, node.term_group_id, start, pos)
+        )
+    return pos
+
+
+class TestEvents(unittest.TestCase):
+    lang: g.Language
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.lang = create_augmentedbnf().apply(_expression_text)
+
+    def test_same_events_as_the_tree(self) -> None:
+        text = '+'.join(['(1+23)*4-5/(6)'] * 10)
+        expected: typing.List[Event] = []
+        _tree_events(self.lang.parse(text, False), 0, expected)
+        recorder = _Recorder()
+        self.lang.parse_events(text, recorder, False)
+        self.assertEqual(recorder.events, expected)
+        for engine in [g.PACKRAT, g.EARLEY, g.ITERATIVE]:
+            recorder = _Recorder()
+            emit_tree(self.lang.parse(text, False, engine=engine), recorder)
+            self.assertEqual(recorder.events, expected)
+
+    def test_spans(self) -> None:
+        recorder = _Recorder()
+        self.lang.parse_events('12*3', recorder, False)
+        self.assertEqual(
+            [
+                event[1:] for event in recorder.events
+                if event[0] == 'exit' and event[1] != 'DIGIT'
+            ],
+            [
+                ('Factor', 0, 0, 2),
+                ('Factor', 0, 3, 4),
+                ('Term', 0, 0, 4),
+                ('Expr', 0, 0, 4),
+            ]
+        )
+
+    def test_engines_that_make_nodes(self) -> None:
+        for engine in [g.PACKRAT, g.EARLEY, g.ITERATIVE]:
+            with self.assertRaises(ValueError):
+                self.lang.parse_events('1', _Recorder(), engine=engine)
+
+    def test_ordered_choice(self) -> None:
+        # ordered choice stops at "a" and never tries "ab"
+        lang = create_augmentedbnf().apply('Root = "a" / "ab"\n')
+        with self.assertRaises(g.NoMatches):
+            lang.parse_events('ab', _Recorder(), False)
+        recorder = _Recorder()
+        emit_tree(lang.parse('ab', False), recorder)
+        self.assertEqual(
+            recorder.events,
+            [('enter', 'Root', 1, 0, -1), ('exit', 'Root', 1, 0, 2)]
+        )
+
+    def test_no_matches(self) -> None:
+        recorder = _Recorder()
+        with self.assertRaises(g.NoMatches) as raised:
+            self.lang.parse_events('1+', recorder, False, engine=g.PEG)
+        self.assertEqual(raised.exception.offset, 2)
+        self.assertEqual(recorder.events, [])
@@ -0,0 +1,61 @@
+import unittest
+
+from prosodia.core import grammar as g
+from prosodia.core.forest import prefer_first, prefer_longest
+from prosodia.core.tree import RuleNode
+from prosodia.base.bnf import create_bnf
+from prosodia.base.bnf._text import text as bnf_text
+
+from .test_earley import _create_ambiguous_language
+
+
+def _catalan(n: int) -> int:
+    count = 1
+    for k in range(n):
+        count = count * 2 * (2 * k + 1) // (k + 2)
+    return count
+
+
+class TestParseForest(unittest.TestCase):
+    def test_count_matches_trees(self) -> None:
+        lang = _create_ambiguous_language()
+        forest = lang.parse_forest('1+1+1+1', False)
+        self.assertEqual(forest.count(), 5)
+        with self.assertRaises(g.TooManyMatches) as ctx:
+            lang.parse('1+1+1+1', False)
+        self.assertEqual(
+            sorted(t.draw() for t in forest.trees()),
+            sorted(m.draw() for m in ctx.exception.matches)
+        )
+
+    def test_count_without_enumerating(self) -> None:
+        lang = _create_ambiguous_language()
+        forest = lang.parse_forest('+'.join(['1'] * 30), False)
+        self.assertEqual(forest.count(), _catalan(29))
+        first = next(iter(forest.trees()))
+        self.assertEqual(str(first), '+'.join(['1'] * 30))
+
+    def test_choose(self) -> None:
+        lang = _create_ambiguous_language()
+        forest = lang.parse_forest('1+1+1', False)
+        self.assertTrue(forest.roots[0].is_ambiguous)
+
+        longest = forest.choose(prefer_longest)
+        assert isinstance(longest, RuleNode)
+        self.assertEqual(str(longest.children[0]), '1+1')
+        self.assertEqual(str(longest.children[2]), '1')
+
+        first = forest.choose(prefer_first)
+        self.assertEqual(str(first), '1+1+1')
+        self.assertIn(first.draw(), [t.draw() for t in forest.trees()])
+
+    def test_unambiguous_forest(self) -> None:
+        lang = create_bnf().language
+        forest = lang.parse_forest(bnf_text)
+        self.assertEqual(forest.count(), 1)
+        self.assertEqual(forest.choose().draw(), lang.parse(bnf_text).draw())
+
+    def test_no_matches(self) -> None:
+        lang = _create_ambiguous_language()
+        with self.assertRaises(g.NoMatches):
+            lang.parse_forest('+', False)
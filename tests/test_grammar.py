@@ -0,0 +1,731 @@
+from functools import partial
+import pickle
+import typing
+from unittest import TestCase
+
+from prosodia.core import grammar as g
+from prosodia.core.tree import MultiNode, Node, RuleNode
+
+
+class TestTermOffsets(TestCase):
+    def setUp(self) -> None:
+        self.lang = g.Language.create('Root')
+        self.cache = g.MatchCache()
+
+    def test_literal_matches_at_offset(self) -> None:
+        text = 'xxabc'
+        matches = list(g.Literal('ab').match(text, 2, self.lang, self.cache))
+        self.assertEqual([end for end, _ in matches], [4])
+        self.assertEqual(str(matches[0][1]), 'ab')
+        self.assertEqual(
+            list(g.Literal('ab').match(text, 1, self.lang, self.cache)),
+            []
+        )
+
+    def test_case_insensitive_literal(self) -> None:
+        term = g.Literal('ab', case_sensitive=False)
+        matches = list(term.match('xAB', 1, self.lang, self.cache))
+        self.assertEqual([end for end, _ in matches], [3])
+
+    def test_literal_range_and_eof(self) -> None:
+        text = 'a1'
+        digit = g.LiteralRange(ord('0'), ord('9'))
+        self.assertEqual(list(digit.match(text, 0, self.lang, self.cache)), [])
+        matches = list(digit.match(text, 1, self.lang, self.cache))
+        self.assertEqual([end for end, _ in matches], [2])
+        self.assertEqual(list(digit.match(text, 2, self.lang, self.cache)), [])
+
+        eof = g.EOFTerm()
+        self.assertEqual(list(eof.match(text, 1, self.lang, self.cache)), [])
+        self.assertEqual(
+            [end for end, _ in eof.match(text, 2, self.lang, self.cache)],
+            [2]
+        )
+
+
+def _create_left_recursive_language() -> g.Language:
+    lang = g.Language.create('Expr')
+    lang.add_rule(
+        g.Rule(
+            'Expr',
+            g.Syntax.create(
+                g.TermGroup.create(
+                    g.RuleReference('Expr'),
+                    g.Literal('-'),
+                    g.RuleReference('Num')
+                ),
+                g.TermGroup.create(g.RuleReference('Num'))
+            )
+        )
+    )
+    lang.add_rule(
+        g.Rule(
+            'Num',
+            g.Syntax.create(
+                g.TermGroup.create(g.LiteralRange(ord('0'), ord('9')))
+            )
+        )
+    )
+    return lang
+
+
+def _create_indirect_left_recursive_language() -> g.Language:
+    lang = g.Language.create('A')
+    lang.add_rule(
+        g.Rule(
+            'A',
+            g.Syntax.create(
+                g.TermGroup.create(g.RuleReference('B'), g.Literal('x')),
+                g.TermGroup.create(g.Literal('y'))
+            )
+        )
+    )
+    lang.add_rule(
+        g.Rule(
+            'B',
+            g.Syntax.create(
+                g.TermGroup.create(g.RuleReference('A'), g.Literal('z'))
+            )
+        )
+    )
+    return lang
+
+
+def _create_nullable_left_recursive_language() -> g.Language:
+    lang = g.Language.create('S')
+    lang.add_rule(
+        g.Rule(
+            'S',
+            g.Syntax.create(
+                g.TermGroup.create(
+                    g.RuleReference('S'),
+                    g.RuleReference('S'),
+                    g.Literal('b')
+                ),
+                g.TermGroup.create(g.Literal(''))
+            )
+        )
+    )
+    return lang
+
+
+def _create_nullable_indirect_left_recursive_language() -> g.Language:
+    lang = g.Language.create('A')
+    lang.add_rule(
+        g.Rule(
+            'A',
+            g.Syntax.create(
+                g.TermGroup.create(
+                    g.Literal('a'),
+                    g.RuleReference('B'),
+                    g.RuleReference('C')
+                ),
+                g.TermGroup.create(g.RuleReference('C'), g.Literal('b'))
+            )
+        )
+    )
+    lang.add_rule(
+        g.Rule(
+            'B',
+            g.Syntax.create(
+                g.TermGroup.create(g.Literal('b')),
+                g.TermGroup.create(
+                    g.RuleReference('C'),
+                    g.Literal('a'),
+                    g.RuleReference('B')
+                ),
+                g.TermGroup.create(g.Literal(''))
+            )
+        )
+    )
+    lang.add_rule(
+        g.Rule(
+            'C',
+            g.Syntax.create(
+                g.TermGroup.create(g.RuleReference('B')),
+                g.TermGroup.create(g.Literal('a'), g.Literal('a'))
+            )
+        )
+    )
+    return lang
+
+
+def _count_matches(lang: g.Language, text: str) -> int:
+    try:
+        lang.parse(text, allow_partial_matches=False)
+    except g.TooManyMatches as error:
+        return len(error.matches)
+    except g.NoMatches:
+        return 0
+    return 1
+
+
+def _left_operands(node: Node) -> typing.List[str]:
+    operands = []
+    while isinstance(node, RuleNode) and node.term_group_id == 0:
+        operands.append(str(node.children[2]))
+        node = node.children[0]
+    operands.append(str(node))
+    return operands
+
+
+class TestLeftRecursion(TestCase):
+    def test_left_recursive_rule_is_valid(self) -> None:
+        lang = _create_left_recursive_language()
+        self.assertTrue(lang.validate())
+
+    def test_left_associative_tree(self) -> None:
+        lang = _create_left_recursive_language()
+        node = lang.parse('1-2-3', allow_partial_matches=False)
+        self.assertEqual(str(node), '1-2-3')
+        self.assertEqual(_left_operands(node), ['3', '2', '1'])
+
+    def test_partial_matches_include_every_seed(self) -> None:
+        lang = _create_left_recursive_language()
+        with self.assertRaises(g.TooManyMatches) as ctx:
+            lang.parse('1-2-3')
+        self.assertEqual(
+            sorted(str(m) for m in ctx.exception.matches),
+            ['1', '1-2', '1-2-3']
+        )
+
+    def test_long_left_recursive_list_stays_shallow(self) -> None:
+        lang = _create_left_recursive_language()
+        text = '-'.join(['1'] * 5000)
+        node = lang.parse(text, allow_partial_matches=False)
+        self.assertEqual(len(_left_operands(node)), 5000)
+
+    def test_indirect_left_recursion(self) -> None:
+        lang = _create_indirect_left_recursive_language()
+        node = lang.parse('yzxzx', allow_partial_matches=False)
+        self.assertEqual(str(node), 'yzxzx')
+        with self.assertRaises(g.NoMatches):
+            lang.parse('yzxz', allow_partial_matches=False)
+
+    def test_nullable_left_recursion(self) -> None:
+        lang = _create_nullable_left_recursive_language()
+        for text in ['', 'b', 'bb', 'bbb', 'bbbb']:
+            with self.subTest(text=text):
+                self.assertEqual(
+                    _count_matches(lang, text),
+                    lang.parse_forest(text, False).count()
+                )
+        self.assertEqual(_count_matches(lang, 'bbbb'), 14)
+
+    def test_nullable_indirect_left_recursion(self) -> None:
+        lang = _create_nullable_indirect_left_recursive_language()
+        for text in ['ab', 'aa', 'aab', 'abab']:
+            with self.subTest(text=text):
+                self.assertEqual(
+                    _count_matches(lang, text),
+                    lang.parse_forest(text, False).count()
+                )
+
+    def test_cyclic_rule_terminates(self) -> None:
+        lang = g.Language.create('A')
+        lang.add_rule(
+            g.Rule(
+                'A',
+                g.Syntax.create(
+                    g.TermGroup.create(g.RuleReference('A')),
+                    g.TermGroup.create(g.Literal('a'))
+                )
+            )
+        )
+        node = lang.parse('a', allow_partial_matches=False)
+        self.assertEqual(str(node), 'a')
+
+
+class TestRepeatTerm(TestCase):
+    def setUp(self) -> None:
+        self.digit = g.LiteralRange(ord('0'), ord('9'))
+
+    def test_fewest_repetitions_first(self) -> None:
+        term = g.RepeatTerm(g.Literal('12'), 1, 3)
+        lang = g.Language.create('Root')
+        matches = list(term.match('1212121', 0, lang, g.MatchCache()))
+        self.assertEqual([end for end, _ in matches], [2, 4, 6])
+        self.assertEqual(
+            [str(node) for _, node in matches],
+            ['12', '1212', '121212']
+        )
+
+    def test_single_characters_fewest_first(self) -> None:
+        term = g.RepeatTerm(self.digit, 1, 3)
+        lang = g.Language.create('Root')
+        matches = list(term.match('12345', 0, lang, g.MatchCache()))
+        self.assertEqual([end for end, _ in matches], [1, 2, 3])
+        self.assertEqual([str(node) for _, node in matches], ['1', '12', '123'])
+        self.assertEqual(list(term.match('x', 0, lang, g.MatchCache())), [])
+
+    def test_single_characters_same_order_as_other_repeats(self) -> None:
+        lang = g.Language.create('Root')
+        scanned = g.RepeatTerm(g.LiteralRange(ord('a'), ord('a')), 0, 3)
+        # a letter that ignores case is not scanned as a run
+        repeated = g.RepeatTerm(g.Literal('a', False), 0, 3)
+        self.assertIsNotNone(lang.char_run(scanned))
+        self.assertIsNone(lang.char_run(repeated))
+        for text in ['', 'a', 'aaaaa']:
+            ends = [
+                [end for end, _ in term.match(text, 0, lang, g.MatchCache())]
+                for term in (scanned, repeated)
+            ]
+            self.assertEqual(ends[0], ends[1])
+
+    def test_single_character_choices(self) -> None:
+        lang = g.Language.create('Root')
+        lang.add_rule(
+            g.Rule(
+                'WSP',
+                g.Syntax.create(
+                    g.TermGroup.create(g.Literal(' ')),
+                    g.TermGroup.create(g.Literal('\t'))
+                )
+            )
+        )
+        choices = [
+            g.RepeatTerm(g.RuleReference('WSP'), 0, None),
+            g.RepeatTerm(
+                g.GroupTerm([[g.Literal(' ')], [g.Literal('\t')]]),
+                0,
+                None
+            ),
+        ]
+        for term in choices:
+            self.assertIsNotNone(lang.char_run(term))
+            matches = list(term.match(' \t x', 0, lang, g.MatchCache()))
+            end, node = matches[-1]
+            self.assertEqual(end, 3)
+            expected = [
+                node
+                for char in ' \t '
+                for _, node in term.child.match(char, 0, lang, g.MatchCache())
+            ]
+            self.assertEqual(node.draw(), MultiNode(expected).draw())
+
+        overlapping = g.RepeatTerm(
+            g.GroupTerm([[self.digit], [g.Literal('1')]]),
+            0,
+            None
+        )
+        self.assertIsNone(lang.char_run(overlapping))
+
+    def test_long_repeat(self) -> None:
+        lang = g.Language.create('Root')
+        lang.add_rule(
+            g.Rule(
+                'Root',
+                g.Syntax.create(
+                    g.TermGroup.create(
+                        g.RepeatTerm(self.digit, 0, None),
+                        g.EOFTerm()
+                    )
+                )
+            )
+        )
+        node = lang.parse('7' * 100000, allow_partial_matches=False)
+        repeat = typing.cast(RuleNode, node).children[0]
+        self.assertEqual(len(typing.cast(MultiNode, repeat).children), 100000)
+        self.assertEqual(str(repeat), '7' * 100000)
+
+
+def _create_language(root: g.Term, *rest: g.Term) -> g.Language:
+    lang = g.Language.create('Root')
+    lang.add_rule(
+        g.Rule('Root', g.Syntax.create(g.TermGroup.create(root, *rest)))
+    )
+    return lang
+
+
+class TestCommit(TestCase):
+    def test_possessive_repeat_keeps_longest_match(self) -> None:
+        lang = g.Language.create('Root')
+        for child in (g.Literal('ab'), g.LiteralRange(ord('a'), ord('b'))):
+            term = g.RepeatTerm(child, 0, None, possessive=True)
+            matches = list(term.match('ababc', 0, lang, g.MatchCache()))
+            self.assertEqual([end for end, _ in matches], [4])
+            self.assertEqual(str(matches[0][1]), 'abab')
+
+    def test_possessive_repeat_does_not_give_back(self) -> None:
+        for possessive in (False, True):
+            lang = _create_language(
+                g.RepeatTerm(g.Literal('a'), 0, None, possessive),
+                g.Literal('a')
+            )
+            if possessive:
+                with self.assertRaises(g.NoMatches):
+                    lang.parse('aaa', allow_partial_matches=False)
+                with self.assertRaises(TypeError):
+                    lang.parse('aaa', False, engine=g.EARLEY)
+            else:
+                node = lang.parse('aaa', allow_partial_matches=False)
+                self.assertEqual(str(node), 'aaa')
+
+    def test_atomic_term_commits_to_first_match(self) -> None:
+        choice = g.GroupTerm([[g.Literal('x')], [g.Literal('xy')]])
+        lang = _create_language(choice, g.EOFTerm())
+        self.assertEqual(str(lang.parse('xy', False)), 'xy')
+        lang = _create_language(g.AtomicTerm(choice), g.EOFTerm())
+        with self.assertRaises(g.NoMatches):
+            lang.parse('xy', False)
+
+    def test_cut_skips_other_alternatives(self) -> None:
+        for cut in ([], [g.CutTerm()]):
+            lang = g.Language.create('Root')
+            lang.add_rule(
+                g.Rule(
+                    'Root',
+                    g.Syntax.create(
+                        g.TermGroup.create(
+                            g.Literal('a'), *cut, g.Literal('b')
+                        ),
+                        g.TermGroup.create(g.Literal('a'), g.Literal('c'))
+                    )
+                )
+            )
+            if cut:
+                with self.assertRaises(g.NoMatches):
+                    lang.parse('ac', False)
+            else:
+                self.assertEqual(str(lang.parse('ac', False)), 'ac')
+
+    def test_cut_commits_whatever_the_lookahead_rules_out(self) -> None:
+        lang = g.Language.create('A')
+        lang.add_rule(
+            g.Rule(
+                'A',
+                g.Syntax.create(
+                    g.TermGroup.create(
+                        g.RepeatTerm(g.Literal(' '), 0, None),
+                        g.CutTerm(),
+                        g.Literal('x')
+                    ),
+                    g.TermGroup.create(
+                        g.RepeatTerm(g.Literal(' '), 0, None),
+                        g.Literal('y')
+                    )
+                )
+            )
+        )
+        self.assertEqual(lang.lookahead().alternatives('A', 'y', 0), (0, 1))
+        for text in ('y', ' y'):
+            for engine in (g.PACKRAT, g.PEG):
+                with self.assertRaises(g.NoMatches):
+                    lang.parse(text, False, engine=engine)
+        self.assertEqual(str(lang.parse('x', False)), 'x')
+
+    def test_cut_forgets_memo_entries_before_it(self) -> None:
+        lang = _create_language(
+            g.RepeatTerm(g.RuleReference('Record'), 0, None, possessive=True),
+            g.EOFTerm()
+        )
+        lang.add_rule(
+            g.Rule(
+                'Record',
+                g.Syntax.create(
+                    g.TermGroup.create(
+                        g.RuleReference('Field'),
+                        g.Literal(';'),
+                        g.CutTerm()
+                    )
+                )
+            )
+        )
+        lang.add_rule(
+            g.Rule(
+                'Field',
+                g.Syntax.create(
+                    g.TermGroup.create(
+                        g.RepeatTerm(g.Literal('ab'), 1, None)
+                    )
+                )
+            )
+        )
+        text = 'abab;' * 100
+        cache = g.MatchCache()
+        node = lang.parse(text, False, cache)
+        self.assertEqual(str(node), text)
+        self.assertLessEqual(
+            {pos for _, pos in cache.entries},
+            {0, len(text) - 5, len(text)}
+        )
+
+    def test_cut_forgets_entries_made_after_backtracking(self) -> None:
+        lang = _create_language(
+            g.RepeatTerm(g.RuleReference('Record'), 0, None, possessive=True),
+            g.EOFTerm()
+        )
+        rules: typing.Dict[str, typing.List[typing.List[g.Term]]] = {
+            # the first alternative looks at the end of the text before it
+            # fails, so the entries of every later record are made after an
+            # entry at an offset that no cut gets past
+            'Record': [
+                [g.Literal('a'), g.RuleReference('Far')],
+                [
+                    g.Literal('a'),
+                    g.RuleReference('Near'),
+                    g.Literal(';'),
+                    g.CutTerm(),
+                ],
+            ],
+            'Far': [[
+                g.Literal('b;'),
+                g.RepeatTerm(g.Literal('ab;'), 0, None),
+                g.RuleReference('Empty'),
+                g.Literal('z'),
+            ]],
+            'Empty': [[g.RepeatTerm(g.Literal('q'), 0, None)]],
+            'Near': [[g.Literal('b')]],
+        }
+        for name, term_groups in rules.items():
+            lang.add_rule(
+                g.Rule(
+                    name,
+                    g.Syntax.create(
+                        *(g.TermGroup.create(*terms) for terms in term_groups)
+                    )
+                )
+            )
+        text = 'ab;' * 100
+        cache = g.MatchCache()
+        self.assertEqual(str(lang.parse(text, False, cache)), text)
+        self.assertLessEqual(len(cache.entries) + len(cache.finished), 5)
+
+    def test_forget_before_drops_entries_in_any_order(self) -> None:
+        cache = g.MatchCache()
+        for pos in (5, 1, 3):
+            cache.finish(('Rule', pos), [])
+        cache.forget_before(4)
+        self.assertEqual(list(cache.finished), [('Rule', 5)])
+        # an entry behind the last cut is still dropped by the next one
+        cache.finish(('Rule', 2), [])
+        cache.forget_before(6)
+        self.assertEqual(cache.finished, dict())
+
+    def test_cut_leaves_no_node(self) -> None:
+        terms: typing.List[g.Term] = [
+            g.Literal('a'),
+            g.CutTerm(),
+            g.Literal('b'),
+        ]
+        rule_lang = _create_language(*terms)
+        group_lang = _create_language(g.GroupTerm([terms]))
+        for engine in (g.PACKRAT, g.PEG):
+            nodes = [
+                rule_lang.parse('ab', False, engine=engine),
+                group_lang.parse('ab', False, engine=engine).children[0],
+            ]
+            for node in nodes:
+                self.assertEqual(
+                    [str(child) for child in node.children],
+                    ['a', 'b']
+                )
+
+
+class TestMatchPolicy(TestCase):
+    def setUp(self) -> None:
+        self.lang = _create_left_recursive_language()
+
+    def test_all_matches_by_default(self) -> None:
+        with self.assertRaises(g.TooManyMatches):
+            self.lang.parse('1-2-3', policy=g.ALL_MATCHES)
+
+    def test_first_match(self) -> None:
+        for engine in (g.PACKRAT, g.EARLEY):
+            node = self.lang.parse(
+                '1-2-3', policy=g.FIRST_MATCH, engine=engine
+            )
+            self.assertIn(str(node), ['1', '1-2', '1-2-3'])
+        with self.assertRaises(g.NoMatches):
+            self.lang.parse('x', policy=g.FIRST_MATCH)
+
+    def test_unique_match_stops_at_second_match(self) -> None:
+        with self.assertRaises(g.TooManyMatches) as ctx:
+            self.lang.parse('1-2-3', policy=g.UNIQUE_MATCH)
+        self.assertEqual(len(ctx.exception.matches), 2)
+        node = self.lang.parse('1-2-3', False, policy=g.UNIQUE_MATCH)
+        self.assertEqual(str(node), '1-2-3')
+
+    def test_longest_match(self) -> None:
+        for engine in (g.PACKRAT, g.EARLEY, g.ITERATIVE):
+            node = self.lang.parse(
+                '1-2-3x', policy=g.LONGEST_MATCH, engine=engine
+            )
+            self.assertEqual(str(node), '1-2-3')
+
+    def test_unknown_policy(self) -> None:
+        with self.assertRaises(ValueError):
+            self.lang.parse('1', policy='shortest')
+
+
+def _create_nested_ambiguous_language() -> g.Language:
+    lang = g.Language.create('Root')
+    lang.add_rule(
+        g.Rule(
+            'Root',
+            g.Syntax.create(
+                g.TermGroup.create(
+                    g.Literal('x'),
+                    g.RuleReference('Sum'),
+                    g.Literal('y')
+                )
+            )
+        )
+    )
+    lang.add_rule(
+        g.Rule(
+            'Sum',
+            g.Syntax.create(
+                g.TermGroup.create(
+                    g.RuleReference('Sum'),
+                    g.Literal('+'),
+                    g.RuleReference('Sum')
+                ),
+                g.TermGroup.create(g.Literal('1'))
+            )
+        )
+    )
+    return lang
+
+
+class TestAmbiguity(TestCase):
+    def test_smallest_ambiguous_span(self) -> None:
+        lang = _create_nested_ambiguous_language()
+        for parse in (
+            lang.parse,
+            lambda text, partial: lang.parse(text, partial, engine=g.EARLEY)
+        ):
+            with self.assertRaises(g.TooManyMatches) as ctx:
+                parse('x1+1+1y', False)
+            ambiguity = ctx.exception.ambiguity
+            assert ambiguity is not None
+            self.assertEqual(ambiguity.rule_name, 'Sum')
+            self.assertEqual((ambiguity.start, ambiguity.end), (1, 6))
+            self.assertEqual(ambiguity.term_groups, (0, 0))
+
+    def test_ambiguity_without_every_match(self) -> None:
+        lang = _create_nested_ambiguous_language()
+        text = 'x{0}y'.format('+'.join(['1'] * 40))
+        for engine in (g.PACKRAT, g.EARLEY):
+            with self.assertRaises(g.TooManyMatches) as ctx:
+                lang.parse(text, False, engine=engine, policy=g.UNIQUE_MATCH)
+            ambiguity = ctx.exception.ambiguity
+            assert ambiguity is not None
+            self.assertEqual(ambiguity.rule_name, 'Sum')
+            self.assertEqual(ambiguity.end - ambiguity.start, 5)
+
+    def test_all_matches_stops_at_second_match(self) -> None:
+        lang = _create_nested_ambiguous_language()
+        for parse, count in (
+            (lang.parse, 40),
+            (
+                lambda text, partial: lang.parse(
+                    text, partial, engine=g.EARLEY
+                ),
+                40
+            )
+        ):
+            with self.assertRaises(g.TooManyMatches) as ctx:
+                parse('x{0}y'.format('+'.join(['1'] * count)), False)
+            error = ctx.exception
+            self.assertEqual(len(error.found), 2)
+            self.assertIn('at least 2 matches', str(error))
+            assert error.ambiguity is not None
+            self.assertEqual(error.ambiguity.rule_name, 'Sum')
+
+        with self.assertRaises(g.TooManyMatches) as ctx:
+            lang.parse('x1+1+1+1y', False)
+        self.assertEqual(len(ctx.exception.matches), 5)
+        self.assertIn('5 matches', str(ctx.exception))
+
+    def test_matches_of_different_lengths(self) -> None:
+        lang = _create_left_recursive_language()
+        with self.assertRaises(g.TooManyMatches) as ctx:
+            lang.parse('1-2-3')
+        self.assertIsNone(ctx.exception.ambiguity)
+
+
+class TestNoMatches(TestCase):
+    def setUp(self) -> None:
+        self.lang = _create_left_recursive_language()
+
+    def test_farthest_failure(self) -> None:
+        parsers: typing.List[typing.Callable[[str], Node]] = [
+            partial(self.lang.parse, allow_partial_matches=False, engine=engine)
+            for engine in (g.PACKRAT, g.EARLEY, g.ITERATIVE, g.PEG)
+        ]
+        for parse in parsers:
+            with self.assertRaises(g.NoMatches) as ctx:
+                parse('1-2-x')
+            error = ctx.exception
+            self.assertEqual(error.offset, 4)
+            self.assertEqual((error.line, error.column), (1, 5))
+            # the rule is expected when no term group of it can start there
+            self.assertIn(error.expected, [['Num'], ["'0'-'9'"]])
+
+    def test_end_of_text_expected(self) -> None:
+        with self.assertRaises(g.NoMatches) as ctx:
+            self.lang.parse('1-2+', False)
+        self.assertEqual(ctx.exception.offset, 3)
+        self.assertEqual(
+            sorted(ctx.exception.expected),
+            ["'-'", 'end of text']
+        )
+
+    def test_line_and_column(self) -> None:
+        lang = _create_language(
+            g.RepeatTerm(
+                g.GroupTerm([[g.Literal('ab')], [g.Literal('\n')]]),
+                0,
+                None
+            ),
+            g.EOFTerm()
+        )
+        with self.assertRaises(g.NoMatches) as ctx:
+            lang.parse('ab\nabab\naX', False)
+        error = ctx.exception
+        self.assertEqual((error.offset, error.line, error.column), (8, 3, 1))
+        self.assertIn("'ab'", error.expected)
+        self.assertIn('end of text', str(error))
+
+    def test_repr_and_pickle(self) -> None:
+        for error in [
+            g.NoMatches(),
+            g.NoMatches('ab', 1, ()),
+            g.NoMatches('a\nbc', 3, [g.Literal('x'), g.END_OF_TEXT], 4),
+        ]:
+            self.assertIn('NoMatches', repr(error))
+            copy = pickle.loads(pickle.dumps(error))
+            self.assertEqual(
+                (copy.text, copy.offset, copy.expected, str(copy)),
+                (error.text, error.offset, error.expected, str(error))
+            )
+            self.assertEqual((copy.line, copy.column), (error.line, error.column))
+            self.assertEqual(copy.args, (error.offset, error.expected))
+
+    def test_line_index(self) -> None:
+        lines = g.LineIndex('a\nbc\n\nd')
+        self.assertEqual(lines.position(0), (1, 1))
+        self.assertEqual(lines.position(1), (1, 2))
+        self.assertEqual(lines.position(3), (2, 2))
+        self.assertEqual(lines.position(5), (3, 1))
+        self.assertEqual(lines.position(6), (4, 1))
+        self.assertEqual(lines.position(-1), (1, 1))
+
+    def test_no_term_group_can_start(self) -> None:
+        lang = g.Language.create('A')
+        lang.add_rule(
+            g.Rule(
+                'A',
+                g.Syntax.create(
+                    g.TermGroup.create(g.Literal('x')),
+                    g.TermGroup.create(g.Literal('z'))
+                )
+            )
+        )
+        with self.assertRaises(g.NoMatches) as ctx:
+            lang.parse('y', engine=g.PACKRAT)
+        error = ctx.exception
+        self.assertEqual((error.offset, error.expected), (0, ['A']))
+        self.assertEqual((error.line, error.column), (1, 1))
+        self.assertIn('expected A at line 1, column 1', str(error))
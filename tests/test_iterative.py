@@ -0,0 +1,168 @@
+import gc
+import sys
+import unittest
+from unittest import mock
+
+from prosodia.core import grammar as g
+from prosodia.core import iterative
+from prosodia.core.tree import RuleNode
+from prosodia.base.augmentedbnf import create_augmentedbnf
+from prosodia.base.augmentedbnf._text import text as abnf_text
+from prosodia.base.bnf import create_bnf
+from prosodia.base.bnf._text import text as bnf_text
+from prosodia.base.bnfrange._grammar import create_bnfrange
+from prosodia.base.bnfrange._text import text as bnfrange_text
+from prosodia.base.bnfrepeat._grammar import create_bnfrepeat
+from prosodia.base.bnfrepeat._text import text as bnfrepeat_text
+
+from ._helpers import validate_recursive_grammar
+from .test_earley import (
+    _create_ambiguous_language,
+    _create_right_recursive_language,
+)
+from .test_grammar import (
+    _create_indirect_left_recursive_language,
+    _create_left_recursive_language,
+    _left_operands,
+)
+
+
+def _bnf_rules(count: int) -> str:
+    return ''.join(
+        '<r{0}> ::= "a" <b{0}> | "c"\n'.format(i) for i in range(count)
+    )
+
+
+class TestIterative(unittest.TestCase):
+    def assert_same_trees(self, grammar: g.Grammar, text: str) -> None:
+        lang = grammar.language
+        packrat = lang.parse(text, grammar.allow_partial_matches)
+        iterated = lang.parse(
+            text,
+            grammar.allow_partial_matches,
+            engine=g.ITERATIVE
+        )
+        self.assertEqual(packrat.draw(), iterated.draw())
+
+    def test_same_trees_as_packrat(self) -> None:
+        self.assert_same_trees(create_bnf(), bnf_text)
+        self.assert_same_trees(create_bnfrange(), bnfrange_text)
+        self.assert_same_trees(create_bnfrepeat(), bnfrepeat_text)
+        self.assert_same_trees(create_augmentedbnf(), abnf_text)
+
+    def test_bnf_grammar_with_iterative_engine(self) -> None:
+        bnf = create_bnf()
+        grammar = g.Grammar(bnf.language, bnf.transform, engine=g.ITERATIVE)
+        validate_recursive_grammar(self, grammar, bnf_text)
+
+    def test_ambiguous_matches(self) -> None:
+        lang = _create_ambiguous_language()
+        drawings = []
+        for engine in (g.PACKRAT, g.ITERATIVE):
+            with self.assertRaises(g.TooManyMatches) as ctx:
+                lang.parse('1+1+1+1', False, engine=engine)
+            drawings.append(sorted(m.draw() for m in ctx.exception.matches))
+        self.assertEqual(len(drawings[0]), 5)
+        self.assertEqual(drawings[0], drawings[1])
+
+    def test_left_recursion(self) -> None:
+        lang = _create_left_recursive_language()
+        node = lang.parse('1-2-3', False, engine=g.ITERATIVE)
+        self.assertEqual(_left_operands(node), ['3', '2', '1'])
+        with self.assertRaises(g.TooManyMatches) as ctx:
+            lang.parse('1-2-3', engine=g.ITERATIVE)
+        self.assertEqual(
+            sorted(str(m) for m in ctx.exception.matches),
+            ['1', '1-2', '1-2-3']
+        )
+
+        lang = _create_indirect_left_recursive_language()
+        self.assertEqual(
+            lang.parse('yzxzx', False, engine=g.ITERATIVE).draw(),
+            lang.parse('yzxzx', False).draw()
+        )
+
+    def test_cyclic_rule_terminates(self) -> None:
+        lang = g.Language.create('A')
+        lang.add_rule(
+            g.Rule(
+                'A',
+                g.Syntax.create(
+                    g.TermGroup.create(g.RuleReference('A')),
+                    g.TermGroup.create(g.Literal('a'))
+                )
+            )
+        )
+        node = lang.parse('a', False, engine=g.ITERATIVE)
+        self.assertEqual(node.draw(), lang.parse('a', False).draw())
+
+    def test_right_recursion_deeper_than_recursion_limit(self) -> None:
+        lang = _create_right_recursive_language()
+        depth = sys.getrecursionlimit() * 2
+        node = lang.parse('a' * depth, False, engine=g.ITERATIVE)
+        for _ in range(depth - 1):
+            assert isinstance(node, RuleNode)
+            self.assertEqual(node.term_group_id, 0)
+            node = node.children[1]
+        self.assertEqual(node.draw(), lang.parse('a', False).draw())
+
+    def test_many_bnf_rules(self) -> None:
+        lang = create_bnf().language
+        count = sys.getrecursionlimit()
+        node = lang.parse(_bnf_rules(count), False, engine=g.ITERATIVE)
+        rules = node.children[0]
+        found = 1
+        while isinstance(rules, RuleNode) and rules.term_group_id == 1:
+            rules = rules.children[1]
+            found += 1
+        self.assertEqual(found, count)
+
+    def test_trees_are_built_when_asked_for(self) -> None:
+        lang = _create_ambiguous_language()
+        matches = iterative.parse_all(lang, '1+1+1+1', False)
+        with mock.patch.object(
+            iterative,
+            '_materialize',
+            wraps=iterative._materialize  # pylint: disable=protected-access
+        ) as materialize:
+            next(iter(matches))
+            self.assertEqual(materialize.call_count, 1)
+            node = lang.parse(
+                '1+1+1+1',
+                False,
+                engine=g.ITERATIVE,
+                policy=g.FIRST_MATCH
+            )
+            self.assertEqual(str(node), '1+1+1+1')
+            self.assertEqual(materialize.call_count, 2)
+
+    def test_first_match_stops_recognizing(self) -> None:
+        lang = _create_ambiguous_language()
+        text = '+'.join(['1'] * 10)
+        counts = []
+        for stop in (True, False):
+            with mock.patch.object(
+                iterative._Parser,  # pylint: disable=protected-access
+                '_schedule',
+                autospec=True,
+                side_effect=iterative._Parser._schedule  # pylint: disable=protected-access
+            ) as schedule:
+                matches = iterative.parse_all(lang, text, False)
+                self.assertEqual(str(next(matches)[1]), text)
+                if not stop:
+                    self.assertEqual(len(list(matches)), 4861)
+                counts.append(schedule.call_count)
+        self.assertLess(counts[0] * 100, counts[1])
+
+    def test_parse_leaves_no_cycles(self) -> None:
+        lang = create_bnf().language
+        text = _bnf_rules(50)
+        gc.collect()
+        gc.disable()
+        try:
+            lang.parse(text, False, engine=g.ITERATIVE)
+            self.assertEqual(gc.collect(), 0)
+            lang.parse(text, False, engine=g.ITERATIVE, policy=g.FIRST_MATCH)
+            self.assertEqual(gc.collect(), 0)
+        finally:
+            gc.enable()
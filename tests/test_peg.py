@@ -0,0 +1,168 @@
+import typing
+import unittest
+
+from prosodia.core import grammar as g, peg, transform as t
+from prosodia.core.analysis import ordered_choice_conflicts
+from prosodia.base.augmentedbnf import create_augmentedbnf
+from prosodia.base.augmentedbnf._freebies import add_freebie_transforms
+
+from .test_grammar import (
+    _create_indirect_left_recursive_language,
+    _create_left_recursive_language,
+    _left_operands,
+)
+
+_expression_text = '''Expr = Term *(("+" / "-") Term)
+Term = Factor *(("*" / "/") Factor)
+Factor = 1*DIGIT / "(" Expr ")"
+'''
+
+
+def _first(values: typing.Tuple[str]) -> str:
+    return values[0]
+
+
+def _values(values: typing.Tuple[typing.Any, ...]) -> typing.Any:
+    return values
+
+
+def _apply_abnf(text: str) -> g.Language:
+    return create_augmentedbnf().apply(text)
+
+
+class TestPEG(unittest.TestCase):
+    def test_same_trees_as_packrat(self) -> None:
+        lang = _apply_abnf(_expression_text)
+        self.assertFalse(ordered_choice_conflicts(lang).warnings)
+        text = '+'.join(['(1+23)*4-5/(6)'] * 10)
+        self.assertEqual(
+            lang.parse(text, False, engine=g.PEG).draw(),
+            lang.parse(text, False).draw()
+        )
+
+    def test_first_alternative_wins(self) -> None:
+        lang = _apply_abnf('Root = "a" / "ab"\n')
+        self.assertEqual(str(lang.parse('ab', False)), 'ab')
+        with self.assertRaises(g.NoMatches):
+            lang.parse('ab', False, engine=g.PEG)
+        self.assertEqual(str(lang.parse('ab', engine=g.PEG)), 'a')
+        self.assertEqual(
+            ordered_choice_conflicts(lang).warnings,
+            [
+                "rule 'Root': alternatives 0 and 1 can start with the same "
+                "character, so 1 is only tried where 0 fails"
+            ]
+        )
+
+    def test_repeats_are_greedy(self) -> None:
+        lang = _apply_abnf('Root = *"a" "a"\n')
+        self.assertEqual(str(lang.parse('aaa', False)), 'aaa')
+        with self.assertRaises(g.NoMatches):
+            lang.parse('aaa', False, engine=g.PEG)
+        self.assertEqual(
+            ordered_choice_conflicts(lang).warnings,
+            [
+                "rule 'Root': the repeat at term 0 can take the text that "
+                "can follow it"
+            ]
+        )
+
+    def test_conflicts_across_rules(self) -> None:
+        lang = _apply_abnf('Root = Run "a"\nRun = *"a"\n')
+        self.assertEqual(str(lang.parse('aa', False)), 'aa')
+        with self.assertRaises(g.NoMatches):
+            lang.parse('aa', False, engine=g.PEG)
+        self.assertEqual(
+            ordered_choice_conflicts(lang).warnings,
+            [
+                "rule 'Run': the repeat at term 0 can take the text that "
+                "can follow it"
+            ]
+        )
+
+        lang = _apply_abnf('Root = Maybe "a"\nMaybe = "a" / ""\n')
+        self.assertEqual(str(lang.parse('a', False)), 'a')
+        with self.assertRaises(g.NoMatches):
+            lang.parse('a', False, engine=g.PEG)
+        self.assertEqual(
+            ordered_choice_conflicts(lang).warnings,
+            [
+                "rule 'Maybe': alternatives 0 and 1 can start with the same "
+                "character, so 1 is only tried where 0 fails"
+            ]
+        )
+
+    def test_grammar_validation_reports_conflicts(self) -> None:
+        lang = _apply_abnf('Root = "a" / "ab"\n')
+        transform = add_freebie_transforms(
+            t.LanguageTransformation.create('Root', [_first, _first])
+        )
+        self.assertFalse(g.Grammar(lang, transform).validate().warnings)
+        validity = g.Grammar(lang, transform, engine=g.PEG).validate()
+        self.assertTrue(validity)
+        self.assertEqual(len(validity.warnings), 1)
+
+    def test_shared_prefix_is_only_a_warning(self) -> None:
+        lang = _apply_abnf('Root = "a" "b" / "a" "c"\n')
+        self.assertEqual(str(lang.parse('ac', False, engine=g.PEG)), 'ac')
+        validity = ordered_choice_conflicts(lang)
+        self.assertTrue(validity)
+        self.assertEqual(len(validity.warnings), 1)
+
+    def test_cut_fails_the_choice(self) -> None:
+        lang = _apply_abnf('Root = "a" ~ "b" / "a" "c"\n')
+        self.assertEqual(str(lang.parse('ab', False, engine=g.PEG)), 'ab')
+        with self.assertRaises(g.NoMatches):
+            lang.parse('ac', False, engine=g.PEG)
+
+    def test_cut_forgets_results_before_it(self) -> None:
+        lang = _apply_abnf(
+            'Root = *Record\nRecord = Field ";" ~\nField = 1*"ab"\n'
+        )
+        text = 'abab;' * 100
+        program = peg._Program(  # pylint: disable=protected-access
+            lang,
+            g.MatchCache(),
+            peg._NodeBuilder()  # pylint: disable=protected-access
+        )
+        result = program.root(text, 0)
+        assert result is not None
+        self.assertEqual(str(result[1]), text)
+        self.assertLessEqual(
+            {
+                pos
+                for memo in program._memos  # pylint: disable=protected-access
+                for pos in memo
+            },
+            {0, len(text) - 5, len(text)}
+        )
+
+    def test_left_recursion(self) -> None:
+        lang = _create_left_recursive_language()
+        node = lang.parse('1-2-3', False, engine=g.PEG)
+        self.assertEqual(_left_operands(node), ['3', '2', '1'])
+        self.assertEqual(str(lang.parse('1-2-3', engine=g.PEG)), '1-2-3')
+
+        lang = _create_indirect_left_recursive_language()
+        self.assertEqual(
+            lang.parse('yzxzx', False, engine=g.PEG).draw(),
+            lang.parse('yzxzx', False).draw()
+        )
+
+    def test_fused_transform(self) -> None:
+        lang = _apply_abnf(_expression_text)
+        transform = add_freebie_transforms(
+            t.LanguageTransformation.create('Expr', [_values])
+        )
+        transform <<= ('Term', [_values])
+        transform <<= ('Factor', [_values, _values])
+        text = '+'.join(['(1+23)*4-5/(6)'] * 10)
+        fused = g.Grammar(lang, transform, False, g.PEG, fused=True)
+        self.assertEqual(
+            fused.apply(text),
+            g.Grammar(lang, transform, False, g.PEG).apply(text)
+        )
+        with self.assertRaises(g.NoMatches):
+            fused.apply('1+')
+        with self.assertRaises(ValueError):
+            g.Grammar(lang, transform, False, fused=True)
@@ -0,0 +1,87 @@
+import unittest
+
+from prosodia.core import grammar as g
+from prosodia.base.augmentedbnf import create_augmentedbnf
+from prosodia.base.augmentedbnf._text import text as abnf_text
+
+from .test_grammar import (
+    _create_indirect_left_recursive_language,
+    _create_left_recursive_language,
+)
+
+
+def _parses(lang: g.Language, text: str, partial: bool) -> bool:
+    try:
+        lang.parse(text, partial)
+    except g.TooManyMatches:
+        return True
+    except g.NoMatches:
+        return False
+    return True
+
+
+class TestRecognize(unittest.TestCase):
+    def test_same_answers_as_parse(self) -> None:
+        lang = create_augmentedbnf().language
+        text = abnf_text[:400]
+        texts = [
+            text,
+            text[:-1],
+            text[:123],
+            text.replace('=', '', 1),
+            text.replace('/', '//', 1),
+            '',
+        ]
+        for t in texts:
+            for partial in [False, True]:
+                self.assertEqual(
+                    lang.recognize(t, partial),
+                    _parses(lang, t, partial),
+                    (t, partial)
+                )
+
+    def test_left_recursion(self) -> None:
+        lang = _create_left_recursive_language()
+        self.assertTrue(lang.recognize('1-2-3', False))
+        self.assertFalse(lang.recognize('1-2-', False))
+        self.assertTrue(lang.recognize('1-2-', True))
+
+        lang = _create_indirect_left_recursive_language()
+        for text in ['yzxzx', 'yzx', 'yzxz', 'zx']:
+            self.assertEqual(
+                lang.recognize(text, False),
+                _parses(lang, text, False),
+                text
+            )
+
+    def test_nested_left_recursion(self) -> None:
+        lang = create_augmentedbnf().apply(
+            'Expr = Expr "+" Term / Term\n'
+            'Term = Term "*" Factor / Factor\n'
+            'Factor = 1*DIGIT / "(" Expr ")"\n'
+        )
+        self.assertTrue(lang.recognize('(1+2)*3+4*(5+6*7)', False))
+        self.assertFalse(lang.recognize('(1+2)*3+4*(5+6*7', False))
+        self.assertFalse(lang.recognize('1+*2', False))
+
+    def test_cut(self) -> None:
+        lang = create_augmentedbnf().apply('Root = "a" ~ "b" / "a" "c"\n')
+        self.assertTrue(lang.recognize('ab', False))
+        self.assertFalse(lang.recognize('ac', False))
+
+    def test_deep_input(self) -> None:
+        lang = create_augmentedbnf().apply(
+            'Expr = "(" Expr ")" / List\n'
+            'List = "x" List / "x"\n'
+        )
+        depth = 5000
+        text = '(' * depth + 'x' * depth + ')' * depth
+        self.assertTrue(lang.recognize(text))
+        self.assertFalse(
+            lang.recognize('(' * depth + 'x' + ')' * (depth - 1), False)
+        )
+
+    def test_partial_matches_by_default(self) -> None:
+        lang = create_augmentedbnf().apply('Root = "a"\n')
+        self.assertTrue(lang.recognize('ab'))
+        self.assertFalse(lang.recognize('ab', False))
@@ -0,0 +1,190 @@
+import io
+import unittest
+
+from prosodia.core import grammar as g
+from prosodia.core.stats import Profiler
+from prosodia.base.augmentedbnf import create_augmentedbnf
+from prosodia.base.augmentedbnf._text import text as abnf_text
+
+
+def _create_language() -> g.Language:
+    lang = g.Language.create('Pair')
+    lang.add_rule(
+        g.Rule(
+            'Pair',
+            g.Syntax.create(
+                g.TermGroup.create(
+                    g.RuleReference('Num'),
+                    g.Literal('+'),
+                    g.RuleReference('Num')
+                ),
+                g.TermGroup.create(
+                    g.RuleReference('Num'),
+                    g.Literal('-'),
+                    g.RuleReference('Num')
+                )
+            )
+        )
+    )
+    lang.add_rule(
+        g.Rule(
+            'Num',
+            g.Syntax.create(
+                g.TermGroup.create(
+                    g.RepeatTerm(g.LiteralRange(ord('0'), ord('9')), 1, None)
+                )
+            )
+        )
+    )
+    return lang
+
+
+class TestProfile(unittest.TestCase):
+    def test_rule_stats(self) -> None:
+        node, stats = _create_language().profile('12-3', False)
+        self.assertEqual(node.draw(), _create_language().parse('12-3').draw())
+        pair = stats.rules['Pair']
+        self.assertEqual(pair.invocations, 1)
+        self.assertEqual(pair.matches, 1)
+        self.assertEqual(pair.backtracks, 1)
+        self.assertEqual(pair.discarded, 0)
+        num = stats.rules['Num']
+        # the second group finds the first Num in the memo
+        self.assertEqual(num.memo_hits, 1)
+        self.assertEqual(num.memo_misses, 2)
+        self.assertEqual(num.invocations, 2)
+        # Num matches both '1' and '12' but only '12' is kept
+        self.assertEqual(num.matches, 3)
+        self.assertEqual(num.discarded, 1)
+        self.assertEqual(stats.peak_memo, 3)
+        # two characters of the first Num, each of its matches and their
+        # repeats, the '-' and the second Num, and Pair itself
+        self.assertEqual(stats.nodes, 11)
+
+    def test_token_rule_matches_are_kept(self) -> None:
+        lang = g.Language.create('Ask')
+        lang.add_rule(
+            g.Rule(
+                'Ask',
+                g.Syntax.create(
+                    g.TermGroup.create(g.RuleReference('Word'), g.Literal('!')),
+                    g.TermGroup.create(g.RuleReference('Word'), g.Literal('?'))
+                )
+            )
+        )
+        lang.add_rule(
+            g.Rule(
+                'Word',
+                g.Syntax.create(
+                    g.TermGroup.create(
+                        g.RepeatTerm(
+                            g.LiteralRange(ord('a'), ord('z')),
+                            1,
+                            None
+                        )
+                    )
+                )
+            )
+        )
+        lang.mark_token('Word')
+        _, stats = lang.profile('ab?', False)
+        word = stats.rules['Word']
+        self.assertEqual(word.matches, 1)
+        self.assertEqual(word.discarded, 0)
+
+    def test_scanned_rule_nodes_are_not_matches(self) -> None:
+        # the repeats of Digit are scanned as one run of characters, which
+        # makes Digit nodes without matching the rule
+        digits = g.RepeatTerm(g.RuleReference('Digit'), 0, None)
+        lang = g.Language.create('Number')
+        lang.add_rule(
+            g.Rule(
+                'Number',
+                g.Syntax.create(
+                    g.TermGroup.create(digits, g.Literal('x')),
+                    g.TermGroup.create(g.RuleReference('Digit'), digits)
+                )
+            )
+        )
+        lang.add_rule(
+            g.Rule(
+                'Digit',
+                g.Syntax.create(
+                    g.TermGroup.create(g.LiteralRange(ord('0'), ord('9')))
+                )
+            )
+        )
+        self.assertIsNotNone(lang.char_run(digits))
+        node, stats = lang.profile('123', False)
+        self.assertEqual(str(node), '123')
+        digit = stats.rules['Digit']
+        self.assertEqual(digit.matches, 1)
+        self.assertEqual(digit.discarded, 0)
+        # Number also matched '1' and '12'
+        self.assertEqual(stats.rules['Number'].discarded, 2)
+
+    def test_first_match_is_lazy(self) -> None:
+        lang = g.Language.create('Sum')
+        lang.add_rule(
+            g.Rule(
+                'Sum',
+                g.Syntax.create(
+                    g.TermGroup.create(
+                        g.RuleReference('Sum'),
+                        g.Literal('+'),
+                        g.RuleReference('Sum')
+                    ),
+                    g.TermGroup.create(g.Literal('1'))
+                )
+            )
+        )
+        text = '+'.join('1' * 8)
+        node, first = lang.profile(text, False, g.FIRST_MATCH)
+        self.assertEqual(str(node), text)
+        profiler = Profiler()
+        with self.assertRaises(g.TooManyMatches) as raised:
+            lang.parse(text, False, profiler.cache)
+        # the 429 ways to add up 8 numbers
+        self.assertEqual(len(raised.exception.matches), 429)
+        every = profiler.stats()
+        # only the matches that were asked for are found
+        self.assertLess(
+            first.rules['Sum'].matches * 10,
+            every.rules['Sum'].matches
+        )
+        self.assertLess(first.nodes * 10, every.nodes)
+
+    def test_times(self) -> None:
+        _, stats = _create_language().profile('12-3', False)
+        pair = stats.rules['Pair']
+        num = stats.rules['Num']
+        self.assertAlmostEqual(stats.elapsed, pair.inclusive)
+        self.assertLessEqual(num.inclusive, pair.inclusive)
+        self.assertAlmostEqual(
+            pair.exclusive + num.exclusive,
+            pair.inclusive
+        )
+
+    def test_grammar_profile(self) -> None:
+        grammar = create_augmentedbnf()
+        result, stats = grammar.profile(abnf_text)
+        self.assertEqual(
+            sorted(result.rules),
+            sorted(grammar.apply(abnf_text).rules)
+        )
+        self.assertIn('Rule', stats.rules)
+        self.assertIn('RuleName', stats.report(5))
+        self.assertEqual(len(stats.report(5).splitlines()), 7)
+
+    def test_collapsed_stacks(self) -> None:
+        _, stats = _create_language().profile('12-3', False)
+        self.assertEqual(set(stats.stacks), {('Pair',), ('Pair', 'Num')})
+        self.assertAlmostEqual(sum(stats.stacks.values()), stats.elapsed)
+        stream = io.StringIO()
+        stats.write_collapsed(stream)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines, list(stats.collapsed()))
+        for line in lines:
+            stack, spent = line.rsplit(' ', 1)
+            self.assertIn(tuple(stack.split(';')), stats.stacks)
+            self.assertGreater(int(spent), 0)
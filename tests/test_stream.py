@@ -0,0 +1,121 @@
+import functools
+import io
+import typing
+import unittest
+
+from prosodia.core import grammar as g, transform as t
+from prosodia.base.augmentedbnf import create_augmentedbnf
+from prosodia.base.augmentedbnf._freebies import add_freebie_transforms
+
+_records_text = '''Records = *Record
+Record = 1*DIGIT "," 1*ALPHA LF
+'''
+
+
+def _record_accum(
+    values: typing.Tuple[typing.Sequence[str], str, typing.Sequence[str], str]
+) -> typing.Tuple[int, str]:
+    return int(''.join(values[0])), ''.join(values[2])
+
+
+@functools.lru_cache(maxsize=None)
+def _create_language() -> g.Language:
+    return create_augmentedbnf().apply(_records_text)
+
+
+def _create_grammar(**kwargs: typing.Any) -> g.Grammar:
+    transform = add_freebie_transforms(
+        t.LanguageTransformation.create('Records', [lambda v: list(v[0])])
+    )
+    transform <<= ('Record', [_record_accum])
+    return g.Grammar(_create_language(), transform, False, **kwargs)
+
+
+def _records(count: int) -> str:
+    return ''.join('{0},r{1}\n'.format(i, 'x' * (i % 7)) for i in range(count))
+
+
+class TestStream(unittest.TestCase):
+    def test_same_values_as_apply(self) -> None:
+        text = _records(200)
+        expected = _create_grammar().apply(text)
+        options: typing.List[typing.Dict[str, typing.Any]] = [
+            dict(),
+            dict(engine=g.PEG),
+            dict(engine=g.PEG, fused=True),
+        ]
+        for kwargs in options:
+            grammar = _create_grammar(**kwargs)
+            self.assertEqual(
+                list(grammar.iter_apply(text, 'Record')),
+                expected
+            )
+            self.assertEqual(
+                list(
+                    grammar.iter_apply(
+                        io.StringIO(text),
+                        'Record',
+                        chunk_size=16,
+                        lookahead=4
+                    )
+                ),
+                expected
+            )
+
+    def test_values_are_yielded_while_reading(self) -> None:
+        read: typing.List[int] = []
+
+        class Source(io.StringIO):
+            def read(self, size: typing.Optional[int] = -1) -> str:
+                chunk = super().read(size)
+                read.append(len(chunk))
+                return chunk
+
+        records = _create_grammar().iter_apply(
+            Source(_records(1000)),
+            'Record',
+            chunk_size=64,
+            lookahead=8
+        )
+        self.assertEqual(next(records), (0, 'r'))
+        self.assertLess(sum(read), 200)
+        self.assertEqual(len(list(records)), 999)
+
+    def test_reads_shrink_after_a_long_record(self) -> None:
+        read: typing.List[int] = []
+
+        class Source(io.StringIO):
+            def read(self, size: typing.Optional[int] = -1) -> str:
+                read.append(typing.cast(int, size))
+                return super().read(size)
+
+        text = '0,{0}\n'.format('x' * 1000) + _records(200)
+        values = list(
+            _create_grammar().iter_apply(
+                Source(text),
+                'Record',
+                chunk_size=32,
+                lookahead=4
+            )
+        )
+        self.assertEqual(values, _create_grammar().apply(text))
+        self.assertGreater(max(read), 1000)
+        self.assertEqual(read[-10:], [32] * 10)
+
+    def test_no_matches_counts_lines_of_the_whole_source(self) -> None:
+        text = _records(100) + '100,bad!\n'
+        with self.assertRaises(g.NoMatches) as raised:
+            list(
+                _create_grammar().iter_apply(
+                    io.StringIO(text),
+                    'Record',
+                    chunk_size=32,
+                    lookahead=4
+                )
+            )
+        self.assertEqual(raised.exception.line, 101)
+        self.assertEqual(raised.exception.column, 8)
+
+    def test_unsupported_engine(self) -> None:
+        with self.assertRaises(ValueError):
+            next(_create_grammar(engine=g.EARLEY).iter_apply('1,a\n', 'Record'))
@@ -0,0 +1,196 @@
+import io
+import typing
+import unittest
+from unittest import mock
+
+from prosodia.core import grammar as g
+from prosodia.core import trace
+from prosodia.base.augmentedbnf import create_augmentedbnf
+from prosodia.base.augmentedbnf._text import text as abnf_text
+
+
+def _create_language() -> g.Language:
+    lang = g.Language.create('Pair')
+    lang.add_rule(
+        g.Rule(
+            'Pair',
+            g.Syntax.create(
+                g.TermGroup.create(
+                    g.RuleReference('Num'),
+                    g.Literal('+'),
+                    g.RuleReference('Num')
+                ),
+                g.TermGroup.create(
+                    g.RuleReference('Num'),
+                    g.Literal('-'),
+                    g.RuleReference('Num')
+                )
+            )
+        )
+    )
+    lang.add_rule(
+        g.Rule(
+            'Num',
+            g.Syntax.create(
+                g.TermGroup.create(
+                    g.RepeatTerm(g.LiteralRange(ord('0'), ord('9')), 1, None)
+                )
+            )
+        )
+    )
+    return lang
+
+
+class _Recorder(trace.EventTracer):
+    def __init__(self) -> None:
+        self.events: typing.List[trace.TraceEvent] = []
+
+    def event(self, event: trace.TraceEvent) -> None:
+        self.events.append(event)
+
+
+class TestTrace(unittest.TestCase):
+    def test_same_tree_as_untraced_parse(self) -> None:
+        lang = create_augmentedbnf().language
+        recorder = _Recorder()
+        traced = lang.parse(abnf_text, False, tracer=recorder)
+        self.assertEqual(traced.draw(), lang.parse(abnf_text, False).draw())
+        self.assertTrue(recorder.events)
+
+    def test_event_tracer_needs_event(self) -> None:
+        class Forgetful(trace.EventTracer):  # pylint: disable=abstract-method
+            pass
+
+        with self.assertRaises(TypeError):
+            Forgetful()  # type: ignore  # pylint: disable=abstract-class-instantiated
+
+    def test_events(self) -> None:
+        recorder = _Recorder()
+        _create_language().parse('12-3', False, tracer=recorder)
+        events = recorder.events
+        self.assertEqual(
+            events[:2],
+            [
+                trace.TraceEvent(trace.MEMO_MISS, 'Pair', 0),
+                trace.TraceEvent(trace.ENTER, 'Pair', 0),
+            ]
+        )
+        self.assertEqual(events[-1], trace.TraceEvent(trace.EXIT, 'Pair', 0, 1))
+        self.assertIn(trace.TraceEvent(trace.MEMO_HIT, 'Num', 0), events)
+        self.assertIn(trace.TraceEvent(trace.MATCH, "'0'-'9'", 0, 2), events)
+        self.assertIn(trace.TraceEvent(trace.FAIL, "'+'", 2), events)
+        self.assertIn(trace.TraceEvent(trace.BACKTRACK, 'Pair', 0, 0), events)
+        # Num is suspended with its first match while Pair tries it
+        self.assertLess(
+            events.index(trace.TraceEvent(trace.SUSPEND, 'Num', 0, 1)),
+            events.index(trace.TraceEvent(trace.FAIL, "'+'", 1))
+        )
+        self.assertLess(
+            events.index(trace.TraceEvent(trace.FAIL, "'+'", 1)),
+            events.index(trace.TraceEvent(trace.RESUME, 'Num', 0))
+        )
+        self.assertEqual(
+            [e for e in events if e.kind == trace.ENTER and e.name == 'Num'],
+            [
+                trace.TraceEvent(trace.ENTER, 'Num', 0),
+                trace.TraceEvent(trace.ENTER, 'Num', 3),
+            ]
+        )
+
+    def test_terms_inside_repeats(self) -> None:
+        lang = g.Language.create('Pairs')
+        lang.add_rule(
+            g.Rule(
+                'Pairs',
+                g.Syntax.create(
+                    g.TermGroup.create(
+                        g.RepeatTerm(
+                            g.AtomicTerm(
+                                g.GroupTerm([[g.Literal('a'), g.Literal('b')]])
+                            ),
+                            0,
+                            None,
+                            True
+                        )
+                    )
+                )
+            )
+        )
+        recorder = _Recorder()
+        node, stats = lang.profile('abab', False)
+        lang.parse('abab', False, tracer=recorder)
+        self.assertEqual(
+            [e for e in recorder.events if e.kind == trace.MATCH],
+            [
+                trace.TraceEvent(trace.MATCH, "'a'", 0, 1),
+                trace.TraceEvent(trace.MATCH, "'b'", 1, 2),
+                trace.TraceEvent(trace.MATCH, "'a'", 2, 3),
+                trace.TraceEvent(trace.MATCH, "'b'", 3, 4),
+            ]
+        )
+        self.assertIn(trace.TraceEvent(trace.FAIL, "'a'", 4), recorder.events)
+        # four literals, two groups, the repeat and the rule
+        self.assertEqual(stats.nodes, 8)
+        self.assertEqual(str(node), 'abab')
+
+    def test_json_lines(self) -> None:
+        recorder = _Recorder()
+        stream = io.StringIO()
+        lang = _create_language()
+        lang.parse('12-3', False, tracer=recorder)
+        lang.parse('12-3', False, tracer=trace.JsonLinesTracer(stream))
+        self.assertEqual(
+            stream.getvalue().splitlines()[1],
+            '["enter","Pair",0,-1]'
+        )
+        stream.seek(0)
+        self.assertEqual(list(trace.read_json_lines(stream)), recorder.events)
+
+    def test_binary(self) -> None:
+        recorder = _Recorder()
+        stream = io.BytesIO()
+        lang = _create_language()
+        lang.parse('12-3', False, tracer=recorder)
+        lang.parse('12-3', False, tracer=trace.BinaryTracer(stream))
+        stream.seek(0)
+        self.assertEqual(list(trace.read_binary(stream)), recorder.events)
+
+    def test_other_engines(self) -> None:
+        with self.assertRaises(ValueError):
+            _create_language().parse(
+                '1+2',
+                engine=g.EARLEY,
+                tracer=trace.Tracer()
+            )
+        lang = _create_language()
+        lang.debug = True
+        stream = io.StringIO()
+        with mock.patch('sys.stdout', stream):
+            node = lang.parse('1+2', engine=g.ITERATIVE)
+        self.assertEqual(str(node), '1+2')
+        self.assertEqual(stream.getvalue(), '')
+
+    def test_traced_cache(self) -> None:
+        with self.assertRaises(ValueError):
+            _create_language().parse(
+                '1+2',
+                cache=g.MatchCache(),
+                tracer=trace.Tracer()
+            )
+        recorder = _Recorder()
+        cache = trace.TracingCache(recorder)
+        _create_language().parse('12-3', False, cache)
+        expected = _Recorder()
+        _create_language().parse('12-3', False, tracer=expected)
+        self.assertEqual(recorder.events, expected.events)
+
+    def test_debug(self) -> None:
+        lang = _create_language()
+        lang.debug = True
+        stream = io.StringIO()
+        with mock.patch('sys.stdout', stream):
+            lang.parse('1+2')
+        self.assertEqual(
+            stream.getvalue().splitlines()[:2],
+            ['["miss","Pair",0,-1]', '["enter","Pair",0,-1]']
+        )
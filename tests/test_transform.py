@@ -0,0 +1,71 @@
+import typing
+import unittest
+
+from prosodia.core import transform as t
+from prosodia.core.tree import LiteralNode, MultiNode, RuleNode
+from prosodia.validation import group_types as gt
+
+
+def _nested_accum(values: typing.Tuple[str, typing.Sequence[int]]) -> int:
+    return len(values[0]) + sum(values[1])
+
+
+def _create_transform() -> t.LanguageTransformation:
+    lt = t.LanguageTransformation.create('Nested', [_nested_accum, len])
+    lt <<= ('Leaf', [lambda values: values[0]])
+    return lt
+
+
+class TestTransform(unittest.TestCase):
+    def test_accumulators_get_child_tuples(self) -> None:
+        seen: typing.List[typing.Any] = []
+
+        def accum(values: typing.Tuple[str, typing.List[str]]) -> str:
+            seen.append(values)
+            return values[0] + ''.join(values[1])
+
+        lt = t.LanguageTransformation.create('Root', [accum])
+        node = RuleNode(
+            'Root',
+            0,
+            [
+                LiteralNode('a'),
+                MultiNode([LiteralNode('b'), LiteralNode('c')])
+            ]
+        )
+        self.assertEqual(lt.transform(node), 'abc')
+        self.assertEqual(seen, [('a', ['b', 'c'])])
+
+    def test_group_value(self) -> None:
+        lt = t.LanguageTransformation.create('Root', [lambda v: v[0]])
+        node = RuleNode('Root', 0, [MultiNode([LiteralNode('x')], (1, 3))])
+        self.assertEqual(
+            lt.transform(node),
+            [gt.NoValue.Sentinel, ['x'], gt.NoValue.Sentinel]
+        )
+
+    def test_deep_tree(self) -> None:
+        depth = 100000
+        node = RuleNode('Nested', 1, [LiteralNode('x')])
+        for _ in range(depth):
+            node = RuleNode(
+                'Nested',
+                0,
+                [LiteralNode('.'), MultiNode([node])]
+            )
+        self.assertEqual(_create_transform().transform(node), depth + 1)
+
+    def test_node_transform(self) -> None:
+        node = RuleNode('Leaf', 0, [LiteralNode('x')])
+        self.assertEqual(node.transform(_create_transform()), 'x')
+
+    def test_rules_assigned_directly(self) -> None:
+        lt = _create_transform()
+        lt.transformation_rules['Leaf'] = t.RuleTransformation(
+            'Leaf',
+            t.SyntaxTransformation.create(
+                t.TermGroupTransformation(lambda values: values[0] * 2)
+            )
+        )
+        node = RuleNode('Leaf', 0, [LiteralNode('x')])
+        self.assertEqual(lt.transform(node), 'xx')